@@ -14,6 +14,7 @@ log_file_type = "gzip"
 # pickle_file_type = "pkl"
 
 log_directory = ":logs"
+column_cache_directory = ".columns"  # decoded columns are cached in this folder next to the log (see columncache.py)
 # pickle_directory = ":pickled"
 # pickled_sim_directory = ":simulations"
 
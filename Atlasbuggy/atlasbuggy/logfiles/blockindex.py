@@ -0,0 +1,123 @@
+"""
+Contains the BlockIndex class. Logger writes each batch of records as its own gzip member (a block).
+Alongside the log, it writes an index with one entry per block so Parser can find the block containing
+a line number or timestamp with a binary search and only decompress from there.
+
+The index file has the log's name plus ".idx" (for example "15;30;12, Sat Jan 14 2017.gzip.idx").
+"""
+
+import os
+import struct
+from bisect import bisect_left, bisect_right
+
+index_file_type = "idx"
+
+# byte offset, compressed length, first line number, number of lines, min timestamp, max timestamp
+index_entry = struct.Struct("<QIQIff")
+
+
+def index_path(log_path):
+    """
+    :param log_path: path to a log file
+    :return: path to the log's index file
+    """
+    return log_path + "." + index_file_type
+
+
+class BlockIndex:
+    def __init__(self):
+        self.offsets = []
+        self.lengths = []
+        self.first_lines = []
+        self.num_lines = []
+        self.min_times = []
+        self.max_times = []  # largest timestamp up to and including each block. Always sorted
+
+    def append(self, offset, length, first_line, num_lines, min_time, max_time):
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.first_lines.append(first_line)
+        self.num_lines.append(num_lines)
+        self.min_times.append(min_time)
+        if len(self.max_times) > 0:
+            max_time = max(max_time, self.max_times[-1])
+        self.max_times.append(max_time)
+
+    @classmethod
+    def load(cls, log_path):
+        """
+        Read a log's index file
+
+        :param log_path: path to the log file (not the index)
+        :return: BlockIndex or None if the log doesn't have an index or the index doesn't match the log
+        """
+        path = index_path(log_path)
+        if not os.path.isfile(path):
+            return None
+
+        with open(path, "rb") as index_file:
+            contents = index_file.read()
+
+        block_index = cls()
+        num_entries = len(contents) // index_entry.size  # ignore an entry cut off by a crash
+        for entry in index_entry.iter_unpack(contents[:num_entries * index_entry.size]):
+            block_index.append(*entry)
+
+        # the log must contain every block the index describes
+        if len(block_index) == 0 or block_index.end_offset() > os.path.getsize(log_path):
+            return None
+        return block_index
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def total_lines(self):
+        return self.first_lines[-1] + self.num_lines[-1]
+
+    def end_offset(self, block=-1):
+        """
+        :return: byte offset of the end of a block
+        """
+        return self.offsets[block] + self.lengths[block]
+
+    def find_line(self, line_number):
+        """
+        :param line_number: a line number in the log file
+        :return: number of the block containing the line
+        """
+        return max(0, min(bisect_right(self.first_lines, line_number) - 1, len(self) - 1))
+
+    def find_time(self, timestamp, after=False):
+        """
+        :param timestamp: a time in the log file in seconds
+        :param after: find the first block that could contain a record after timestamp
+            instead of at or after timestamp
+        :return: number of the block
+        """
+        if after:
+            block = bisect_right(self.max_times, timestamp)
+        else:
+            block = bisect_left(self.max_times, timestamp)
+        return min(block, len(self) - 1)
+
+
+class BlockIndexWriter:
+    """Used by Logger to write an index while writing a log file"""
+
+    def __init__(self, log_path):
+        self.index_file = open(index_path(log_path), "wb")
+        self.num_lines = 0  # number of lines written so far (the line number of the next block)
+
+    def write(self, offset, length, num_lines, min_time, max_time):
+        """
+        Add an entry for a block that was just written. Called after the block is written so the index
+        never points to data that isn't in the log file
+
+        :return: None
+        """
+        self.index_file.write(index_entry.pack(offset, length, self.num_lines, num_lines, min_time, max_time))
+        self.index_file.flush()
+        self.num_lines += num_lines
+
+    def close(self):
+        self.index_file.close()
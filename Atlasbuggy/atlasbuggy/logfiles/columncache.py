@@ -0,0 +1,215 @@
+"""
+ColumnCache keeps decoded log files on disk so they only have to be decoded once.
+
+Every column is saved as its own .npy file and loaded memory mapped, so opening a cached log is
+nearly instant and only the pages of the columns that are actually used are read.
+
+Each log gets a directory named after a key made from the log file's contents (sha1), size,
+modification time and the version of the code that decoded it. If any of those change the old entry
+is removed and the log is decoded again. Two copies of the same log share nothing because their
+modification times differ, but renaming a log doesn't invalidate it.
+
+Columns are grouped by sensor (usually a whoiam ID). Sensors are loaded lazily: nothing is read until
+a sensor's columns are asked for.
+
+This module only depends on numpy. Robots/roboquasar0.0/atlasbuggy/microcontroller/columncache.py is a copy
+of it for roboquasar0.0's own Parser. Make the same changes there.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+manifest_name = "manifest.json"
+hash_chunk_size = 0x100000
+
+
+class ColumnCache:
+    def __init__(self, directory, version):
+        """
+        :param directory: directory containing every cached log
+        :param version: version of the decoder. Entries made by a different version are ignored
+        """
+        self.directory = directory
+        self.version = str(version)
+
+    def key(self, source_path):
+        """
+        :param source_path: path to a log file
+        :return: name of the log's cache entry and a dictionary describing the log file
+        """
+        file_hash = hashlib.sha1()
+        with open(source_path, "rb") as source_file:
+            chunk = source_file.read(hash_chunk_size)
+            while len(chunk) > 0:
+                file_hash.update(chunk)
+                chunk = source_file.read(hash_chunk_size)
+
+        status = os.stat(source_path)
+        source = dict(
+            path=os.path.abspath(source_path),
+            hash=file_hash.hexdigest(),
+            size=status.st_size,
+            mtime=status.st_mtime_ns,
+            version=self.version,
+        )
+        key = hashlib.sha1(("%(hash)s:%(size)i:%(mtime)i:%(version)s" % source).encode()).hexdigest()
+        return key[:24], source
+
+    def open(self, source_path):
+        """
+        Find (or make room for) a log's cache entry. Entries for older versions of the same file are deleted
+
+        :param source_path: path to a log file
+        :return: CachedLog
+        """
+        key, source = self.key(source_path)
+        entry_directory = os.path.join(self.directory, key)
+
+        if not os.path.isdir(entry_directory):
+            self.remove_stale(source["path"])
+        return CachedLog(entry_directory, source)
+
+    def remove_stale(self, source_path):
+        """
+        Delete cache entries made from a file at this path
+
+        :param source_path: absolute path to a log file
+        :return: None
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for key in os.listdir(self.directory):
+            manifest = read_manifest(os.path.join(self.directory, key))
+            if manifest is not None and manifest["source"]["path"] == source_path:
+                shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+
+class CachedLog:
+    def __init__(self, directory, source):
+        """
+        :param directory: this log's cache entry
+        :param source: description of the log file (see ColumnCache.key)
+        """
+        self.directory = directory
+        self.source = source
+        self.manifest = read_manifest(directory)
+        if self.manifest is None:
+            self.manifest = dict(source=source, sensors={})
+
+        self.loaded = {}  # sensor -> dictionary of memory mapped columns
+
+    def __contains__(self, sensor):
+        return sensor in self.manifest["sensors"]
+
+    def __getitem__(self, sensor):
+        """
+        :param sensor: name the columns were stored under
+        :return: dictionary of column name to read only memory mapped array
+        """
+        if sensor not in self.loaded:
+            entry = self.manifest["sensors"][sensor]
+            self.loaded[sensor] = {
+                name: load_column(os.path.join(self.directory, file_name), entry["rows"], entry["dtypes"][index])
+                for index, (name, file_name) in enumerate(entry["columns"])
+            }
+        return self.loaded[sensor]
+
+    def sensors(self):
+        return list(self.manifest["sensors"].keys())
+
+    def column_names(self, sensor):
+        """
+        :return: names of the columns stored for a sensor. Empty if the sensor isn't cached
+        """
+        if sensor not in self.manifest["sensors"]:
+            return []
+        return [name for name, file_name in self.manifest["sensors"][sensor]["columns"]]
+
+    def info(self, sensor):
+        """
+        :return: the info dictionary stored with a sensor's columns
+        """
+        return self.manifest["sensors"][sensor]["info"]
+
+    def store(self, sensor, columns, info=None):
+        """
+        Save columns for a sensor. Columns already stored for the sensor are kept unless they're replaced
+
+        :param sensor: name to store the columns under (usually a whoiam ID)
+        :param columns: dictionary of column name (string or int) to array. Every array needs the same length
+        :param info: dictionary of extra information to keep with the columns (must be json serializable)
+        :return: None
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        lengths = set(len(column) for column in columns.values())
+        if len(lengths) > 1:
+            raise ValueError("Columns for '%s' have different lengths: %s" % (sensor, sorted(lengths)))
+
+        # another process may have stored other sensors since this manifest was read
+        manifest = read_manifest(self.directory)
+        if manifest is not None:
+            self.manifest = manifest
+
+        num_rows = lengths.pop() if len(lengths) > 0 else 0
+        entry = self.manifest["sensors"].get(sensor)
+        if entry is None or entry["rows"] != num_rows:
+            entry = dict(rows=num_rows, columns=[], dtypes=[], info={})
+        if info is not None:
+            entry["info"] = info
+
+        stored = {name: index for index, (name, file_name) in enumerate(entry["columns"])}
+        sensor_hash = hashlib.sha1(sensor.encode()).hexdigest()[:12]
+        for name, column in columns.items():
+            column = np.ascontiguousarray(column)
+            if column.dtype == object:
+                raise ValueError("Column '%s' of '%s' has no fixed type so it can't be memory mapped" % (name, sensor))
+
+            if name in stored:
+                file_name = entry["columns"][stored[name]][1]
+                entry["dtypes"][stored[name]] = column.dtype.str
+            else:
+                file_name = "%s-%i.npy" % (sensor_hash, len(entry["columns"]))
+                entry["columns"].append([name, file_name])
+                entry["dtypes"].append(column.dtype.str)
+
+            temporary_path = os.path.join(self.directory, file_name + ".%i.tmp" % os.getpid())
+            with open(temporary_path, "wb") as column_file:
+                np.save(column_file, column)
+            os.replace(temporary_path, os.path.join(self.directory, file_name))
+
+        self.manifest["sensors"][sensor] = entry
+        self.loaded.pop(sensor, None)
+        write_manifest(self.directory, self.manifest)
+
+
+def load_column(path, rows, dtype):
+    """
+    :return: a memory mapped column. Empty columns can't be mapped so they're returned as empty arrays
+    """
+    if rows == 0:
+        return np.zeros(0, dtype=np.dtype(dtype))
+    return np.load(path, mmap_mode="r")
+
+
+def read_manifest(directory):
+    """
+    :return: the manifest of a cache entry. None if it doesn't exist or can't be read
+    """
+    try:
+        with open(os.path.join(directory, manifest_name)) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(directory, manifest):
+    temporary_path = os.path.join(directory, manifest_name + ".%i.tmp" % os.getpid())
+    with open(temporary_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(temporary_path, os.path.join(directory, manifest_name))
@@ -0,0 +1,240 @@
+"""
+Decodes log files into NumPy arrays, one set of columns per whoiam ID, for plotting and post analysis.
+
+Every step works on the whole decompressed log at once: lines, separators and fields are found as arrays of
+byte offsets, hex timestamps are decoded with a lookup table and fields are converted column by column.
+Nothing is done per line in Python.
+
+Each whoiam ID gets a dictionary of columns:
+    "timestamp": float64 array of record times
+    one array per field. Fields are named by a PacketSchema or numbered by their position in the
+        tab separated packet (0, 1, 2, ...)
+    "index": line number of each record (only if line_numbers is True)
+
+Records with fewer fields than expected (like the "delay:..." packets sent before a port starts) are skipped.
+"""
+
+import numpy as np
+
+from atlasbuggy.logfiles import time_whoiam_sep, whoiam_packet_sep
+
+# value of each ascii hex digit. Other characters are 0xff
+hex_digits = np.full(256, 0xff, dtype=np.uint8)
+for _digit in range(10):
+    hex_digits[ord("0") + _digit] = _digit
+for _digit in range(6):
+    hex_digits[ord("a") + _digit] = 10 + _digit
+    hex_digits[ord("A") + _digit] = 10 + _digit
+
+version = 1  # increase when decoded columns change so cached columns (see columncache.py) are decoded again
+
+timestamp_length = 8  # hex characters in a float32 timestamp
+
+newline = ord("\n")
+tab = ord("\t")
+
+
+def decode_columns(data, packet_type="<", schemas=None, whoiams=None, fields=None, first_line=0, start_line=0,
+                   end_line=-1, line_numbers=False):
+    """
+    :param data: decompressed log file contents (bytes)
+    :param packet_type: only decode records of this type (see packet_types in logfiles/__init__.py)
+    :param schemas: dictionary of whoiam ID to the PacketSchema its packets are decoded with.
+        whoiam IDs without a schema are split on tabs
+    :param whoiams: whoiam IDs to decode. None means all of them
+    :param fields: names (or numbers) of the columns to convert. Converting fields takes most of the time
+        so leave out the ones that aren't needed. None means all of them
+    :param first_line: line number of the first line in data
+    :param start_line: first line number to decode
+    :param end_line: line number to stop before. -1 means the end of data
+    :param line_numbers: if True, add an "index" column with each record's line number
+    :return: dictionary of whoiam ID to a dictionary of columns (see the module description)
+    """
+    if schemas is None:
+        schemas = {}
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+
+    # line boundaries. Same lines as data.split(b"\n")
+    newlines = np.flatnonzero(buffer == newline)
+    starts = line_starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [len(buffer)]))
+
+    # pad by the longest line so any part of a line can be read as a fixed width string (see gather_strings).
+    # The padding ends with a tab so every field is followed by one
+    padded = np.zeros(len(buffer) + int((ends - starts).max()) + 1, dtype=np.uint8)
+    padded[:len(buffer)] = buffer
+    padded[-1] = tab
+    buffer = padded
+
+    first = max(start_line - first_line, 0)
+    last = len(starts) if end_line == -1 else min(max(end_line - first_line, first), len(starts))
+    starts = starts[first:last]
+    ends = ends[first:last]
+
+    # only non-empty records of the right type
+    keep = ends > starts
+    keep[keep] = buffer[starts[keep]] == ord(packet_type)
+    starts = starts[keep]
+    ends = ends[keep]
+
+    # the timestamp separator follows the timestamp. The packet separator is the first one after it
+    time_seps = starts + 1 + timestamp_length
+    keep = time_seps < ends
+    keep[keep] = buffer[time_seps[keep]] == ord(time_whoiam_sep)
+    starts, ends, time_seps = starts[keep], ends[keep], time_seps[keep]
+
+    packet_sep_positions = np.flatnonzero(buffer == ord(whoiam_packet_sep))
+    next_packet_sep = np.searchsorted(packet_sep_positions, time_seps)
+    keep = next_packet_sep < len(packet_sep_positions)
+    packet_seps = np.full(len(starts), len(buffer))
+    packet_seps[keep] = packet_sep_positions[next_packet_sep[keep]]
+    keep &= packet_seps < ends
+    starts, ends, time_seps, packet_seps = starts[keep], ends[keep], time_seps[keep], packet_seps[keep]
+
+    timestamps, keep = decode_timestamps(buffer, starts + 1)
+    ends, time_seps, packet_seps, timestamps = ends[keep], time_seps[keep], packet_seps[keep], timestamps[keep]
+
+    # group records by whoiam ID
+    names = gather_strings(buffer, time_seps + 1, packet_seps)
+    unique_names, name_indices = np.unique(names, return_inverse=True)
+
+    tab_positions = np.flatnonzero(buffer == tab)
+
+    columns = {}
+    for name_index, name in enumerate(unique_names):
+        whoiam = name.decode("utf-8")
+        if whoiams is not None and whoiam not in whoiams:
+            continue
+
+        rows = name_indices == name_index
+        lines = None
+        if line_numbers:
+            lines = np.searchsorted(line_starts, packet_seps[rows], side="right") - 1 + first_line
+        columns[whoiam] = decode_packets(
+            buffer, tab_positions, packet_seps[rows] + 1, ends[rows], timestamps[rows], schemas.get(whoiam),
+            fields, lines
+        )
+    return columns
+
+
+def decode_timestamps(buffer, positions):
+    """
+    :param buffer: padded log file contents as a uint8 array (see gather_strings)
+    :param positions: offset of each record's hex timestamp
+    :return: float64 array of timestamps, boolean array of which positions had valid timestamps
+    """
+    characters = gather_strings(buffer, positions, positions + timestamp_length)
+    digits = hex_digits[characters.view(np.uint8).reshape(len(positions), timestamp_length)]
+    valid = np.all(digits != 0xff, axis=1)
+
+    bits = np.zeros(len(positions), dtype=np.uint32)
+    for digit in range(timestamp_length):
+        bits = (bits << 4) | digits[:, digit]
+    return bits.view(np.float32).astype(np.float64), valid
+
+
+def gather_strings(buffer, starts, ends):
+    """
+    Copy byte ranges of the buffer into a fixed width bytes array
+
+    :param buffer: log file contents as a uint8 array. It must be padded with at least as many bytes
+        as the longest range so every range can be read as a full width string
+    :param starts: offset of each string
+    :param ends: offset after each string
+    :return: numpy bytes array
+    """
+    lengths = ends - starts
+    width = max(int(lengths.max()) if len(lengths) > 0 else 0, 1)
+
+    # every offset of the buffer viewed as the start of a string without copying
+    windows = np.ndarray((len(buffer) - width + 1,), dtype="S%i" % width, buffer=buffer, strides=(1,))
+    strings = windows[starts]
+
+    # numpy strips trailing null bytes so clearing everything after each range shortens the string
+    characters = strings.view(np.uint8).reshape(len(strings), width)
+    characters *= np.arange(width) < lengths[:, np.newaxis]
+    return strings
+
+
+def decode_packets(buffer, tab_positions, starts, ends, timestamps, schema=None, fields=None, lines=None):
+    """
+    Split packets on tabs and convert each field
+
+    :param buffer: padded log file contents as a uint8 array (see gather_strings)
+    :param tab_positions: offsets of every tab in the buffer including the one at the end of the padding
+    :param starts: offset of each packet
+    :param ends: offset after each packet
+    :param timestamps: timestamp of each packet
+    :param schema: PacketSchema for these packets. If None, every tab separated field is a column
+    :param fields: names (or numbers) of the columns to convert. None means all of them
+    :param lines: line number of each packet. If not None, they're added as the "index" column
+    :return: dictionary of columns
+    """
+    if schema is not None:
+        if schema.struct is not None:
+            raise ValueError("Log files contain text packets. Schemas with a struct format can't decode them")
+        if schema.separator != "\t":
+            raise ValueError("Only schemas with tab separators can be decoded from log files")
+        starts = starts + len(schema.header)
+
+    first_tabs = np.searchsorted(tab_positions, starts)
+    num_fields = np.searchsorted(tab_positions, ends) - first_tabs + 1
+
+    if schema is not None:
+        expected_fields = schema.indices[-1] + 1 if len(schema) > 0 else 0
+    elif len(num_fields) > 0:
+        expected_fields = int(np.argmax(np.bincount(num_fields)))  # the most common field count
+    else:
+        expected_fields = 0
+
+    rows = num_fields >= expected_fields
+    starts, ends, first_tabs = starts[rows], ends[rows], first_tabs[rows]
+    columns = {"timestamp": timestamps[rows]}
+    if lines is not None:
+        columns["index"] = lines[rows]
+
+    field_starts = starts
+    for index in range(expected_fields):
+        field_ends = np.minimum(tab_positions[first_tabs + index], ends)
+
+        if schema is None:
+            name, converter = index, None
+            if index == expected_fields - 1 and not np.any(field_ends > field_starts):
+                name = None  # drop a trailing empty field
+        elif index in schema.indices:
+            field_num = schema.indices.index(index)
+            name, converter = schema.names[field_num], schema.converters[field_num]
+        else:
+            name = None
+
+        if name is not None and (fields is None or name in fields):
+            columns[name] = convert_column(gather_strings(buffer, field_starts, field_ends), converter)
+
+        field_starts = field_ends + 1
+    return columns
+
+
+def convert_column(strings, converter=None):
+    """
+    :param strings: numpy bytes array of one field
+    :param converter: float, int, str or a function of one string. If None, the column is float64
+        if every value is a number and str otherwise
+    :return: numpy array
+    """
+    if converter is None:
+        try:
+            return strings.astype(np.float64)
+        except ValueError:
+            return np.char.decode(strings, "utf-8")
+    elif converter is float:
+        return strings.astype(np.float64)
+    elif converter is int:
+        return strings.astype(np.int64)
+    elif converter is str:
+        return np.char.decode(strings, "utf-8")
+    else:
+        # call the converter once per distinct value
+        values, indices = np.unique(strings, return_inverse=True)
+        converted = np.array([converter(value.decode("utf-8")) for value in values])
+        return converted[indices]
@@ -1,20 +1,47 @@
 """
 Contains the Logger class. This class writes incoming packets and their corresponding
-whoiam ID and timestamp to a text file. When the program ends, this text file is compressed into a gzip file.
+whoiam ID and timestamp to a gzip file. Packets are compressed in batches and each batch is written as its own
+gzip member, so the file is a valid gzip file after every write (even if the program crashes).
+
+An index of the blocks is written next to the log (see blockindex.py) so parts of the log can be read
+without decompressing all of it.
+
+In background mode, record only queues the packet. A writer thread formats, compresses and syncs
+the queued records to disk so file writes never stall the robot's main loop. If writing fails (disk full,
+fsync error), the writer thread's exception is raised by the next call to record or close. Records after
+that are dropped.
 """
 
 import os
 import struct
 import gzip
+import time
+import threading
+from collections import deque
 
 from atlasbuggy.logfiles import *
+from atlasbuggy.logfiles.blockindex import BlockIndexWriter
 from atlasbuggy import project
 
 
+overflow_policies = ("block", "drop oldest")
+
+
 class Logger:
     """A class for recording data from a robot to a logs file"""
 
-    def __init__(self, file_name, directory):
+    def __init__(self, file_name, directory, background=False, max_queued=0x40000, overflow_policy="block"):
+        """
+        :param file_name: name of the log file. If None, it will be today's date and time
+        :param directory: directory of the log file. See project.py for details
+        :param background: write to the file in a separate thread
+        :param max_queued: maximum number of records waiting for the writer thread (background mode only)
+        :param overflow_policy: what record does when the queue is full.
+            "block" waits for the writer thread, "drop oldest" discards the oldest queued record
+        """
+        if overflow_policy not in overflow_policies:
+            raise ValueError("Invalid overflow policy: %s. Choose from %s" % (overflow_policy, overflow_policies))
+
         # Format the file name. Mac doesn't support colons in file names
         # If file format is provided but not a name, insert timestamp
         if file_name is None or file_name.replace("." + log_file_type, "") == "":
@@ -43,6 +70,26 @@ class Logger:
         self.is_open = False
 
         self.data = []
+        self.max_buffer_len = 0x1000  # number of records to compress at once
+        self.flush_interval = 1.0  # max seconds between writes. Limits how much data a crash can lose
+        self.compress_level = 6
+        self.prev_dump_time = 0.0
+
+        self.index_writer = None
+        self.block_min_time = float("inf")  # range of timestamps in self.data
+        self.block_max_time = float("-inf")
+
+        self.background = background
+        self.max_queued = max_queued
+        self.overflow_policy = overflow_policy
+        self.queued = deque()  # (packet_type, timestamp, whoiam, packet). Appends and pops are thread safe
+        self.dropped_records = 0
+        self.written_records = 0
+        self.writer_thread = None
+        self.writer_wakeup = threading.Event()
+        self.writer_exit = threading.Event()
+        self.writer_error = None  # exception that stopped the writer thread
+        self.writer_error_raised = False
 
     def open(self):
         """
@@ -54,10 +101,17 @@ class Logger:
             os.makedirs(self.directory)
         print("Writing to:", self.file_path)
 
-        self.data_file = open(self.file_path, "w+")
+        self.data_file = open(self.file_path, "wb")
+        self.index_writer = BlockIndexWriter(self.file_path)
+        self.prev_dump_time = time.time()
 
         self.is_open = True
 
+        if self.background:
+            self.writer_exit.clear()
+            self.writer_thread = threading.Thread(target=self._write_in_background, daemon=True)
+            self.writer_thread.start()
+
     @staticmethod
     def float_to_hex(number):
         """
@@ -82,41 +136,172 @@ class Logger:
         packet_type = packet_types[packet_type]
 
         if self.is_open:
-            hex_timestamp = self.float_to_hex(timestamp)
+            if self.background:
+                if self.writer_error is not None:
+                    self.dropped_records += 1
+                    self._raise_writer_error()
+                    return
+                self._enqueue((packet_type, timestamp, whoiam, packet))
+                return
 
-            self.data.append("%s%s%s%s%s%s\n" % (
-                packet_type, hex_timestamp, time_whoiam_sep, whoiam, whoiam_packet_sep, packet))
+            self.data.append(self.format_record(packet_type, timestamp, whoiam, packet))
+            self.written_records += 1
 
-            if len(self.data) > 0x1000:
+            if len(self.data) > self.max_buffer_len or time.time() - self.prev_dump_time > self.flush_interval:
                 self.dump_all()
 
-    def dump_all(self):
+    def format_record(self, packet_type, timestamp, whoiam, packet):
+        """
+        :param packet_type: packet decorator character (see packet_types in logfiles/__init__.py)
+        :return: one line of the log file
+        """
+        if timestamp < self.block_min_time:
+            self.block_min_time = timestamp
+        if timestamp > self.block_max_time:
+            self.block_max_time = timestamp
+
+        return "%s%s%s%s%s%s\n" % (
+            packet_type, self.float_to_hex(timestamp), time_whoiam_sep, whoiam, whoiam_packet_sep, packet)
+
+    @property
+    def queued_records(self):
+        """
+        :return: number of records waiting for the writer thread
+        """
+        return len(self.queued)
+
+    def _enqueue(self, record):
+        """
+        Hand a record to the writer thread, applying the overflow policy if the queue is full
+        :param record: tuple of (packet_type, timestamp, whoiam, packet)
+        :return: None
+        """
+        if len(self.queued) >= self.max_queued:
+            if self.overflow_policy == "drop oldest":
+                try:
+                    self.queued.popleft()
+                    self.dropped_records += 1
+                except IndexError:  # the writer thread emptied the queue in the mean time
+                    pass
+            else:
+                while len(self.queued) >= self.max_queued and self.writer_thread.is_alive():
+                    self.writer_wakeup.set()
+                    time.sleep(0.0005)
+
+                if self.writer_error is not None:  # the writer thread died while we were waiting
+                    self.dropped_records += 1
+                    self._raise_writer_error()
+                    return
+
+        self.queued.append(record)
+        if len(self.queued) > self.max_buffer_len:
+            self.writer_wakeup.set()
+
+    def _write_in_background(self):
+        """
+        Writer thread. Writes queued records every flush_interval or whenever max_buffer_len records are waiting
+        :return: None
+        """
+        if self.flush_interval == float("inf"):
+            timeout = None  # only a full buffer or close wakes the thread
+        else:
+            timeout = self.flush_interval
+
+        try:
+            while not self.writer_exit.is_set():
+                self.writer_wakeup.wait(timeout)
+                self.writer_wakeup.clear()
+                self._write_queued()
+        except Exception as error:
+            self.writer_error = error
+            self._drop_queued()
+
+    def _drop_queued(self):
+        """
+        Discard every record that wasn't written and count them as dropped
+        :return: None
         """
-        Write all data in self.data. This minimizes OS system calls.
+        self.dropped_records += len(self.data)
+        self.data.clear()
+        while len(self.queued) > 0:
+            try:
+                self.queued.popleft()
+                self.dropped_records += 1
+            except IndexError:
+                break
+
+    def _raise_writer_error(self):
+        """
+        Raise the exception that stopped the writer thread if it wasn't raised already
         :return: None
         """
-        while len(self.data) > 0:
-            self.data_file.write(self.data.pop(0))
+        if self.writer_error is not None and not self.writer_error_raised:
+            self.writer_error_raised = True
+            raise self.writer_error
 
-    def compress(self):
+    def _write_queued(self):
         """
-        Compress the written text file into a gzip.
+        Format, compress and sync everything currently queued
         :return: None
         """
-        with open(self.file_path, "rb") as file:
-            raw_data = file.read()
+        while len(self.queued) > 0:
+            num_records = min(len(self.queued), self.max_buffer_len)
+            try:
+                for _ in range(num_records):
+                    self.data.append(self.format_record(*self.queued.popleft()))
+            except IndexError:  # records were dropped while formatting
+                pass
 
-        compressed_data = gzip.compress(raw_data)
-        with open(self.file_path, "wb") as file:
-            file.write(compressed_data)
+            self.written_records += len(self.data)
+            self.dump_all()
+            os.fsync(self.data_file.fileno())
+
+    def dump_all(self):
+        """
+        Compress all data in self.data and append it to the file as one gzip member.
+        This minimizes OS system calls. The member is then added to the index
+        :return: None
+        """
+        self.prev_dump_time = time.time()
+        if len(self.data) == 0:
+            return
+
+        block = gzip.compress("".join(self.data).encode('utf-8'), self.compress_level)
+        offset = self.data_file.tell()
+        self.data_file.write(block)
+        self.data_file.flush()
+        self.index_writer.write(offset, len(block), len(self.data), self.block_min_time, self.block_max_time)
+
+        self.data.clear()
+        self.block_min_time = float("inf")
+        self.block_max_time = float("-inf")
 
     def close(self):
         """
-        If the file hasn't been closed, close and compress it.
+        If the file hasn't been closed, write the remaining data and close it.
+        If the writer thread failed and record didn't raise its exception yet, it's raised here
         :return: None
         """
         if self.is_open:
+            self.is_open = False
+            if self.writer_thread is not None:
+                self.writer_exit.set()
+                self.writer_wakeup.set()
+                self.writer_thread.join()
+                self.writer_thread = None
+                if self.writer_error is None:
+                    self._write_queued()  # anything recorded while the thread was exiting
+
+            if self.writer_error is not None:
+                self._drop_queued()
+                try:
+                    self.data_file.close()
+                    self.index_writer.close()
+                except OSError:
+                    pass  # the writer thread's error is the one to report
+                self._raise_writer_error()
+                return
+
             self.dump_all()
             self.data_file.close()
-            self.compress()
-            self.is_open = False
+            self.index_writer.close()
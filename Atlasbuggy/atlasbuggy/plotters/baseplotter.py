@@ -65,7 +65,7 @@ class BasePlotter:
         if "fontsize" not in self.legend_args:
             self.legend_args["fontsize"] = 'x-small'
         if "shadow" not in self.legend_args:
-            self.legend_args["shadow"] = 'True'
+            self.legend_args["shadow"] = True
 
         plt.legend(**self.legend_args)
 
@@ -0,0 +1,136 @@
+"""
+Level of detail for StaticPlotter. A line with millions of points is drawn with only the points that change
+what's on the screen: for each pixel column, the point with the smallest y value and the point with the largest.
+Single-point spikes stay visible.
+
+DecimatedLine keeps the full resolution data. When the axes are zoomed or panned, StaticPlotter calls update
+and the line is decimated again for the visible x range only.
+
+Lines whose x values aren't sorted (an x-y path instead of a time series) can't be split into pixel columns.
+They're split into consecutive chunks of points instead, keeping the points with the smallest and largest
+x and y values of each chunk. Zooming in uses more chunks.
+"""
+
+import numpy as np
+
+points_per_column = 4  # lines with fewer visible points than this per pixel column are drawn as they are
+
+
+def segment_extremes(values, starts):
+    """
+    Find the smallest and largest value of each segment. Segment i is values[starts[i]:starts[i + 1]]
+
+    :param values: 1D numpy array
+    :param starts: increasing indices where each segment begins. The first one should be 0
+    :return: indices of the first smallest and first largest value of each segment. NaN values are ignored
+    """
+    length = len(values)
+    counts = np.diff(np.append(starts, length))
+    positions = np.arange(length)
+
+    indices = []
+    for reduce in (np.fmin, np.fmax):
+        extremes = np.repeat(reduce.reduceat(values, starts), counts)
+        extreme_indices = np.minimum.reduceat(np.where(values == extremes, positions, length), starts)
+        indices.append(np.where(extreme_indices == length, starts, extreme_indices))  # segments of only NaN
+    return indices
+
+
+def min_max_columns(xs, ys, x_min, x_max, num_columns):
+    """
+    Decimate a line with sorted x values
+
+    :param xs: sorted 1D numpy array
+    :param ys: 1D numpy array, the same length as xs
+    :param x_min: left edge of the visible range
+    :param x_max: right edge of the visible range
+    :param num_columns: width of the visible range in pixels
+    :return: decimated xs and ys. The points on either side of the visible range are included so the line
+        reaches the edges
+    """
+    start = max(int(np.searchsorted(xs, x_min, "left")) - 1, 0)
+    stop = min(int(np.searchsorted(xs, x_max, "right")) + 1, len(xs))
+    xs = xs[start:stop]
+    ys = ys[start:stop]
+    if len(xs) <= points_per_column * num_columns or not x_max > x_min:
+        return xs, ys
+
+    # the points outside the visible range get columns of their own (-1 and num_columns)
+    columns = np.floor((xs - x_min) * (num_columns / (x_max - x_min)))
+    np.clip(columns, -1, num_columns, out=columns)
+    starts = np.append(0, np.flatnonzero(np.diff(columns)) + 1)
+
+    min_indices, max_indices = segment_extremes(ys, starts)
+    keep = np.unique(np.concatenate((min_indices, max_indices, [0, len(xs) - 1])))
+    return xs[keep], ys[keep]
+
+
+def min_max_chunks(xs, ys, num_chunks):
+    """
+    Decimate a line with unsorted x values
+
+    :param xs: 1D numpy array
+    :param ys: 1D numpy array, the same length as xs
+    :param num_chunks: number of consecutive chunks to split the points into
+    :return: decimated xs and ys, in their original order
+    """
+    length = len(xs)
+    if length <= points_per_column * num_chunks:
+        return xs, ys
+
+    starts = np.unique(np.linspace(0, length, num_chunks, endpoint=False).astype(np.int64))
+    keep = [[0, length - 1]]
+    keep.extend(segment_extremes(xs, starts))
+    keep.extend(segment_extremes(ys, starts))
+    keep = np.unique(np.concatenate(keep))
+    return xs[keep], ys[keep]
+
+
+class DecimatedLine:
+    def __init__(self, xs, ys):
+        """
+        :param xs: full resolution x values. Kept without copying
+        :param ys: full resolution y values. Kept without copying
+        """
+        self.line = None  # the matplotlib Line2D drawing the data. Set once it's plotted
+        self.xs = np.asarray(xs, dtype=np.float64)
+        self.ys = np.asarray(ys, dtype=np.float64)
+
+        self.x_sorted = bool(np.all(self.xs[1:] >= self.xs[:-1]))  # False if there are NaNs
+        x_min, x_max = self.x_range()
+        self.x_span = x_max - x_min
+
+    def x_range(self):
+        """
+        :return: smallest and largest x value. (0.0, 0.0) if there's no data
+        """
+        if len(self.xs) == 0 or np.all(np.isnan(self.xs)):
+            return 0.0, 0.0
+        if self.x_sorted:
+            return float(self.xs[0]), float(self.xs[-1])
+        return float(np.nanmin(self.xs)), float(np.nanmax(self.xs))
+
+    def decimate(self, x_min, x_max, num_columns):
+        """
+        :param x_min: left edge of the visible range
+        :param x_max: right edge of the visible range
+        :param num_columns: width of the axes in pixels
+        :return: xs and ys to draw
+        """
+        if len(self.xs) == 0:
+            return self.xs, self.ys
+        if x_min > x_max:  # inverted axis
+            x_min, x_max = x_max, x_min
+
+        if self.x_sorted:
+            return min_max_columns(self.xs, self.ys, x_min, x_max, num_columns)
+
+        zoom = self.x_span / (x_max - x_min) if x_max > x_min else 1.0
+        return min_max_chunks(self.xs, self.ys, int(num_columns * max(zoom, 1.0)))
+
+    def update(self, x_min, x_max, num_columns):
+        """
+        Decimate the line again for the visible range
+        :return: None
+        """
+        self.line.set_data(*self.decimate(x_min, x_max, num_columns))
@@ -1,6 +1,9 @@
 """
 Contains the LivePlotter class, a subclass of BasePlotter. This class plots incoming data in real time
 according to properties defined in RobotPlot.
+
+By default only the lines are redrawn each frame (blitting). The rest of the figure is drawn again only when an
+axis range changes, and frames are limited to fps so plot can be called every packet.
 """
 
 import time
@@ -15,7 +18,8 @@ from atlasbuggy.plotters.robotplot import RobotPlot, RobotPlotCollection
 class LivePlotter(BasePlotter):
     initialized = False
 
-    def __init__(self, num_columns, *robot_plots, legend_args=None, lag_cap=0.005):
+    def __init__(self, num_columns, *robot_plots, legend_args=None, lag_cap=0.005, blit=True, fps=30,
+                 axis_margin=0.1):
         """
         Only one LivePlotter instance can run at one time. Multiple interactive matplotlib
         windows don't behave well. This also conserves CPU usage.
@@ -26,6 +30,12 @@ class LivePlotter(BasePlotter):
         :param lag_cap: Constrains how out of sync the plot can be with incoming packets. If the plot
             is causing a time difference greater than the one specified, skip plotting the incoming data
             until the plotter comes back in sync.
+        :param blit: Only redraw the lines each frame. The axes, ticks and legend are drawn once and reused
+            until an axis range changes
+        :param fps: Maximum frames per second. Calls to plot between frames return right away.
+            None means every call draws a frame
+        :param axis_margin: When blitting, axes whose range changed are drawn with this much extra room
+            (a fraction of the range) so scrolling plots don't need a full draw every frame
         """
         if LivePlotter.initialized:
             raise Exception("Can't have multiple plotter instances!")
@@ -57,9 +67,91 @@ class LivePlotter(BasePlotter):
         self.lag_cap = lag_cap
         self.closed = False
 
+        self.blit = blit
+        self.axis_margin = axis_margin if blit else 0.0
+        self.background = None  # the figure without its lines. Saved after every full draw
+        self.axis_limits = {}  # plot name -> limits the axes were last drawn with
+        if self.blit:
+            for line in self.all_lines():
+                line.set_animated(True)  # full draws skip animated lines. They're drawn on the background
+            self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+
+        self.seconds_per_frame = 1 / fps if fps is not None else None
+        self.prev_frame_time = 0.0
+
+        # render time measurements (see render_stats)
+        self.num_frames = 0
+        self.num_full_draws = 0
+        self.num_skipped = 0
+        self.render_time = 0.0
+        self.max_render_time = 0.0
+        self.last_render_time = 0.0
+
         self.init_legend()
         plt.show(block=False)
 
+    def all_lines(self):
+        """
+        :return: list of every line on the figure
+        """
+        lines = []
+        for line in self.lines.values():
+            if isinstance(line, dict):
+                lines.extend(line.values())
+            else:
+                lines.append(line)
+        return lines
+
+    def on_draw(self, event):
+        """
+        Called after every full draw (including ones matplotlib does when the window is resized or a 3D plot
+        is rotated). Save the background and put the lines back on top of it
+        :return: None
+        """
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_lines()
+
+    def draw_lines(self):
+        for line in self.all_lines():
+            line.axes.draw_artist(line)
+
+    def fit_limits(self, drawn_limits, plot_range):
+        """
+        Keep an axis' limits if the plot's range still fits in them without too much empty space.
+        Otherwise give the range axis_margin of extra room on both sides
+
+        :param drawn_limits: (low, high) the axis was last drawn with. None if it hasn't been drawn yet
+        :param plot_range: the plot's current range. None if it doesn't have one
+        :return: (low, high) to draw the axis with
+        """
+        if plot_range is None:
+            return None
+        low, high = plot_range
+        if drawn_limits is None or self.axis_margin == 0:
+            return low, high
+
+        span = high - low
+        if drawn_limits[0] <= low and high <= drawn_limits[1] and \
+                drawn_limits[1] - drawn_limits[0] <= span * (1 + 4 * self.axis_margin):
+            return drawn_limits
+
+        margin = span * self.axis_margin
+        return low - margin, high + margin
+
+    def render_stats(self):
+        """
+        :return: dictionary with the number of frames drawn, how many were full draws, how many calls were
+            skipped to stay under fps and the render time per frame in seconds
+        """
+        return dict(
+            frames=self.num_frames,
+            full_draws=self.num_full_draws,
+            skipped=self.num_skipped,
+            mean_render_time=self.render_time / self.num_frames if self.num_frames > 0 else 0.0,
+            max_render_time=self.max_render_time,
+            last_render_time=self.last_render_time,
+        )
+
     def start_time(self, time0):
         """
         Supply a start time. This keeps all timers in sync
@@ -90,6 +182,15 @@ class LivePlotter(BasePlotter):
         if self.closed or not self.plotter_enabled:
             return False
 
+        if self.seconds_per_frame is not None:
+            current_time = time.perf_counter()
+            if current_time - self.prev_frame_time < self.seconds_per_frame:
+                self.num_skipped += 1
+                return True
+            self.prev_frame_time = current_time
+
+        render_start = time.perf_counter()
+        limits_changed = False
         for plot in self.robot_plots:
             if isinstance(plot, RobotPlot):
                 self.lines[plot.name].set_xdata(plot.data[0])
@@ -108,16 +209,39 @@ class LivePlotter(BasePlotter):
                 return False
 
             if plot.flat:
-                self.axes[plot.name].set_xlim(plot.x_range)
-                self.axes[plot.name].set_ylim(plot.y_range)
+                ranges = (plot.x_range, plot.y_range)
             else:
-                self.axes[plot.name].set_xlim3d(plot.x_range)
-                self.axes[plot.name].set_ylim3d(plot.y_range)
-                self.axes[plot.name].set_zlim3d(plot.z_range)
+                ranges = (plot.x_range, plot.y_range, plot.z_range)
+            drawn = self.axis_limits.get(plot.name, (None,) * len(ranges))
+            limits = tuple(self.fit_limits(drawn_limits, plot_range) for drawn_limits, plot_range in zip(drawn, ranges))
+
+            if limits == drawn:
+                continue
+            self.axis_limits[plot.name] = limits
+            limits_changed = True
+
+            if plot.flat:
+                self.axes[plot.name].set_xlim(limits[0])
+                self.axes[plot.name].set_ylim(limits[1])
+            else:
+                self.axes[plot.name].set_xlim3d(limits[0])
+                self.axes[plot.name].set_ylim3d(limits[1])
+                self.axes[plot.name].set_zlim3d(limits[2])
 
         try:
-            self.fig.canvas.draw()
-            plt.pause(0.005)  # can't be less than ~0.005
+            if not self.blit:
+                self.fig.canvas.draw()
+                plt.pause(0.005)  # can't be less than ~0.005
+                self.num_full_draws += 1
+            else:
+                if limits_changed or self.background is None:
+                    self.fig.canvas.draw()  # on_draw saves the new background and draws the lines
+                    self.num_full_draws += 1
+                else:
+                    self.fig.canvas.restore_region(self.background)
+                    self.draw_lines()
+                self.fig.canvas.blit(self.fig.bbox)
+                self.fig.canvas.flush_events()
 
         except BaseException as error:
             traceback.print_exc()
@@ -126,6 +250,11 @@ class LivePlotter(BasePlotter):
             self.close()
             return False
 
+        self.last_render_time = time.perf_counter() - render_start
+        self.render_time += self.last_render_time
+        self.max_render_time = max(self.max_render_time, self.last_render_time)
+        self.num_frames += 1
+
         return True
 
     def close(self):
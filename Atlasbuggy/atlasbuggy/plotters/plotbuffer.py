@@ -0,0 +1,132 @@
+"""
+PlotBuffer holds a RobotPlot's points in shared memory so the plot can be drawn by another process
+(see processplotter.py).
+
+The robot's process is the only writer. Each axis is a ring of capacity points. Writes are wrapped in
+a sequence number: it's odd while points are being written and even once they're done, so the plot's
+process can copy the points without locks and try again if a write happened during the copy.
+Writing never waits for the reader.
+"""
+
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# header values (int64)
+sequence_index = 0  # odd while the writer is changing the buffer
+count_index = 1  # number of points written since the last replace
+header_length = 8  # 64 bytes. The points start on their own cache line
+
+max_read_attempts = 10  # copies tried before giving up until the next frame
+
+
+class PlotBuffer:
+    def __init__(self, num_axes, capacity):
+        """
+        :param num_axes: 2 for flat plots, 3 for 3D plots
+        :param capacity: number of points kept. Older points are overwritten
+        """
+        self.num_axes = num_axes
+        self.capacity = capacity
+        self.memory = SharedMemory(create=True, size=8 * (header_length + num_axes * capacity))
+        self._map()
+
+        self.header[:] = 0
+        self.read_sequence = -1  # sequence number of the last read (reader side)
+
+    def _map(self):
+        self.header = np.ndarray((header_length,), dtype=np.int64, buffer=self.memory.buf)
+        self.points = np.ndarray((self.num_axes, self.capacity), dtype=np.float64, buffer=self.memory.buf,
+                                 offset=8 * header_length)
+
+        # writing single values through memoryviews is faster than through numpy
+        self.header_view = self.memory.buf.cast("q")
+        self.points_view = self.memory.buf[8 * header_length:].cast("d")
+
+    def __getstate__(self):
+        return self.memory.name, self.num_axes, self.capacity
+
+    def __setstate__(self, state):
+        name, self.num_axes, self.capacity = state
+        self.memory = SharedMemory(name=name)
+        self._map()
+        self.read_sequence = -1
+
+    def append(self, *values):
+        """
+        Writer side. Add one point
+
+        :param values: the point's value on each axis
+        :return: None
+        """
+        header = self.header_view
+        count = header[count_index]
+        header[sequence_index] += 1
+
+        index = count % self.capacity
+        points = self.points_view
+        for axis_num in range(self.num_axes):
+            points[axis_num * self.capacity + index] = values[axis_num]
+
+        header[count_index] = count + 1
+        header[sequence_index] += 1
+
+    def replace(self, values):
+        """
+        Writer side. Replace every point. If there are more points than the capacity, the last ones are kept
+
+        :param values: one list (or array) of values for each axis
+        :return: None
+        """
+        header = self.header
+        header[sequence_index] += 1
+
+        length = min(len(values[0]), self.capacity)
+        for axis_num in range(self.num_axes):
+            if length > 0:
+                self.points[axis_num, :length] = values[axis_num][-length:]
+
+        header[count_index] = length
+        header[sequence_index] += 1
+
+    def read(self):
+        """
+        Reader side. Copy the points in the order they were written
+
+        :return: array with one row per axis. None if nothing changed since the last read or the writer
+            kept changing the buffer while it was copied
+        """
+        header = self.header
+        for _ in range(max_read_attempts):
+            sequence = int(header[sequence_index])
+            if sequence == self.read_sequence:
+                return None
+            if sequence % 2 == 1:
+                continue
+
+            count = int(header[count_index])
+            if count <= self.capacity:
+                points = self.points[:, :count].copy()
+            else:
+                start = count % self.capacity
+                points = np.concatenate((self.points[:, start:], self.points[:, :start]), axis=1)
+
+            if int(header[sequence_index]) == sequence:
+                self.read_sequence = sequence
+                return points
+        return None
+
+    def close(self, unlink=True):
+        """
+        Release the shared memory. Only the process that created the buffer should unlink it
+        :return: None
+        """
+        if self.memory is not None:
+            self.header = None
+            self.points = None
+            self.header_view.release()
+            self.points_view.release()
+            self.memory.close()
+            if unlink:
+                self.memory.unlink()
+            self.memory = None
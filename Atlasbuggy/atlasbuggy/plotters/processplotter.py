@@ -0,0 +1,162 @@
+"""
+Contains the ProcessPlotter class. It runs a LivePlotter in its own process so drawing never takes time
+away from RobotInterface's loop.
+
+The robot plots' append and update only copy values into shared memory (see plotbuffer.py). The plot process
+reads them and draws at its own frame rate. ProcessPlotter has the same methods as LivePlotter, so
+it can replace one in a runner:
+
+    self.plotter = ProcessPlotter(2, self.imu_plot, self.gps_plot)
+    ...
+    def packet_received(self, timestamp, whoiam, packet):
+        self.imu_plot.append(self.imu.eul_x, self.imu.eul_y)
+        if self.plotter.plot() is False:  # the window was closed
+            return False
+"""
+
+import time
+import traceback
+from multiprocessing import Event, Process, Queue
+from queue import Empty
+
+from atlasbuggy.plotters.robotplot import RobotPlot, RobotPlotCollection
+
+
+class ProcessPlotter:
+    def __init__(self, num_columns, *robot_plots, legend_args=None, blit=True, fps=30, axis_margin=0.1,
+                 buffer_length=10000):
+        """
+        :param num_columns: Configure how the subplots are arranged
+        :param robot_plots: RobotPlot or RobotPlotCollection instances. Each one will be a subplot
+        :param legend_args: dictionary of arguments to pass to plt.legend
+        :param blit: see LivePlotter
+        :param fps: frames per second the plot process draws at (at most)
+        :param axis_margin: see LivePlotter
+        :param buffer_length: points kept for robot plots without a max_length
+        """
+        self.robot_plots = [plot for plot in robot_plots if plot.enabled]
+        self.plotter_enabled = len(self.robot_plots) > 0
+
+        for plot in self.robot_plots:
+            if isinstance(plot, RobotPlot):
+                plot.share(buffer_length)
+            elif isinstance(plot, RobotPlotCollection):
+                for subplot in plot.plots:
+                    subplot.share(buffer_length)
+
+        self.exit_event = Event()
+        self.closed_event = Event()  # set by the plot process when the window closes
+        self.commands = Queue()  # calls to pass to the LivePlotter (like draw_dot)
+        self.closed = False
+
+        if self.plotter_enabled:
+            self.process = Process(target=run_plotter, daemon=True, args=(
+                num_columns, self.robot_plots, dict(legend_args=legend_args, blit=blit, fps=None,
+                                                    axis_margin=axis_margin),
+                fps, self.commands, self.exit_event, self.closed_event
+            ))
+            self.process.start()
+        else:
+            self.process = None
+
+    def start_time(self, time0):
+        """
+        Only here to match LivePlotter. The plot process keeps its own time
+        :return: None
+        """
+        pass
+
+    def should_update(self, packet_timestamp):
+        """
+        Plotting doesn't slow the robot down, so appending is always ok
+        :return: True
+        """
+        return True
+
+    def draw_dot(self, sub_plot_name, x, y, z=None, **dot_properties):
+        self.commands.put(("draw_dot", (sub_plot_name, x, y, z), dot_properties))
+
+    def plot(self):
+        """
+        Nothing to draw in this process. New data was already written by the robot plots
+        :return: False if the plot window was closed or the plot process stopped, True otherwise
+        """
+        if self.closed or not self.plotter_enabled:
+            return False
+        if self.closed_event.is_set() or not self.process.is_alive():
+            self.close()
+            return False
+        return True
+
+    def close(self):
+        """
+        Stop the plot process and release the shared memory
+        :return: None
+        """
+        if self.closed:
+            return
+        self.closed = True
+
+        if self.process is not None:
+            self.exit_event.set()
+            self.process.join(2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+
+        for plot in self.robot_plots:
+            subplots = plot.plots if isinstance(plot, RobotPlotCollection) else [plot]
+            for subplot in subplots:
+                if subplot.buffer is not None:
+                    subplot.buffer.close()
+                    subplot.buffer = None
+
+
+def run_plotter(num_columns, robot_plots, plotter_args, fps, commands, exit_event, closed_event):
+    """
+    The plot process. Redraw whenever the robot plots' buffers change, at most fps times a second
+
+    :return: None
+    """
+    from atlasbuggy.plotters.liveplotter import LivePlotter  # pyplot is only imported in this process
+
+    subplots = []
+    for plot in robot_plots:
+        subplots.extend(plot.plots if isinstance(plot, RobotPlotCollection) else [plot])
+
+    try:
+        plotter = LivePlotter(num_columns, *robot_plots, **plotter_args)
+        seconds_per_frame = 1 / fps if fps is not None else 0.0
+        while not exit_event.is_set() and not plotter.closed:
+            frame_start = time.perf_counter()
+
+            changed = False
+            try:
+                while True:
+                    name, args, kwargs = commands.get_nowait()
+                    getattr(plotter, name)(*args, **kwargs)
+                    plotter.background = None  # the figure changed so the next frame is a full draw
+                    changed = True
+            except Empty:
+                pass
+
+            for subplot in subplots:
+                if subplot.read_buffer():
+                    changed = True
+
+            if changed and plotter.plot() is False:
+                break
+
+            # handle window events until the next frame
+            remaining = seconds_per_frame - (time.perf_counter() - frame_start)
+            plotter.fig.canvas.start_event_loop(max(remaining, 0.001))
+
+        plotter.close()
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        closed_event.set()
+        for subplot in subplots:
+            subplot.buffer.close(unlink=False)
@@ -0,0 +1,174 @@
+"""
+RingBuffer holds one axis of a RobotPlot's data in a preallocated NumPy array.
+
+With a max_length, every value is written twice: at its place in the ring and max_length places after it.
+The newest max_length values are then always one contiguous slice of the array, so view can return them
+without copying. The smallest and largest of those values are tracked with monotonic deques, so appending
+is O(1) amortized instead of searching the whole window whenever a value falls out of it.
+
+Without a max_length, the array doubles in size when it fills up and the minimum and maximum are kept
+as they are found.
+"""
+
+from collections import deque
+
+import numpy as np
+
+initial_capacity = 1024  # values allocated at first for axes without a max_length
+
+
+class RingBuffer:
+    def __init__(self, max_length=None):
+        """
+        :param max_length: number of values kept. Older values are dropped. If None, every value is kept
+        """
+        if max_length is not None and max_length < 1:
+            raise ValueError("max_length must be at least 1, not %s" % max_length)
+        self.max_length = max_length
+
+        self.array = np.empty(initial_capacity if max_length is None else 2 * max_length)
+        self.values = memoryview(self.array)  # writing single values through a memoryview is faster than numpy
+        self.count = 0  # values appended since the buffer was created or replaced
+
+        # (count, value) pairs of the values that could become the window's minimum or maximum.
+        # The first pair is the current minimum or maximum. Only used with a max_length
+        self.min_values = deque()
+        self.max_values = deque()
+
+        # only used without a max_length
+        self.min_value = None
+        self.max_value = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["values"]  # memoryviews can't be pickled
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.values = memoryview(self.array)
+
+    def __len__(self):
+        if self.max_length is None:
+            return self.count
+        return min(self.count, self.max_length)
+
+    def append(self, value):
+        """
+        Add a value. If the buffer is full, the oldest value is dropped
+
+        :param value: a float
+        :return: True if a value was dropped
+        """
+        count = self.count
+        max_length = self.max_length
+
+        if max_length is None:
+            if count == len(self.array):
+                self._grow()
+            self.values[count] = value
+            self.count = count + 1
+
+            if self.min_value is None or value < self.min_value:
+                self.min_value = value
+            if self.max_value is None or value > self.max_value:
+                self.max_value = value
+            return False
+
+        index = count % max_length
+        values = self.values
+        values[index] = value
+        values[index + max_length] = value
+        self.count = count + 1
+
+        min_values = self.min_values
+        while len(min_values) > 0 and min_values[-1][1] >= value:
+            min_values.pop()
+        min_values.append((count, value))
+        if min_values[0][0] <= count - max_length:
+            min_values.popleft()
+
+        max_values = self.max_values
+        while len(max_values) > 0 and max_values[-1][1] <= value:
+            max_values.pop()
+        max_values.append((count, value))
+        if max_values[0][0] <= count - max_length:
+            max_values.popleft()
+
+        return count >= max_length
+
+    def _grow(self):
+        array = np.empty(2 * len(self.array))
+        array[:self.count] = self.array[:self.count]
+        self.array = array
+        self.values = memoryview(array)
+
+    def replace(self, values):
+        """
+        Replace every value. If there are more than max_length values, the last ones are kept
+
+        :param values: a list (or array) of floats
+        :return: None
+        """
+        values = np.asarray(values, dtype=np.float64)
+        max_length = self.max_length
+        if max_length is not None:
+            values = values[-max_length:]
+        length = len(values)
+
+        if max_length is None:
+            if length > len(self.array):
+                self.array = np.empty(max(length, initial_capacity))
+                self.values = memoryview(self.array)
+            self.array[:length] = values
+            self.min_value = float(values.min()) if length > 0 else None
+            self.max_value = float(values.max()) if length > 0 else None
+        else:
+            self.array[:length] = values
+            self.array[max_length:max_length + length] = values
+            self.min_values = self._monotonic_deque(values, np.minimum, np.less)
+            self.max_values = self._monotonic_deque(values, np.maximum, np.greater)
+        self.count = length
+
+    @staticmethod
+    def _monotonic_deque(values, extreme, compare):
+        """
+        Build the deque append would have built for these values: every value that's strictly smaller
+        (or larger) than all the values after it
+        """
+        if len(values) == 0:
+            return deque()
+        later_extremes = extreme.accumulate(values[::-1])[::-1]
+        keep = np.append(compare(values[:-1], later_extremes[1:]), True)
+        indices = np.flatnonzero(keep)
+        return deque(zip(indices.tolist(), values[indices].tolist()))
+
+    def view(self):
+        """
+        The buffer's values, oldest first, without copying. It changes when values are appended,
+        so copy it to keep it. Don't write to it
+
+        :return: 1D numpy array
+        """
+        count = self.count
+        max_length = self.max_length
+        if max_length is None or count <= max_length:
+            return self.array[:count]
+        start = count % max_length
+        return self.array[start:start + max_length]
+
+    def minimum(self):
+        """
+        :return: smallest value in the buffer. None if it's empty
+        """
+        if self.max_length is None:
+            return self.min_value
+        return self.min_values[0][1] if len(self.min_values) > 0 else None
+
+    def maximum(self):
+        """
+        :return: largest value in the buffer. None if it's empty
+        """
+        if self.max_length is None:
+            return self.max_value
+        return self.max_values[0][1] if len(self.max_values) > 0 else None
@@ -6,6 +6,9 @@ Contains the RobotPlot and RobotPlotCollection classes. These class define a sub
 
 import mpl_toolkits.mplot3d.axes3d  # loads 3D modules
 
+from atlasbuggy.plotters.plotbuffer import PlotBuffer
+from atlasbuggy.plotters.ringbuffer import RingBuffer
+
 
 class RobotPlot:
     def __init__(self, plot_name, plot_enabled=True, flat_plot=True,
@@ -30,7 +33,6 @@ class RobotPlot:
         self.name = plot_name
         self.flat = flat_plot
         self.enabled = plot_enabled
-        self.max_length = max_length
         self.skip_count = skip_count
         self.skip_counter = 0
 
@@ -63,7 +65,76 @@ class RobotPlot:
             assert len(z_lim) == 2
         self.limits = [x_lim, y_lim, z_lim]
 
-        self.data = [[] for _ in range(2 if flat_plot else 3)]
+        # one RingBuffer per axis. See the data property
+        self.rings = [RingBuffer(max_length) for _ in range(2 if flat_plot else 3)]
+        self._max_length = max_length
+
+        # if not None, data is written here instead of self.rings for a plot in another process (see share)
+        self.buffer = None
+
+    def share(self, capacity):
+        """
+        Write data to shared memory instead of self.rings so it can be plotted in another process
+        (see processplotter.py). append and update only copy values into the buffer, ranges are
+        found by the process that reads it
+
+        :param capacity: number of points to keep if max_length isn't set
+        :return: None
+        """
+        if self.buffer is None:
+            self.buffer = PlotBuffer(len(self.rings), self.max_length if self.max_length is not None else capacity)
+            if len(self.rings[0]) > 0:
+                self.buffer.replace(self.data)  # keep the points appended before sharing
+
+    def read_buffer(self):
+        """
+        Copy the points in the shared buffer to the plot's data and find the ranges of the axes that aren't
+        constrained
+
+        :return: True if the data changed since the last read
+        """
+        values = self.buffer.read()
+        if values is None:
+            return False
+
+        for axis_num, ring in enumerate(self.rings):
+            ring.replace(values[axis_num])
+            if len(ring) > 0:
+                if not self.ranges_contrained[axis_num]:
+                    self.ranges[axis_num] = None
+                self._update_range(ring.minimum(), axis_num)
+                self._update_range(ring.maximum(), axis_num)
+        return True
+
+    @property
+    def data(self):
+        """
+        The plot's values without copying them. They change when values are appended, so copy them to keep them
+
+        :return: a numpy array for each axis
+        """
+        return [ring.view() for ring in self.rings]
+
+    @property
+    def max_length(self):
+        return self._max_length
+
+    @max_length.setter
+    def max_length(self, max_length):
+        """
+        Change the number of data points kept. The newest points are kept
+        """
+        if max_length == self._max_length:
+            return
+        for axis_num, ring in enumerate(self.rings):
+            self.rings[axis_num] = RingBuffer(max_length)
+            self.rings[axis_num].replace(ring.view())
+
+            # dropped points may have been the axis' smallest or largest
+            ring = self.rings[axis_num]
+            if not self.ranges_contrained[axis_num] and len(ring) > 0:
+                self.ranges[axis_num] = [ring.minimum(), ring.maximum()]
+        self._max_length = max_length
 
     def update(self, xs, ys, zs=None):
         """
@@ -89,11 +160,16 @@ class RobotPlot:
             assert len(xs) == len(ys) == len(zs)
             values = [xs, ys, zs]
 
+        if self.buffer is not None:
+            self.buffer.replace(values)
+            return
+
         # Replace the old data and update the range if it's not None
         for axis_num in range(len(values)):
-            self.data[axis_num] = values[axis_num]
+            ring = self.rings[axis_num]
+            ring.replace(values[axis_num])
 
-            if self.ranges[axis_num] is not None and len(values[axis_num]) > 0:
+            if self.ranges[axis_num] is not None and len(ring) > 0:
                 # self.ranges[axis_num][0] = min(values[axis_num])
                 # self.ranges[axis_num][1] = max(values[axis_num])
                 #
@@ -102,8 +178,8 @@ class RobotPlot:
                 #         self.ranges[axis_num][0] = self.limits[axis_num][0]
                 #     if self.ranges[axis_num][1] > self.limits[axis_num][1]:
                 #         self.ranges[axis_num][1] = self.limits[axis_num][1]
-                self._update_range(min(values[axis_num]), axis_num)
-                self._update_range(max(values[axis_num]), axis_num)
+                self._update_range(ring.minimum(), axis_num)
+                self._update_range(ring.maximum(), axis_num)
 
     def append(self, x, y, z=None):
         """
@@ -121,6 +197,10 @@ class RobotPlot:
         if self.skip_count > 0 and self.skip_counter % self.skip_count != 0:
             return
 
+        if self.buffer is not None:
+            self.buffer.append(x, y, z)
+            return
+
         self._append_x(x)
         self._append_y(y)
         if not self.flat:
@@ -161,14 +241,13 @@ class RobotPlot:
         :param axis_num: Axis number to append the value to
         :return: None
         """
-        self.data[axis_num].append(datum)
+        ring = self.rings[axis_num]
+        dropped = ring.append(datum)
         self._update_range(datum, axis_num)
 
-        if self.max_length is not None and len(self.data[axis_num]) > self.max_length:
-            self.data[axis_num].pop(0)
-            if not self.ranges_contrained[axis_num]:
-                self.ranges[axis_num][0] = min(self.data[axis_num])
-                self.ranges[axis_num][1] = max(self.data[axis_num])
+        if dropped and not self.ranges_contrained[axis_num]:
+            self.ranges[axis_num][0] = ring.minimum()
+            self.ranges[axis_num][1] = ring.maximum()
 
     def ranges_set(self):
         for r in self.ranges:
@@ -231,20 +310,26 @@ class RobotPlotCollection:
                 return False
         return True
 
+    def _combined_range(self, axis_num):
+        """
+        Combine the subplots' ranges of an axis. Subplots without a range (no data yet) are left out
+
+        :param axis_num: axis number
+        :return: (low, high) or None if no subplot has a range
+        """
+        ranges = [plot.ranges[axis_num] for plot in self.plots if plot.ranges[axis_num] is not None]
+        if len(ranges) == 0:
+            return None
+        return min(low for low, high in ranges), max(high for low, high in ranges)
+
     @property
     def x_range(self):
-        x_min = min(self.plots, key=lambda plot: plot.x_range[0]).x_range[0]
-        x_max = max(self.plots, key=lambda plot: plot.x_range[1]).x_range[1]
-        return x_min, x_max
+        return self._combined_range(0)
 
     @property
     def y_range(self):
-        y_min = min(self.plots, key=lambda plot: plot.y_range[0]).y_range[0]
-        y_max = max(self.plots, key=lambda plot: plot.y_range[1]).y_range[1]
-        return y_min, y_max
+        return self._combined_range(1)
 
     @property
     def z_range(self):
-        z_min = min(self.plots, key=lambda plot: plot.z_range[0]).z_range[0]
-        z_max = max(self.plots, key=lambda plot: plot.z_range[1]).z_range[1]
-        return z_min, z_max
+        return self._combined_range(2)
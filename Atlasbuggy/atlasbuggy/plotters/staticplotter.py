@@ -1,22 +1,37 @@
 """
 Contains the static plotter class. This class plots data retrieved from a log file
 according to properties defined in RobotPlot.
+
+Long 2D lines are decimated before they're drawn (see decimate.py) and decimated again for the visible range
+when the plot is zoomed, panned or resized.
 """
 
 from matplotlib import pyplot as plt
 from atlasbuggy.plotters.baseplotter import BasePlotter
+from atlasbuggy.plotters.decimate import DecimatedLine
 from atlasbuggy.plotters.robotplot import RobotPlot, RobotPlotCollection
 
 
 class StaticPlotter(BasePlotter):
-    def __init__(self, num_columns, *robot_plots, legend_args=None):
+    # if True, show doesn't open a window. Set for plot exports (see plotexporter.py)
+    headless = False
+
+    def __init__(self, num_columns, *robot_plots, legend_args=None, decimate=True):
         """
         :param num_columns: Configure how the subplots are arranged
         :param robot_plots: RobotPlot or RobotPlotCollection instances. Each one will be a subplot
         :param legend_args: dictionary of arguments to pass to plt.legend
+        :param decimate: If True, 2D lines only draw the smallest and largest points of each pixel column
         """
         super(StaticPlotter, self).__init__(num_columns, legend_args, *robot_plots)
 
+        self.decimate = decimate
+        self.decimated_lines = {}  # plot name -> DecimatedLine of each line on the subplot
+        self.plotted = False
+
+        if not self.plotter_enabled:
+            return
+
         for plot in self.robot_plots:
             if isinstance(plot, RobotPlot):
                 if plot.flat:
@@ -41,20 +56,19 @@ class StaticPlotter(BasePlotter):
         """
         if not self.plotter_enabled:
             return
+        self.plotted = True
 
         for plot in self.robot_plots:
             if isinstance(plot, RobotPlot):
                 if plot.flat:
-                    self.lines[plot.name] = self.axes[plot.name].plot(
-                        plot.data[0], plot.data[1], **plot.properties)[0]
+                    self.lines[plot.name] = self.plot_line(plot.name, plot)
                 else:
                     self.lines[plot.name] = self.axes[plot.name].plot(
                         plot.data[0], plot.data[1], plot.data[2], **plot.properties)[0]
             elif isinstance(plot, RobotPlotCollection):
                 if plot.flat:
                     for subplot in plot.plots:
-                        self.lines[plot.name][subplot.name] = self.axes[plot.name].plot(
-                            subplot.data[0], subplot.data[1], **subplot.properties)[0]
+                        self.lines[plot.name][subplot.name] = self.plot_line(plot.name, subplot)
                 else:
                     for subplot in plot.plots:
                         self.lines[plot.name][subplot.name] = self.axes[plot.name].plot(
@@ -71,5 +85,80 @@ class StaticPlotter(BasePlotter):
 
         self.init_legend()
 
+        if len(self.decimated_lines) > 0:
+            for plot_name in self.decimated_lines.keys():
+                self.axes[plot_name].callbacks.connect("xlim_changed", self.on_xlim_changed)
+            self.fig.canvas.mpl_connect("resize_event", self.on_resize)
+            self.redecimate()
+
+    def plot_line(self, plot_name, robot_plot):
+        """
+        Plot a 2D line. If decimate is True, the line is decimated for the whole range of its data
+
+        :param plot_name: name of the subplot to draw on
+        :param robot_plot: RobotPlot with the data
+        :return: the matplotlib line
+        """
+        axes = self.axes[plot_name]
+        xs, ys = robot_plot.data[0], robot_plot.data[1]
+        if not self.decimate:
+            return axes.plot(xs, ys, **robot_plot.properties)[0]
+
+        decimated_line = DecimatedLine(xs, ys)
+        x_min, x_max = decimated_line.x_range()
+        decimated_xs, decimated_ys = decimated_line.decimate(x_min, x_max, self.axes_width(axes))
+        decimated_line.line = axes.plot(decimated_xs, decimated_ys, **robot_plot.properties)[0]
+
+        if plot_name not in self.decimated_lines:
+            self.decimated_lines[plot_name] = []
+        self.decimated_lines[plot_name].append(decimated_line)
+        return decimated_line.line
+
+    @staticmethod
+    def axes_width(axes):
+        """
+        :return: width of the axes in pixels
+        """
+        return max(int(axes.get_window_extent().width), 1)
+
+    def redecimate(self, axes=None, scale=1.0):
+        """
+        Decimate the lines again for the visible range of the axes
+
+        :param axes: matplotlib axes to update. If None, all of them are updated
+        :param scale: pixels per screen pixel of the image being drawn
+        :return: None
+        """
+        for plot_name, decimated_lines in self.decimated_lines.items():
+            if axes is None or self.axes[plot_name] is axes:
+                x_min, x_max = self.axes[plot_name].get_xlim()
+                width = max(int(self.axes_width(self.axes[plot_name]) * scale), 1)
+                for decimated_line in decimated_lines:
+                    decimated_line.update(x_min, x_max, width)
+
+    def on_xlim_changed(self, axes):
+        self.redecimate(axes)
+
+    def on_resize(self, event):
+        self.redecimate()
+
+    def save(self, file_path, **savefig_args):
+        """
+        Save the figure to an image file. Call plot first
+
+        :param file_path: the image's type comes from its extension (.png, .svg, .pdf...)
+        :param savefig_args: arguments to pass to the figure's savefig (dpi, bbox_inches, etc.)
+        :return: None
+        """
+        dpi = savefig_args.get("dpi")
+        if isinstance(dpi, (int, float)) and dpi != self.fig.dpi:
+            self.redecimate(scale=dpi / self.fig.dpi)  # decimate for the image's resolution
+            self.fig.savefig(file_path, **savefig_args)
+            self.redecimate()
+        else:
+            self.fig.savefig(file_path, **savefig_args)
+
     def show(self):
+        if self.headless:
+            return
         plt.show()
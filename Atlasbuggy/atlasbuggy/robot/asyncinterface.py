@@ -0,0 +1,230 @@
+"""
+AsyncRobotInterface behaves like RobotInterface except all ports are read in one asyncio event loop
+in the main process instead of one process per port. Serial ports are opened as asyncio streams so this
+only works on platforms where serial ports have file descriptors (Linux and OS X).
+"""
+
+import asyncio
+import os
+import time
+
+from atlasbuggy.robot.errors import *
+from atlasbuggy.robot.interface import RobotInterface
+
+
+class AsyncRobotInterface(RobotInterface):
+    def __init__(self, *robot_objects, joystick=None,
+                 log_data=True, log_name=None, log_dir=None,
+                 debug_prints=False, debug_to_log=False, loop_updates_per_second=120, binary_framing=True,
+                 port_cache=True, log_in_background=False, log_overflow_policy="block", port_stats_interval=None,
+                 profile=False):
+        """
+        :param robot_objects: subclasses of RobotObject
+        :param joystick: A subclass instance of BuggyJoystick
+        :param log_data: A boolean indicating whether or not the received data should be written to a logs file
+        :param log_name: The name of the logs file. If None, it will be today's date and time
+        :param log_dir: The directory of the logs file. If None, it will be today's date.
+            See project.py for details
+        :param debug_prints: Enable verbose prints
+        :param loop_updates_per_second: How often loop is called
+        :param binary_framing: Use binary frames for microcontrollers that support them
+        :param port_cache: Remember which device has which whoiam ID between runs
+        :param log_in_background: Write the log file in a separate thread
+        :param log_overflow_policy: "block" or "drop oldest". What to do when the log writer can't keep up
+        :param port_stats_interval: If not None, record every port's stats every port_stats_interval seconds
+        :param profile: Time every callback and find which ones make the loop run slow (see profiler.py)
+        """
+        self.readers = {}
+        self.transports = []
+        self.writers = {}
+
+        super(AsyncRobotInterface, self).__init__(
+            *robot_objects, joystick=joystick, log_data=log_data, log_name=log_name, log_dir=log_dir,
+            debug_prints=debug_prints, debug_to_log=debug_to_log, loop_updates_per_second=loop_updates_per_second,
+            binary_framing=binary_framing, port_cache=port_cache,
+            log_in_background=log_in_background, log_overflow_policy=log_overflow_policy,
+            port_stats_interval=port_stats_interval, profile=profile
+        )
+
+    # ----- port management -----
+
+    def _start_all(self):
+        """
+        Send the start flag. The ports are read in the event loop so no processes are started
+        :return: None
+        """
+        for robot_port in self.ports.values():
+            robot_port.send_start()
+
+    def _stop_all_ports(self):
+        """
+        Close the streams then close the serial ports
+        :return: None
+        """
+        self._close_streams()
+        super(AsyncRobotInterface, self)._stop_all_ports()
+
+    def _close_streams(self):
+        """
+        Close the read and write transports. Writes still queued are discarded
+        :return: None
+        """
+        for transport in self.transports:
+            transport.close()
+        self.transports = []
+        self.writers = {}
+
+    def _write_command(self, whoiam, command):
+        """
+        Queue a command on the port's write stream. The event loop sends it when the port is ready
+        :return: True or False if the command was encoded successfully
+        """
+        if whoiam not in self.writers:
+            return super(AsyncRobotInterface, self)._write_command(whoiam, command)
+
+        robot_port = self.ports[whoiam]
+        try:
+            self.writers[whoiam].write(command.encode('ascii') + robot_port.packet_end_bytes)
+        except (AttributeError, UnicodeEncodeError) as error:
+            robot_port.handle_error(error)
+            return False
+        return True
+
+    def queue_len(self):
+        """
+        Packets are delivered as soon as they're read so nothing is ever waiting in a queue
+        :return: 0
+        """
+        return 0
+
+    # ----- event loop -----
+
+    def _run_loop(self):
+        """
+        Run the port readers and the loop timer until one of them signals to exit
+        :return: None
+        """
+        event_loop = asyncio.new_event_loop()
+        try:
+            event_loop.run_until_complete(self._run_async())
+        finally:
+            self._close_streams()
+            event_loop.run_until_complete(asyncio.sleep(0))  # let the transports finish closing
+            event_loop.close()
+
+    async def _run_async(self):
+        """
+        Open every port as a stream, then wait for the first task to finish.
+        Errors raised in any task are raised here
+        :return: None
+        """
+        for whoiam in self.ports.keys():
+            await self._open_streams(whoiam)
+
+        tasks = [asyncio.ensure_future(self._read_port(whoiam)) for whoiam in self.ports.keys()]
+        tasks.append(asyncio.ensure_future(self._loop_timer()))
+
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        for task in done:
+            task.result()  # raise any errors
+
+    async def _open_streams(self, whoiam):
+        """
+        Open a read stream and a write transport on duplicates of the serial port's file descriptor
+        :param whoiam: whoiam ID of the port
+        :return: None
+        """
+        event_loop = asyncio.get_event_loop()
+        robot_port = self.ports[whoiam]
+        try:
+            file_descriptor = robot_port.serial_ref.fileno()
+        except AttributeError:
+            raise RobotSerialPortNotConfiguredError(
+                "Serial port doesn't have a file descriptor to read asynchronously", robot_port)
+
+        reader = asyncio.StreamReader()
+        read_transport, _ = await event_loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(os.dup(file_descriptor), "rb", buffering=0))
+        write_transport, _ = await event_loop.connect_write_pipe(
+            asyncio.Protocol, os.fdopen(os.dup(file_descriptor), "wb", buffering=0))
+
+        self.readers[whoiam] = reader
+        self.writers[whoiam] = write_transport
+        self.transports.extend([read_transport, write_transport])
+
+    async def _read_port(self, whoiam):
+        """
+        Deliver packets from one port as soon as they arrive
+        :param whoiam: whoiam ID of the port
+        :return: None if a callback signalled to exit
+        """
+        robot_port = self.ports[whoiam]
+        reader = self.readers[whoiam]
+
+        while True:
+            try:
+                incoming = await reader.read(0x1000)
+            except OSError as error:
+                robot_port.handle_error(error)
+                incoming = b""
+
+            if len(incoming) == 0:
+                self._debug_print("Closing all from _read_port")
+                self._close_all()
+                raise RobotSerialPortClosedPrematurelyError("Serial port for '%s' closed" % whoiam)
+
+            packets = robot_port.parse_packets(incoming)
+            if packets is None:
+                self._debug_print("Closing all from _read_port")
+                self._close_all()
+                raise RobotSerialPortReadPacketError("Failed to read packets from '%s'" % whoiam)
+
+            timestamp = time.time()
+            if whoiam in self.superseded_counts:  # latest_only mode. Only the newest packet is received
+                for packet in packets[:-1]:
+                    self._supersede_packet(whoiam, timestamp, packet)
+                packets = packets[-1:]
+
+            dt = timestamp - self.start_time
+            for packet in packets:
+                if not self._receive_packet(dt, whoiam, packet):
+                    return
+
+    async def _loop_timer(self):
+        """
+        Call loop, send commands and update the joystick loop_updates_per_second times a second
+        :return: None if something signalled to exit
+        """
+        seconds_per_loop = 1 / self.loop_ups
+        next_time = time.time()
+
+        while self._are_ports_active():
+            if self.profiler is not None:
+                self.profiler.start_tick()
+
+            if not self._main_loop():  # calls loop no matter what
+                return
+
+            self._send_commands()  # sends all commands in each robot object's command queue
+
+            if self.joystick is not None:
+                if self._update_joystick() is False:
+                    return
+
+            next_time += seconds_per_loop
+            delay = next_time - time.time()
+            self.clock.on_time = delay > 0
+
+            if self.profiler is not None:
+                # packets are received between ticks. A slow receive shows up as the loop running late
+                self.profiler.end_tick(over_budget=not self.clock.on_time)
+            if not self.clock.on_time:
+                next_time = time.time()
+                delay = 0
+            self._check_lag()
+
+            await asyncio.sleep(delay)  # gives the port readers a chance to run
@@ -0,0 +1,254 @@
+"""
+BatchSimulator replays many log files with the same RobotInterfaceSimulator subclass, one log per process.
+
+Each log is simulated in a worker process with the simulator and parser headless (nothing is printed and
+obsolete logs are used without asking). Whatever the simulator's close method returns is sent back to the
+main process, so it has to be picklable (numbers, lists, dictionaries, NumPy arrays...). A log that raises
+an exception doesn't stop the batch. The traceback is kept in its result instead.
+
+for example:
+    class SpeedSimulator(RobotInterfaceSimulator):
+        def __init__(self, file_name, directory):
+            ...
+            super(SpeedSimulator, self).__init__(file_name, directory, self.gps, stream=True)
+
+        def close(self):
+            return max(self.speeds)
+
+    if __name__ == '__main__':
+        report = BatchSimulator(SpeedSimulator, "logs/Jan 31 2017", "logs/Jan 30 2017").run()
+        print(report.report())
+"""
+
+import os
+import pickle
+import time
+import traceback
+from multiprocessing import Pool
+
+from atlasbuggy.logfiles import log_file_type
+from atlasbuggy.logfiles.parser import Parser
+from atlasbuggy.robot.simulator import RobotInterfaceSimulator
+
+
+class SimulationResult:
+    def __init__(self, file_path, result=None, duration=0.0, num_packets=0, error=None, skipped=False):
+        """
+        :param file_path: path to the log file
+        :param result: what the simulator's close method returned
+        :param duration: seconds taken to create and run the simulator
+        :param num_packets: number of lines simulated
+        :param error: traceback of the exception the simulation raised. None if it finished
+        :param skipped: True if the log wasn't simulated because its results were up to date (see plotexporter.py)
+        """
+        self.file_path = file_path
+        self.result = result
+        self.duration = duration
+        self.num_packets = num_packets
+        self.error = error
+        self.skipped = skipped
+
+    def __repr__(self):
+        if self.skipped:
+            status = "up to date"
+        elif self.error is not None:
+            status = "failed"
+        else:
+            status = "%i packets" % self.num_packets
+        return "%s(%s, %s, %0.2fs)" % (self.__class__.__name__, repr(self.file_path), status, self.duration)
+
+
+class SimulationReport:
+    def __init__(self, results, duration, num_processes):
+        """
+        :param results: list of SimulationResult in the order the log files were given
+        :param duration: seconds taken by the whole batch
+        :param num_processes: number of worker processes used
+        """
+        self.results = results
+        self.duration = duration
+        self.num_processes = num_processes
+
+    def __getitem__(self, file_path):
+        """
+        :return: what the simulator returned for a log file
+        """
+        for result in self.results:
+            if result.file_path == file_path:
+                return result.result
+        raise KeyError(file_path)
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def failed(self):
+        return [result for result in self.results if result.error is not None]
+
+    def summary(self):
+        simulation_time = sum(result.duration for result in self.results)
+        return dict(
+            logs=len(self.results),
+            failed=len(self.failed()),
+            skipped=len([result for result in self.results if result.skipped]),
+            packets=sum(result.num_packets for result in self.results),
+            duration=self.duration,
+            simulation_time=simulation_time,  # time spent simulating summed over every process
+            speedup=simulation_time / self.duration if self.duration > 0 else 0.0,
+        )
+
+    def report(self):
+        """
+        :return: a table of every log's timing followed by the tracebacks of failed logs
+        """
+        summary = self.summary()
+        counts = "%i failed" % summary["failed"]
+        if summary["skipped"] > 0:
+            counts += ", %i up to date" % summary["skipped"]
+        lines = ["%i logs (%s) in %0.2fs on %i processes, %0.1fx faster than one at a time" % (
+            summary["logs"], counts, summary["duration"], self.num_processes, summary["speedup"]),
+            "%-50s %10s %9s %12s" % ("log", "packets", "time (s)", "packets/s")]
+
+        for result in self.results:
+            name = os.path.basename(result.file_path)
+            if result.skipped:
+                lines.append("%-50s %10s" % (name, "up to date"))
+            elif result.error is not None:
+                lines.append("%-50s %10s %9.2f %12s" % (name, "failed", result.duration, ""))
+            else:
+                lines.append("%-50s %10i %9.2f %12.0f" % (
+                    name, result.num_packets, result.duration,
+                    result.num_packets / result.duration if result.duration > 0 else 0.0))
+
+        for result in self.failed():
+            lines.append("")
+            lines.append(result.file_path)
+            lines.append(result.error)
+        return "\n".join(lines)
+
+
+class BatchSimulator:
+    def __init__(self, simulator_class, *paths, processes=None, simulator_args=(), simulator_kwargs=None):
+        """
+        :param simulator_class: RobotInterfaceSimulator subclass (or a module level function) called as
+            simulator_class(file_name, directory, *simulator_args, **simulator_kwargs). It has to be importable
+            by the worker processes, so it can't be defined inside a function or in an interactive session
+        :param paths: log files and directories. Every log file in a directory (and its subdirectories) is simulated
+        :param processes: number of worker processes. None means one per CPU
+        :param simulator_args: extra arguments for simulator_class
+        :param simulator_kwargs: extra keyword arguments for simulator_class
+        """
+        self.simulator_class = simulator_class
+        self.simulator_args = tuple(simulator_args)
+        self.simulator_kwargs = simulator_kwargs if simulator_kwargs is not None else {}
+
+        # the directory each log was found in. Log files given directly are in their own directory
+        self.log_roots = {}
+        for path in paths:
+            if os.path.isdir(path):
+                for file_path in find_logs(path):
+                    self.log_roots.setdefault(file_path, os.path.abspath(path))
+            elif os.path.isfile(path):
+                file_path = os.path.abspath(path)
+                self.log_roots.setdefault(file_path, os.path.dirname(file_path))
+            else:
+                raise FileNotFoundError("Log file or directory not found: '%s'" % path)
+        self.file_paths = list(self.log_roots)  # each log once
+
+        if processes is None:
+            processes = os.cpu_count() or 1
+        self.processes = max(1, min(processes, len(self.file_paths)))
+
+    def run(self, print_progress=True):
+        """
+        Simulate every log. Larger logs are started first so one long log doesn't run alone at the end
+
+        :param print_progress: print a line as each log finishes
+        :return: SimulationReport
+        """
+        jobs = [(self.simulator_class, file_path, self.simulator_args, self.simulator_kwargs)
+                for file_path in self.file_paths]
+        return self.run_jobs(simulate_log, jobs, {}, print_progress)
+
+    def run_jobs(self, job_function, jobs, results, print_progress):
+        """
+        Run jobs in the process pool, largest log first
+
+        :param job_function: module level function taking a job and returning a SimulationResult
+        :param jobs: tuples with the log file path second
+        :param results: log file path -> SimulationResult of logs that don't need a job
+        :param print_progress: print a line as each log finishes
+        :return: SimulationReport
+        """
+        jobs = sorted(jobs, key=lambda job: os.path.getsize(job[1]), reverse=True)
+
+        start_time = time.perf_counter()
+        if len(jobs) > 0:
+            with Pool(min(self.processes, len(jobs))) as pool:
+                for job_num, result in enumerate(pool.imap_unordered(job_function, jobs)):
+                    results[result.file_path] = result
+                    if print_progress:
+                        print("%i/%i %s" % (job_num + 1, len(jobs), repr(result)))
+        duration = time.perf_counter() - start_time
+
+        return SimulationReport([results[file_path] for file_path in self.file_paths], duration, self.processes)
+
+
+def find_logs(directory):
+    """
+    :return: absolute paths of every log file in a directory and its subdirectories, sorted by path
+    """
+    file_paths = []
+    for root, directories, file_names in os.walk(directory):
+        for file_name in file_names:
+            if file_name.endswith("." + log_file_type):
+                file_paths.append(os.path.abspath(os.path.join(root, file_name)))
+    return sorted(file_paths)
+
+
+def simulate_log(job):
+    """
+    Run one simulation in a worker process
+
+    :param job: simulator class, log file path, extra arguments and keyword arguments
+    :return: SimulationResult
+    """
+    simulator_class, file_path, args, kwargs = job
+    return run_simulator(simulator_class, file_path, args, kwargs)
+
+
+def run_simulator(simulator_class, file_path, args, kwargs, finish=None):
+    """
+    Create and run a headless simulator
+
+    :param simulator_class: see BatchSimulator
+    :param file_path: log file path
+    :param args: extra arguments for simulator_class
+    :param kwargs: extra keyword arguments for simulator_class
+    :param finish: called as finish(simulator, result) after the simulation. What it returns replaces the result
+    :return: SimulationResult
+    """
+    RobotInterfaceSimulator.headless = True
+    Parser.headless = True
+
+    directory, file_name = os.path.split(file_path)
+    start_time = time.perf_counter()
+    simulator = None
+    try:
+        simulator = simulator_class(file_name, directory, *args, **kwargs)
+        result = simulator.run()
+        if finish is not None:
+            result = finish(simulator, result)
+        pickle.dumps(result)  # fail here instead of in the pool if the result can't be sent back
+        return SimulationResult(file_path, result, time.perf_counter() - start_time, count_packets(simulator))
+    except Exception:
+        return SimulationResult(file_path, None, time.perf_counter() - start_time, count_packets(simulator),
+                                traceback.format_exc())
+
+
+def count_packets(simulator):
+    if simulator is None:
+        return 0
+    return simulator.parser.index - simulator.parser.start_index
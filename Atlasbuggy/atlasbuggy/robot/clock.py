@@ -56,3 +56,78 @@ class Clock:
             return self.offset > 0
         else:
             return False
+
+
+class ReplayClock:
+    """
+    Clock for replaying log files (see replay.py). Time is virtual: each update moves it forward by one loop
+    no matter how long the loop took. The replay is paced so virtual time passes speed times faster than
+    real time, or as fast as possible if speed is None
+    """
+
+    def __init__(self, loops_per_second, speed=1.0):
+        """
+        :param loops_per_second: loops per second of virtual time. If None, each update jumps to next_event_time
+        :param speed: how many virtual seconds pass each real second. None means as fast as possible
+        """
+        if loops_per_second is not None:
+            self.seconds_per_loop = 1 / loops_per_second
+        else:
+            self.seconds_per_loop = None
+        if speed is not None and speed <= 0:
+            raise ValueError("Replay speed must be positive or None: %s" % speed)
+        self.speed = speed
+
+        self.virtual_time = 0.0
+        self.virtual_start = 0.0
+        self.real_start = 0.0
+        self.next_event_time = None  # set by the replay to the time of the next packet
+
+        self.num_loops = 0
+        self.offset = 0
+        self.on_time = True
+
+        # real seconds the replay can be behind before it's running slow. sleep overshoots by about a
+        # millisecond, which is more than a whole loop when speed is high
+        self.lag_tolerance = 0.005
+
+    def start(self, start_time=None):
+        """
+        Start pacing from the current virtual time. start_time is ignored, it's only here to match Clock
+        :return: None
+        """
+        self.virtual_start = self.virtual_time
+        self.real_start = time.perf_counter()
+
+    def real_time(self):
+        """
+        :return: real seconds since start
+        """
+        return time.perf_counter() - self.real_start
+
+    def update(self):
+        """
+        Move virtual time to the next loop and pause if the replay is ahead of speed
+        :return: True if the replay is keeping up with speed. False if the loop ran too slowly
+        """
+        self.num_loops += 1
+        if self.seconds_per_loop is not None:
+            self.virtual_time = self.virtual_start + self.num_loops * self.seconds_per_loop
+        elif self.next_event_time is not None and self.next_event_time > self.virtual_time:
+            self.virtual_time = self.next_event_time
+
+        if self.speed is None:
+            self.on_time = True
+            return True
+
+        self.offset = (self.virtual_time - self.virtual_start) / self.speed - self.real_time()
+        if self.offset > 0:
+            time.sleep(self.offset)
+
+        # offset is measured from the start, so it's the total lag. Late loops are made up by the next ones
+        # not sleeping. Only fall behind if the lag is more than a whole loop and more than lag_tolerance
+        allowed_lag = self.lag_tolerance
+        if self.seconds_per_loop is not None:
+            allowed_lag = max(self.seconds_per_loop / self.speed, allowed_lag)
+        self.on_time = self.offset > -allowed_lag
+        return self.on_time
@@ -0,0 +1,73 @@
+"""
+CommandChannel holds commands a robot object has queued until the interface sends them.
+Robot objects and the interface run in the same process so commands are kept in a plain deque.
+
+Commands can be given a key (for example "v" for a speed command). If a command with the same key is
+still waiting to be sent, it's replaced by the new one so only the latest value is sent each loop.
+"""
+
+import threading
+from collections import deque
+
+
+class CommandChannel:
+    def __init__(self, maxsize=255):
+        """
+        :param maxsize: maximum number of waiting commands. The oldest command is dropped when it's full
+        """
+        self.maxsize = maxsize
+        self.pending = deque()  # [key, packet] pairs in the order they were first queued
+        self.keyed = {}  # key -> pair in self.pending
+        self.lock = threading.Lock()
+
+        self.sent = 0  # number of commands handed to the interface
+        self.coalesced = 0  # number of commands replaced by a newer command with the same key
+        self.dropped = 0  # number of commands discarded because the channel was full
+
+    def put(self, packet, key=None):
+        """
+        Queue a command
+
+        :param packet: A packet (string) to send to the microcontroller
+        :param key: If not None, replace a waiting command with the same key instead of queueing another
+        :return: None
+        """
+        with self.lock:
+            if key is not None:
+                entry = self.keyed.get(key)
+                if entry is not None:
+                    entry[1] = packet
+                    self.coalesced += 1
+                    return
+
+            if len(self.pending) >= self.maxsize:
+                old_key, _ = self.pending.popleft()
+                if old_key is not None:
+                    del self.keyed[old_key]
+                self.dropped += 1
+
+            entry = [key, packet]
+            self.pending.append(entry)
+            if key is not None:
+                self.keyed[key] = entry
+
+    def get_all(self):
+        """
+        Take every waiting command
+
+        :return: list of packets in the order they were queued
+        """
+        with self.lock:
+            if len(self.pending) == 0:
+                return []
+            packets = [packet for _, packet in self.pending]
+            self.pending.clear()
+            self.keyed.clear()
+            self.sent += len(packets)
+        return packets
+
+    def empty(self):
+        return len(self.pending) == 0
+
+    def __len__(self):
+        return len(self.pending)
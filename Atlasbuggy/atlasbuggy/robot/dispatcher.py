@@ -0,0 +1,145 @@
+"""
+PacketDispatcher sorts packets from all ports into one lane per whoiam ID. Lanes with a higher priority
+are served first and each lane can be bounded so a burst from one sensor can't delay the others.
+
+Overflow policies for a full lane:
+    "drop oldest": discard the oldest waiting packet
+    "drop newest": discard the incoming packet
+    "block": stop taking packets from the ports until the lane has room. The lane can go over its bound
+        by one read's worth of packets. Nothing is dropped but other ports wait too
+"""
+
+import time
+from collections import deque
+
+overflow_policies = ("drop oldest", "drop newest", "block")
+
+
+class PacketLane:
+    def __init__(self, whoiam, priority=0, max_queued=None, overflow_policy="drop oldest", latest_only=False):
+        """
+        :param whoiam: whoiam ID of the port feeding this lane
+        :param priority: lanes with higher priorities are served first
+        :param max_queued: maximum number of waiting packets. None means unbounded
+        :param overflow_policy: what happens when the lane is full (see overflow_policies)
+        :param latest_only: only keep the newest packet. Older packets are superseded, not dropped
+        """
+        if overflow_policy not in overflow_policies:
+            raise ValueError("Invalid overflow policy for '%s': %s. Choose from %s" % (
+                whoiam, overflow_policy, overflow_policies))
+
+        self.whoiam = whoiam
+        self.priority = priority
+        self.max_queued = max_queued
+        self.overflow_policy = overflow_policy
+        self.latest_only = latest_only
+
+        self.packets = deque()  # (timestamp, packet)
+        self.dropped = 0
+        self.logged_dropped = 0  # value of dropped when it was last recorded in the log
+
+    def put(self, timestamp, packet):
+        """
+        :return: the (timestamp, packet) this packet replaced if the lane is latest_only. None otherwise
+        """
+        if self.latest_only:
+            superseded = self.packets.popleft() if len(self.packets) > 0 else None
+            self.packets.append((timestamp, packet))
+            return superseded
+
+        if self.max_queued is not None and len(self.packets) >= self.max_queued:
+            if self.overflow_policy == "drop newest":
+                self.dropped += 1
+                return None
+            elif self.overflow_policy == "drop oldest":
+                self.packets.popleft()
+                self.dropped += 1
+
+        self.packets.append((timestamp, packet))
+        return None
+
+    def is_full(self):
+        return self.max_queued is not None and len(self.packets) >= self.max_queued
+
+
+class PacketDispatcher:
+    def __init__(self, lanes, time_budget=None):
+        """
+        :param lanes: list of PacketLane
+        :param time_budget: maximum seconds spent delivering packets each loop. None means deliver everything
+        """
+        self.lanes = {lane.whoiam: lane for lane in lanes}
+        self.time_budget = time_budget
+        self.timer = time.perf_counter
+        self.groups = []  # lanes grouped by priority, highest priority first
+        self._group_lanes()
+
+    def _group_lanes(self):
+        priorities = sorted(set(lane.priority for lane in self.lanes.values()), reverse=True)
+        self.groups = [[lane for lane in self.lanes.values() if lane.priority == priority]
+                       for priority in priorities]
+
+    def put(self, whoiam, timestamp, packet):
+        """
+        Add a packet to its port's lane
+
+        :return: the (timestamp, packet) this packet superseded or None (see PacketLane.put)
+        """
+        lane = self.lanes.get(whoiam)
+        if lane is None:  # a port without a configured lane gets the default settings
+            lane = self.lanes[whoiam] = PacketLane(whoiam)
+            self._group_lanes()
+        return lane.put(timestamp, packet)
+
+    def is_blocked(self):
+        """
+        :return: True if a lane with the "block" policy is full and no more packets should be taken from the ports
+        """
+        for lane in self.lanes.values():
+            if lane.overflow_policy == "block" and lane.is_full():
+                return True
+        return False
+
+    def get(self):
+        """
+        Take packets from the highest priority lanes first until the lanes are empty or the time budget is used.
+        Lanes with the same priority are merged by timestamp
+
+        :return: generator of (whoiam, timestamp, packet) tuples
+        """
+        deadline = None if self.time_budget is None else self.timer() + self.time_budget
+
+        for group in self.groups:
+            while True:
+                next_lane = None
+                for lane in group:
+                    if len(lane.packets) > 0 and (
+                            next_lane is None or lane.packets[0][0] < next_lane.packets[0][0]):
+                        next_lane = lane
+                if next_lane is None:
+                    break
+                if deadline is not None and self.timer() > deadline:
+                    return
+
+                timestamp, packet = next_lane.packets.popleft()
+                yield next_lane.whoiam, timestamp, packet
+
+    def new_drops(self):
+        """
+        :return: list of (whoiam ID, total dropped) for lanes that dropped packets since this was last called
+        """
+        drops = []
+        for lane in self.lanes.values():
+            if lane.dropped != lane.logged_dropped:
+                lane.logged_dropped = lane.dropped
+                drops.append((lane.whoiam, lane.dropped))
+        return drops
+
+    def dropped(self):
+        """
+        :return: dictionary of whoiam ID to the number of packets dropped
+        """
+        return {whoiam: lane.dropped for whoiam, lane in self.lanes.items()}
+
+    def __len__(self):
+        return sum(len(lane.packets) for lane in self.lanes.values())
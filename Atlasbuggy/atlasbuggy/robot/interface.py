@@ -2,9 +2,12 @@
 This class manages all robot ports and pass data received to the corresponding robot objects.
 """
 
+import heapq
+import operator
 import pprint
 import time
 from multiprocessing import Lock, Queue, Value
+from queue import Empty
 import threading
 
 import serial
@@ -13,6 +16,10 @@ import serial.tools.list_ports
 from atlasbuggy.logfiles.logger import Logger
 from atlasbuggy.robot.clock import Clock
 from atlasbuggy.robot.errors import *
+from atlasbuggy.robot.dispatcher import PacketDispatcher, PacketLane
+from atlasbuggy.robot.portcache import PortCache
+from atlasbuggy.robot.profiler import LoopProfiler
+from atlasbuggy.robot.ringbuffer import PacketRingBuffer
 from atlasbuggy.robot.robotport import RobotSerialPort
 from atlasbuggy.robot.robotobject import RobotObject
 from atlasbuggy.robot.robotcollection import RobotObjectCollection
@@ -21,7 +28,10 @@ from atlasbuggy.robot.robotcollection import RobotObjectCollection
 class RobotInterface:
     def __init__(self, *robot_objects, joystick=None,
                  log_data=True, log_name=None, log_dir=None,
-                 debug_prints=False, debug_to_log=False, loop_updates_per_second=120, port_updates_per_second=1000):
+                 debug_prints=False, debug_to_log=False, loop_updates_per_second=120, port_updates_per_second=1000,
+                 binary_framing=True, shared_memory=False, event_driven_ports=False, port_cache=True,
+                 log_in_background=False, log_overflow_policy="block", port_stats_interval=None, profile=False,
+                 dispatch_time_budget=None):
         """
         :param robot_objects: subclasses of RobotObject
         :param joystick: A subclass instance of BuggyJoystick
@@ -31,6 +41,24 @@ class RobotInterface:
             See project.py for details
         :param debug_prints: Enable verbose prints
         :param updates_per_second: How quickly each port process should run.
+        :param binary_framing: Use binary frames for microcontrollers that support them.
+            If False, or if the firmware doesn't support it, newline separated ASCII packets are used
+        :param shared_memory: Pass packets from the ports through shared memory ring buffers instead of
+            the packet queue. Packets too long for a ring slot still go through the queue
+        :param event_driven_ports: Port processes sleep until bytes arrive instead of polling at
+            port_updates_per_second
+        :param port_cache: Remember which device has which whoiam ID between runs (see portcache.py).
+            Devices that had the ID of a disabled object aren't opened
+        :param log_in_background: Write the log file in a separate thread so disk writes don't stall the main loop
+        :param log_overflow_policy: "block" or "drop oldest". What to do when the background writer can't keep up.
+            See log_stats for the number of queued and dropped records
+        :param port_stats_interval: If not None, record every port's stats (see portstats.py) as user packets
+            every port_stats_interval seconds. Each port's stats are tagged "<whoiam>-stats"
+        :param profile: Time every callback and find which ones make the loop run slow (see profiler.py).
+            A summary is printed on close. Use profile_stats to check while running
+        :param dispatch_time_budget: Maximum seconds spent receiving packets each loop. Packets not received
+            in time wait for the next loop. Packets for objects with a higher priority are received first.
+            See dispatcher.py and the priority, max_queued and overflow_policy attributes of RobotObject
         """
 
         self.debug_to_log = debug_to_log  # TODO: put debug messages into a log file
@@ -41,23 +69,32 @@ class RobotInterface:
 
         self.loop_ups = loop_updates_per_second
         self.port_ups = port_updates_per_second
+        self.binary_framing = binary_framing
+        self.event_driven_ports = event_driven_ports
         self.lag_warning_thrown = False  # prevents the terminal from being spammed
+        self.port_stats_interval = port_stats_interval
+        self.prev_stats_time = 0.0
         self.prev_whoiam = ""
 
         if log_dir is None:
             # if no directory provided, use the ":today" flag
             # (follows the project.py directory reference convention)
             log_dir = ":today"
-        self.logger = Logger(log_name, log_dir)
+        self.logger = Logger(log_name, log_dir, background=log_in_background, overflow_policy=log_overflow_policy)
         self.start_time = 0
         if log_data:
-            self.logger.open()
+            self._open_log()
 
         self.joystick = joystick
 
         self.clock = Clock(self.loop_ups)
 
-        # a pipe from all port processes to the main loop
+        if profile:
+            self.profiler = LoopProfiler(self.clock.seconds_per_loop)
+        else:
+            self.profiler = None
+
+        # a pipe from all port processes to the main loop. Each item is a batch of packets from one read
         self.packet_queue = Queue()
         self.packet_counter = Value('i', 0)
         self.port_lock = Lock()
@@ -84,21 +121,33 @@ class RobotInterface:
                 raise RobotObjectInitializationError(
                     "Object passed isn't a RobotObject or RobotObjectCollection:", repr(robot_object))
 
-        # open all available ports using multithreading
-        self.ports = {}
-        threads = []
-        for port_info in serial.tools.list_ports.comports():
-            config_thread = threading.Thread(target=self._configure_port, args=(port_info, self.port_ups))
-            threads.append(config_thread)
-            config_thread.start()
+        # objects that only receive the newest packet each loop and the number of packets skipped since
+        self.superseded_counts = {whoiam: 0 for whoiam, robot_object in self.objects.items()
+                                  if robot_object.latest_only}
 
-        for thread in threads:
-            thread.join()
+        self.dispatcher = None
+        lanes = [PacketLane(whoiam, robot_object.priority, robot_object.max_queued, robot_object.overflow_policy,
+                            robot_object.latest_only)
+                 for whoiam, robot_object in self.objects.items()]
+        if dispatch_time_budget is not None or any(lane.priority != 0 or lane.max_queued is not None
+                                                   for lane in lanes):
+            self.dispatcher = PacketDispatcher(lanes, dispatch_time_budget)
 
-        for port in self.ports.values():
-            if not port.configured:
-                self._print_port_info(port)
-                raise RobotSerialPortNotConfiguredError("Port not configured!", port)
+        if port_cache:
+            self.port_cache = PortCache()
+        else:
+            self.port_cache = None
+
+        self.ports = {}
+        self._open_ports()
+
+        # give each port its own ring buffer. Rings identify ports by index instead of whoiam ID
+        self.ring_ids = []
+        if shared_memory:
+            for whoiam, port in self.ports.items():
+                port.packet_ring = PacketRingBuffer()
+                port.ring_index = len(self.ring_ids)
+                self.ring_ids.append(whoiam)
 
         self._check_objects()  # check that all objects are assigned a port
         self._check_ports()  # check that all ports are assigned an object
@@ -146,29 +195,52 @@ class RobotInterface:
             raise StartSignalledError("Overridden start method threw an exception")
 
         try:
-            while self._are_ports_active():
-                if not self._dequeue_packets():  # calls packet_received if the queue is occupied
-                    break
+            self._run_loop()
+        except KeyboardInterrupt:
+            pass
 
-                if not self._main_loop():  # calls loop no matter what
-                    break
+        self._debug_print("Closing all from run")
+        self._close_all()
 
-                self._send_commands()  # sends all commands in each robot object's command queue
+    def _run_loop(self):
+        """
+        Receive packets and call loop until something signals to exit
+        :return: None
+        """
+        profiler = self.profiler
+        while self._are_ports_active():
+            if profiler is not None:
+                profiler.start_tick()
 
-                if self.joystick is not None:
-                    if self.joystick.update() is False:
-                        break
+            if not self._dequeue_packets():  # calls packet_received if the queue is occupied
+                break
 
-                self.clock.update()  # maintain a constant loop speed
-                if not self.lag_warning_thrown and self.dt > 0.1 and not self.clock.on_time:
-                    print("Warning. Main loop is running slow.")
-                    self.lag_warning_thrown = True
+            if not self._main_loop():  # calls loop no matter what
+                break
 
-        except KeyboardInterrupt:
-            pass
+            self._send_commands()  # sends all commands in each robot object's command queue
 
-        self._debug_print("Closing all from run")
-        self._close_all()
+            if self.joystick is not None:
+                if self._update_joystick() is False:
+                    break
+
+            if profiler is not None:
+                profiler.end_tick()
+
+            self.clock.update()  # maintain a constant loop speed
+            self._check_lag()
+
+    def _check_lag(self):
+        """
+        Warn once if the main loop can't keep up with loop_updates_per_second
+        :return: None
+        """
+        if not self.lag_warning_thrown and self.dt > 0.1 and not self.clock.on_time:
+            if self.profiler is not None and self.profiler.last_culprit() is not None:
+                print("Warning. Main loop is running slow (%s)." % self.profiler.last_culprit())
+            else:
+                print("Warning. Main loop is running slow.")
+            self.lag_warning_thrown = True
 
     # ----- utility methods -----
 
@@ -190,8 +262,67 @@ class RobotInterface:
         """
         self.logger.record(self.dt, tag, string, packet_type=None)
 
+    def profile_stats(self):
+        """
+        :return: latency percentiles and overrun counts for every callback (see LoopProfiler.summary).
+            None if profiling isn't enabled
+        """
+        if self.profiler is None:
+            return None
+        return self.profiler.summary()
+
+    def port_stats(self):
+        """
+        Read every port's health and throughput counters. Safe to call at any time
+
+        :return: dictionary of whoiam ID to a dictionary of stats (see portstats.py for descriptions)
+        """
+        return {whoiam: robot_port.stats.as_dict() for whoiam, robot_port in self.ports.items()}
+
+    def log_stats(self):
+        """
+        :return: dictionary with the number of records written, waiting for the log writer and dropped
+        """
+        return dict(
+            written=self.logger.written_records,
+            queued=self.logger.queued_records,
+            dropped=self.logger.dropped_records,
+        )
+
+    def command_stats(self):
+        """
+        :return: dictionary of whoiam ID to the number of commands sent, coalesced (replaced by a newer
+            command with the same key) and dropped (the command channel was full)
+        """
+        stats = {}
+        for whoiam, robot_object in self.objects.items():
+            if isinstance(robot_object, RobotObject):
+                command_packets = robot_object.command_packets
+            else:
+                command_packets = robot_object.command_packets[whoiam]
+            stats[whoiam] = dict(
+                sent=command_packets.sent,
+                coalesced=command_packets.coalesced,
+                dropped=command_packets.dropped,
+            )
+        return stats
+
     def queue_len(self):
-        return self.packet_counter.value
+        length = self.packet_counter.value
+        for robot_port in self.ports.values():
+            if robot_port.packet_ring is not None:
+                length += len(robot_port.packet_ring)
+        if self.dispatcher is not None:
+            length += len(self.dispatcher)
+        return length
+
+    def dropped_packets(self):
+        """
+        :return: dictionary of whoiam ID to the number of packets dropped because the object's queue was full
+        """
+        if self.dispatcher is None:
+            return {}
+        return self.dispatcher.dropped()
 
     def did_receive(self, arg):
         if isinstance(arg, RobotObject):
@@ -244,6 +375,64 @@ class RobotInterface:
 
     # ----- configuration methods -----
 
+    def _open_log(self):
+        """
+        Open the log file. Replays (see replay.py) override this so they don't write one
+        :return: None
+        """
+        self.logger.open()
+
+    def _open_ports(self):
+        """
+        Open all available ports using multithreading and put them in self.ports.
+        Replays (see replay.py) override this to make ports that play back a log file
+        :return: None
+        """
+        # devices whose cached ID belongs to a disabled object aren't opened. Opening resets most boards,
+        # which then take a couple of seconds to answer
+        needed_infos = []
+        skipped_infos = []
+        for port_info in serial.tools.list_ports.comports():
+            cached_entry = None
+            if self.port_cache is not None:
+                cached_entry = self.port_cache.get(port_info)
+
+            if cached_entry is not None and cached_entry["whoiam"] in self.inactive_ids:
+                self._debug_print("[%s] skipped, last had ID '%s'" % (port_info.device, cached_entry["whoiam"]))
+                skipped_infos.append(port_info)
+            else:
+                needed_infos.append(port_info)
+
+        self._configure_ports(needed_infos)
+
+        # a skipped device may have been reflashed with an ID that's needed now
+        if len(skipped_infos) > 0 and not all(whoiam in self.ports for whoiam in self.objects):
+            self._debug_print("Not all objects found. Opening skipped ports")
+            self._configure_ports(skipped_infos)
+
+        if self.port_cache is not None:
+            self.port_cache.save()
+
+        for port in self.ports.values():
+            if not port.configured:
+                self._print_port_info(port)
+                raise RobotSerialPortNotConfiguredError("Port not configured!", port)
+
+    def _configure_ports(self, port_infos):
+        """
+        Configure ports in parallel, one thread each
+        :param port_infos: instances of serial.tools.list_ports_common.ListPortInfo
+        :return: None
+        """
+        threads = []
+        for port_info in port_infos:
+            config_thread = threading.Thread(target=self._configure_port, args=(port_info, self.port_ups))
+            threads.append(config_thread)
+            config_thread.start()
+
+        for thread in threads:
+            thread.join()
+
     def _configure_port(self, port_info, updates_per_second):
         """
         Initialize a serial port recognized by pyserial.
@@ -254,8 +443,25 @@ class RobotInterface:
         :return: None
         """
         if port_info.vid is not None:
+            cached_entry = None
+            if self.port_cache is not None:
+                cached_entry = self.port_cache.get(port_info)
+
             port = RobotSerialPort(port_info, self.debug_prints,
-                                   self.packet_queue, self.port_lock, self.packet_counter, updates_per_second)
+                                   self.packet_queue, self.port_lock, self.packet_counter, updates_per_second,
+                                   self.binary_framing, self.event_driven_ports,
+                                   None if cached_entry is None else cached_entry["whoiam"])
+
+            self._debug_print("[%s] startup took %0.3fs (%s)" % (
+                port.address, sum(port.startup_times.values()),
+                ", ".join("%s: %0.3fs" % (step, duration) for step, duration in port.startup_times.items())
+            ))
+
+            if port.configured and self.port_cache is not None:
+                if cached_entry is not None and cached_entry["first_packet"] != port.first_packet:
+                    self._debug_print("[%s] first packet changed since last run" % port.address)
+                self.port_cache.update(port)
+
             if port.whoiam in self.ports.keys():
                 self._close_all()
                 self._print_port_info(port)
@@ -273,7 +479,10 @@ class RobotInterface:
         for whoiam in self.objects.keys():
             if whoiam not in self.ports.keys():
                 self._close_all()
-                raise RobotObjectNotFoundError("Failed to assign robot object with ID '%s'" % whoiam)
+                message = "Failed to assign robot object with ID '%s'" % whoiam
+                if self.port_cache is not None and self.port_cache.find_address(whoiam) is not None:
+                    message += " (last seen at '%s')" % self.port_cache.find_address(whoiam)
+                raise RobotObjectNotFoundError(message)
 
     def _check_ports(self):
         """
@@ -343,7 +552,12 @@ class RobotInterface:
         """
         self._debug_print("Closing all ports")
         for robot_port in self.ports.values():
+            hung = robot_port.is_running() == -1
             robot_port.stop()
+            if hung and robot_port.is_alive():
+                robot_port.kill()  # a hung process never sees the exit event
+            if robot_port.packet_ring is not None:
+                robot_port.packet_ring.close()
 
     def _close_all(self):
         """
@@ -361,6 +575,9 @@ class RobotInterface:
         self._stop_all_ports()
         self.logger.close()
 
+        if self.profiler is not None:
+            print(self.profiler.report())
+
     def _are_ports_active(self):
         """
         Using each robot port's is_running method, check if the processes are running properly
@@ -382,6 +599,9 @@ class RobotInterface:
     # ----- event handling -----
 
     def _deliver_packet(self, dt, whoiam, packet):
+        if whoiam in self.superseded_counts:
+            self.objects[whoiam].superseded = self.superseded_counts[whoiam]
+            self.superseded_counts[whoiam] = 0
         try:
             if isinstance(self.objects[whoiam], RobotObject):
                 if self.objects[whoiam].receive(dt, packet) is False:
@@ -413,32 +633,171 @@ class RobotInterface:
 
     def _dequeue_packets(self):
         """
-        dequeue all packets from packet_queue. Pass them to the corresponding robot objects
+        dequeue all packet batches from packet_queue. Pass them to the corresponding robot objects
         :return: what packet_received returns (True or False signalled to exit or not)
         """
-        with self.port_lock:
-            while not self.packet_queue.empty():
-                whoiam, timestamp, packet = self.packet_queue.get()
-                self.packet_counter.value -= 1
-                dt = timestamp - self.start_time
+        if self.profiler is not None:
+            start_time = self.profiler.timer()
+            hooks_time = self.profiler.tick_total
 
-                if self._deliver_packet(dt, whoiam, packet) is False:
-                    return False
-                self.logger.record(dt, whoiam, packet, packet_type=True)
-                if not self._signal_received(dt, whoiam, packet):
-                    return False
+        if self.dispatcher is not None:
+            packets = self._dispatch_packets()
+        elif len(self.ring_ids) > 0:
+            packets = self._conflate_packets(self._merge_ring_packets())
+        else:
+            packets = self._conflate_packets(self._get_queued_packets())
 
-        return True
+        status = True
+        for whoiam, timestamp, packet in packets:
+            if not self._receive_packet(timestamp - self.start_time, whoiam, packet):
+                status = False
+                break
+
+        if self.profiler is not None:
+            self.profiler.add("dequeue", self.profiler.timer() - start_time,
+                              children=self.profiler.tick_total - hooks_time)
+        return status
+
+    def _dispatch_packets(self):
+        """
+        Move packets from the ports into the dispatcher's lanes (unless a full lane is blocking)
+        and record any packets that were dropped
+        :return: generator of (whoiam, timestamp, packet) tuples in priority order
+        """
+        if not self.dispatcher.is_blocked():
+            if len(self.ring_ids) > 0:
+                packets = self._merge_ring_packets()
+            else:
+                packets = self._get_queued_packets()
+
+            for whoiam, timestamp, packet in packets:
+                superseded = self.dispatcher.put(whoiam, timestamp, packet)
+                if superseded is not None:
+                    self._supersede_packet(whoiam, *superseded)
+
+        for whoiam, num_dropped in self.dispatcher.new_drops():
+            self.record("%s-dropped" % whoiam, "%i" % num_dropped)
+
+        return self.dispatcher.get()
+
+    def _conflate_packets(self, packets):
+        """
+        For objects in latest_only mode, keep only the newest packet. The others are logged but not received
+        :param packets: iterable of (whoiam, timestamp, packet) tuples
+        :return: iterable of (whoiam, timestamp, packet) tuples
+        """
+        if len(self.superseded_counts) == 0:
+            return packets
+
+        packets = list(packets)
+        newest = {}
+        for index, (whoiam, timestamp, packet) in enumerate(packets):
+            if whoiam in self.superseded_counts:
+                newest[whoiam] = index
+        if len(newest) == 0:
+            return packets
+
+        kept = []
+        for index, (whoiam, timestamp, packet) in enumerate(packets):
+            if newest.get(whoiam, index) == index:
+                kept.append((whoiam, timestamp, packet))
+            else:
+                self._supersede_packet(whoiam, timestamp, packet)
+        return kept
+
+    def _supersede_packet(self, whoiam, timestamp, packet):
+        """
+        Log a packet that was replaced by a newer one before it was received
+        :return: None
+        """
+        self.logger.record(timestamp - self.start_time, whoiam, packet, packet_type=True)
+        self.superseded_counts[whoiam] += 1
+
+    def _receive_packet(self, dt, whoiam, packet):
+        """
+        Pass a packet to its robot object, record it, then call packet_received
+        :return: True or False signalled to exit or not
+        """
+        profiler = self.profiler
+        if profiler is None:
+            if self._deliver_packet(dt, whoiam, packet) is False:
+                return False
+            self.logger.record(dt, whoiam, packet, packet_type=True)
+            return self._signal_received(dt, whoiam, packet)
+
+        start_time = profiler.timer()
+        if self._deliver_packet(dt, whoiam, packet) is False:
+            return False
+        received_time = profiler.timer()
+        profiler.add("receive", received_time - start_time, whoiam)
+
+        self.logger.record(dt, whoiam, packet, packet_type=True)
+
+        signal_time = profiler.timer()
+        status = self._signal_received(dt, whoiam, packet)
+        profiler.add("packet_received", profiler.timer() - signal_time, whoiam)
+        return status
+
+    def _get_queued_packets(self):
+        """
+        Unpack every batch currently in packet_queue
+        :return: generator of (whoiam, timestamp, packet) tuples
+        """
+        for whoiam, timestamp, sequence, packet in self._get_numbered_packets():
+            yield whoiam, timestamp, packet
+
+    def _get_numbered_packets(self):
+        """
+        Unpack every batch currently in packet_queue with the sequence numbers the ports gave the packets
+        :return: generator of (whoiam, timestamp, sequence number, packet) tuples
+        """
+        while True:
+            try:
+                whoiam, timestamp, packets, first_sequence = self.packet_queue.get_nowait()
+            except Empty:
+                break
+
+            with self.port_lock:
+                self.packet_counter.value -= len(packets)
+
+            for index, packet in enumerate(packets):
+                yield whoiam, timestamp, first_sequence + index, packet
+
+    def _merge_ring_packets(self):
+        """
+        Collect packets from every port's ring buffer and from the packet queue (packets that didn't fit
+        in a ring). They're merged by timestamp, then by the sequence number the port gave them, so packets
+        a port read at the same time keep their order
+        :return: iterator of (whoiam, timestamp, packet) tuples
+        """
+        packet_order = operator.itemgetter(1, 2)  # timestamp, sequence number
+        sources = [sorted(self._get_numbered_packets(), key=packet_order)]  # batches of different ports interleave
+        for robot_port in self.ports.values():
+            if robot_port.packet_ring is not None:
+                sources.append([(self.ring_ids[whoiam_index], timestamp, sequence, packet)
+                                for whoiam_index, timestamp, sequence, packet in robot_port.packet_ring.get_all()])
+
+        for whoiam, timestamp, sequence, packet in heapq.merge(*sources, key=packet_order):
+            yield whoiam, timestamp, packet
 
     def _main_loop(self):
         """
         Call the loop method safely
         :return: True or False signalled to exit or not
         """
+        self._record_port_stats()
         try:
             if self.joystick is not None:
-                self.joystick.update()
-            if self.loop() is False:
+                self._update_joystick()
+
+            if self.profiler is None:
+                status = self.loop()
+            else:
+                start_time = self.profiler.timer()
+                status = self.loop()
+                self.profiler.add("loop", self.profiler.timer() - start_time)
+
+            if status is False:
                 self._debug_print("loop signalled to exit")
                 return False
         except BaseException as error:
@@ -448,11 +807,39 @@ class RobotInterface:
 
         return True
 
+    def _record_port_stats(self):
+        """
+        Record every port's stats if port_stats_interval seconds have passed since they were last recorded
+        :return: None
+        """
+        if self.port_stats_interval is None or self.dt - self.prev_stats_time < self.port_stats_interval:
+            return
+        self.prev_stats_time = self.dt
+
+        for whoiam, robot_port in self.ports.items():
+            self.record("%s-stats" % whoiam, robot_port.stats.to_packet())
+
+    def _update_joystick(self):
+        """
+        Update the joystick, timing it if profiling is enabled
+        :return: what the joystick's update returns
+        """
+        if self.profiler is None:
+            return self.joystick.update()
+
+        start_time = self.profiler.timer()
+        status = self.joystick.update()
+        self.profiler.add("joystick", self.profiler.timer() - start_time)
+        return status
+
     def _send_commands(self):
         """
         Check every robot object. Send all commands if there are any
         :return:
         """
+        if self.profiler is not None:
+            start_time = self.profiler.timer()
+
         for whoiam in self.objects.keys():
             robot_object = self.objects[whoiam]
             if isinstance(robot_object, RobotObject):
@@ -461,15 +848,24 @@ class RobotInterface:
                 command_packets = robot_object.command_packets[whoiam]
             else:
                 break
-            while not command_packets.empty():
-                command = self.objects[whoiam].command_packets.get()
+            for command in command_packets.get_all():
                 self.logger.record(self.dt, whoiam, command, packet_type=False)
 
-                if not self.ports[whoiam].write_packet(command):
+                if not self._write_command(whoiam, command):
                     self._debug_print("Closing all from _send_commands")
                     self._close_all()
                     raise RobotSerialPortWritePacketError("Failed to send command %s to '%s'" % (command, whoiam))
 
+        if self.profiler is not None:
+            self.profiler.add("send_commands", self.profiler.timer() - start_time)
+
+    def _write_command(self, whoiam, command):
+        """
+        Write a command to the port with the given whoiam ID
+        :return: True or False if the write was successful
+        """
+        return self.ports[whoiam].write_packet(command)
+
     def _debug_print(self, *strings, ignore_flag=False):
         if self.debug_prints or ignore_flag:
             string = "".join(strings)
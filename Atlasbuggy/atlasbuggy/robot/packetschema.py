@@ -0,0 +1,133 @@
+"""
+PacketSchema describes the layout of a robot object's packets once so they don't have to be
+split and converted by hand in every receive method.
+
+A schema is a list of fields in the order they appear in the packet. A field is either:
+    a name: the field is parsed with float
+    a (name, converter) pair: the field is parsed with converter (int, str or any function of one string)
+    None: the field is skipped
+
+The schema is compiled into these functions when it's created:
+    fill(target, packet): set each field as an attribute of target
+    receive(target, timestamp, packet): fill with RobotObject.receive's arguments. RobotObject uses
+        this as its receive method if it has a schema and receive isn't overridden
+    parse(packet): return a tuple of every field's value
+    fill_array(array, packet): write each field's value to array[0], array[1], ...
+
+Text packets are split with the separator. Binary packets (bytes) can be unpacked with a struct format instead.
+Extra fields at the end of a packet (like a trailing separator) are ignored.
+
+Example:
+    class IMU(RobotObject):
+        schema = PacketSchema("yaw", "pitch", "roll", ("status", int))
+"""
+
+import keyword
+import struct
+
+
+class PacketSchema:
+    def __init__(self, *fields, separator="\t", header="", struct_format=None):
+        """
+        :param fields: names, (name, converter) pairs or None (see the module description)
+        :param separator: string between fields in text packets
+        :param header: text (or bytes) at the start of every packet that isn't part of the fields
+        :param struct_format: if not None, packets are bytes unpacked with this struct format.
+            The format must produce one value per field. Values are used as is unless a converter is given
+        """
+        self.separator = separator
+        self.header = header
+        self.struct = struct.Struct(struct_format) if struct_format is not None else None
+
+        self.names = []
+        self.converters = []
+        self.indices = []  # position of each named field in the split (or unpacked) packet
+
+        for index, field in enumerate(fields):
+            if field is None:
+                continue
+            if isinstance(field, str):
+                name, converter = field, None
+            elif isinstance(field, tuple) and len(field) == 2:
+                name, converter = field
+            else:
+                raise ValueError("Invalid field: %s. Fields are names, (name, converter) pairs or None" % repr(field))
+
+            if not name.isidentifier() or keyword.iskeyword(name):
+                raise ValueError("Field name isn't a valid attribute name: %s" % repr(name))
+            if name in self.names:
+                raise ValueError("Field name used twice: %s" % repr(name))
+            if converter is None and self.struct is None:
+                converter = float
+
+            self.names.append(name)
+            self.converters.append(converter)
+            self.indices.append(index)
+
+        self.names = tuple(self.names)
+        self.converters = tuple(self.converters)
+        self.indices = tuple(self.indices)
+        self.num_fields = len(fields)
+
+        if self.struct is not None and len(self.struct.unpack(bytes(self.struct.size))) != self.num_fields:
+            raise ValueError("struct format '%s' doesn't have one value for each of the %i fields" % (
+                struct_format, self.num_fields))
+
+        self.fill, self.receive, self.parse, self.fill_array = self._compile()
+
+    def _compile(self):
+        """
+        Generate the source of fill, receive, parse and fill_array so each packet is split once and every
+        field's converter is a local variable instead of a lookup
+
+        :return: fill, receive, parse and fill_array functions
+        """
+        header_length = len(self.header)
+        if self.struct is not None:
+            split = "data = unpack_from(packet, %i)" % header_length
+        elif header_length > 0:
+            split = "data = packet[%i:].split(separator)" % header_length
+        else:
+            split = "data = packet.split(separator)"
+
+        values = []
+        for field_num, (converter, index) in enumerate(zip(self.converters, self.indices)):
+            if converter is None:
+                values.append("data[%i]" % index)
+            else:
+                values.append("c%i(data[%i])" % (field_num, index))
+
+        # a tuple is needed even with a single field
+        tuple_values = ", ".join(values) + ("," if len(values) == 1 else "")
+
+        converter_args = "".join(", c%i" % field_num for field_num in range(len(self.names)))
+        lines = ["def compiled(separator, unpack_from%s):" % converter_args]
+
+        for signature in ("fill(target, packet)", "receive(target, timestamp, packet)"):
+            lines.append("    def %s:" % signature)
+            lines.append("        " + split)
+            for name, value in zip(self.names, values):
+                lines.append("        target.%s = %s" % (name, value))
+
+        lines.append("    def parse(packet):")
+        lines.append("        " + split)
+        lines.append("        return (%s)" % tuple_values)
+
+        lines.append("    def fill_array(array, packet):")
+        lines.append("        " + split)
+        for field_num, value in enumerate(values):
+            lines.append("        array[%i] = %s" % (field_num, value))
+
+        lines.append("    return fill, receive, parse, fill_array")
+
+        namespace = {}
+        exec("\n".join(lines), namespace)
+        return namespace["compiled"](
+            self.separator, self.struct.unpack_from if self.struct is not None else None, *self.converters
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, ", ".join(self.names))
@@ -0,0 +1,168 @@
+"""
+PlotExporter saves the plots of many log files to image files instead of opening a window for each one.
+
+Every log is simulated with a RobotInterfaceSimulator subclass in a process pool (see batchsimulator.py) using
+matplotlib's non-interactive Agg backend, so no windows open and StaticPlotter.show returns right away.
+After the simulation, every StaticPlotter the simulator has as an attribute is saved in each format, named
+after the attribute. The images of logs found in the "logs" directory go in the same subdirectories:
+
+    logs/Jan 31 2017/14;02;33.gzip -> output directory/Jan 31 2017/14;02;33/imu_plotter.png
+
+Image paths only depend on the directory argument, so adding more logs later doesn't move existing images.
+
+Simulators don't need to change. The ones that call plot and show in close work as they are.
+
+Logs whose images are newer than the log and the simulator's source file are skipped, so running the
+same export again only simulates the logs that were added or changed. Logs without any images (their
+simulator has no StaticPlotter or the simulation failed) are simulated every time.
+
+for example:
+    if __name__ == '__main__':
+        report = PlotExporter(MySimulator, "logs", output_directory="plots", formats=("png", "svg")).run()
+        print(report.report())
+"""
+
+import inspect
+import os
+import warnings
+
+from atlasbuggy.plotters.staticplotter import StaticPlotter
+from atlasbuggy.robot.batchsimulator import BatchSimulator, SimulationResult, run_simulator
+
+
+class PlotExporter(BatchSimulator):
+    def __init__(self, simulator_class, *paths, output_directory, formats=("png",), force=False, processes=None,
+                 simulator_args=(), simulator_kwargs=None, savefig_args=None):
+        """
+        :param simulator_class: RobotInterfaceSimulator subclass that plots with StaticPlotter (see BatchSimulator)
+        :param paths: log files and directories
+        :param output_directory: images are saved here. Logs are put in the same subdirectories they
+            have under the directory they were found in. Log files given directly are put in a directory
+            named after the log
+        :param formats: image file extensions. Anything matplotlib can save (png, svg, pdf...)
+        :param force: export every log even if its images are up to date
+        :param processes: number of worker processes. None means one per CPU
+        :param simulator_args: extra arguments for simulator_class
+        :param simulator_kwargs: extra keyword arguments for simulator_class
+        :param savefig_args: arguments to pass to StaticPlotter.save (dpi, bbox_inches, etc.)
+        """
+        super(PlotExporter, self).__init__(simulator_class, *paths, processes=processes,
+                                           simulator_args=simulator_args, simulator_kwargs=simulator_kwargs)
+        if len(formats) == 0:
+            raise ValueError("No image formats given")
+
+        self.output_directory = os.path.abspath(output_directory)
+        self.formats = tuple(image_format.lstrip(".").lower() for image_format in formats)
+        self.force = force
+        self.savefig_args = savefig_args if savefig_args is not None else {}
+
+        # images go out of date when the simulator changes too
+        try:
+            self.source_time = os.path.getmtime(inspect.getsourcefile(simulator_class))
+        except (TypeError, OSError):
+            self.source_time = 0.0
+
+    def image_directory(self, file_path):
+        """
+        :return: directory a log's images are saved in
+        """
+        relative_path = os.path.relpath(file_path, self.log_roots[file_path])
+        return os.path.join(self.output_directory, os.path.splitext(relative_path)[0])
+
+    def is_up_to_date(self, file_path):
+        """
+        :return: True if the log has images in every format and all of them are newer than the log and the
+            simulator's source file
+        """
+        image_paths = find_images(self.image_directory(file_path), self.formats)
+        formats_found = set(os.path.splitext(image_path)[1][1:] for image_path in image_paths)
+        if formats_found != set(self.formats):
+            return False
+
+        source_time = max(os.path.getmtime(file_path), self.source_time)
+        return min(os.path.getmtime(image_path) for image_path in image_paths) >= source_time
+
+    def run(self, print_progress=True):
+        """
+        Export the images of every log that isn't up to date
+
+        :param print_progress: print a line as each log finishes
+        :return: SimulationReport. The result of each log is the list of image paths it has
+        """
+        jobs = []
+        results = {}
+        for file_path in self.file_paths:
+            image_directory = self.image_directory(file_path)
+            if not self.force and self.is_up_to_date(file_path):
+                results[file_path] = SimulationResult(file_path, find_images(image_directory, self.formats),
+                                                      skipped=True)
+            else:
+                jobs.append((self.simulator_class, file_path, self.simulator_args, self.simulator_kwargs,
+                             image_directory, self.formats, self.savefig_args))
+
+        return self.run_jobs(export_log, jobs, results, print_progress)
+
+
+def find_images(directory, formats):
+    """
+    :return: paths of the images in a directory with one of the formats' extensions, sorted by path
+    """
+    if not os.path.isdir(directory):
+        return []
+    image_paths = []
+    for file_name in os.listdir(directory):
+        if os.path.splitext(file_name)[1][1:].lower() in formats:
+            image_paths.append(os.path.join(directory, file_name))
+    return sorted(image_paths)
+
+
+def export_log(job):
+    """
+    Simulate one log in a worker process and save its plots
+
+    :param job: simulator class, log file path, extra arguments and keyword arguments, image directory,
+        formats and savefig arguments
+    :return: SimulationResult
+    """
+    simulator_class, file_path, args, kwargs, image_directory, formats, savefig_args = job
+
+    from matplotlib import pyplot as plt
+    plt.switch_backend("Agg")
+    warnings.filterwarnings("ignore", message=".*non-interactive.*")  # simulators calling plt.show directly
+    StaticPlotter.headless = True
+
+    def save_plots(simulator, result):
+        return save_plotters(simulator, image_directory, formats, savefig_args)
+
+    try:
+        return run_simulator(simulator_class, file_path, args, kwargs, save_plots)
+    finally:
+        plt.close("all")  # workers are reused for other logs
+
+
+def save_plotters(simulator, image_directory, formats, savefig_args):
+    """
+    Save every StaticPlotter attribute of the simulator. Plots that weren't plotted yet are plotted first.
+    Older images in the directory are removed
+
+    :return: paths of the saved images
+    """
+    plotters = []
+    for name, value in sorted(vars(simulator).items()):
+        if isinstance(value, StaticPlotter) and value.plotter_enabled:
+            plotters.append((name, value))
+
+    for image_path in find_images(image_directory, formats):
+        os.remove(image_path)
+    if len(plotters) > 0 and not os.path.isdir(image_directory):
+        os.makedirs(image_directory)
+
+    image_paths = []
+    for name, plotter in plotters:
+        if not plotter.plotted:
+            plotter.plot()
+        for image_format in formats:
+            image_path = os.path.join(image_directory, name + "." + image_format)
+            plotter.save(image_path, **savefig_args)
+            image_paths.append(image_path)
+    return image_paths
@@ -0,0 +1,76 @@
+"""
+Remembers which microcontroller is plugged into which USB device between runs. Devices are identified
+by their USB vendor ID, product ID and serial number so the cache survives ports changing addresses.
+"""
+
+import json
+import os
+
+from atlasbuggy import project
+
+cache_file_name = ".port_cache.json"
+
+
+class PortCache:
+    def __init__(self, directory=":project"):
+        """
+        :param directory: where the cache file is kept. Defaults to the directory the robot is run from
+        """
+        self.file_path = os.path.join(project.interpret_dir(directory), cache_file_name)
+
+        self.entries = {}
+        if os.path.isfile(self.file_path):
+            try:
+                with open(self.file_path) as cache_file:
+                    self.entries = json.load(cache_file)
+            except (ValueError, OSError):
+                self.entries = {}  # a corrupt cache is the same as no cache
+
+    @staticmethod
+    def key(port_info):
+        """
+        :param port_info: A ListPortInfo object returned by serial.tools.list_ports.comports()
+        :return: A string identifying the USB device or None if the device doesn't have a serial number
+        """
+        if port_info.vid is None or port_info.serial_number is None:
+            return None
+        return "%04x:%04x:%s" % (port_info.vid, port_info.pid, port_info.serial_number)
+
+    def get(self, port_info):
+        """
+        :return: dictionary containing the whoiam ID, first packet and last address of the device. None if unknown
+        """
+        key = self.key(port_info)
+        if key is None:
+            return None
+        return self.entries.get(key)
+
+    def find_address(self, whoiam):
+        """
+        :return: The address the device with this whoiam ID was last seen at. None if it was never seen
+        """
+        for entry in self.entries.values():
+            if entry["whoiam"] == whoiam:
+                return entry["address"]
+        return None
+
+    def update(self, robot_port):
+        """
+        Remember a port that was configured successfully
+        :param robot_port: RobotSerialPort instance
+        :return: None
+        """
+        key = self.key(robot_port.port_info)
+        if key is not None and robot_port.whoiam is not None:
+            self.entries[key] = dict(
+                whoiam=robot_port.whoiam,
+                first_packet=robot_port.first_packet,
+                address=robot_port.address,
+            )
+
+    def save(self):
+        try:
+            with open(self.file_path, "w") as cache_file:
+                json.dump(self.entries, cache_file, indent=4, sort_keys=True)
+        except OSError as error:
+            print("Failed to save port cache:", error)
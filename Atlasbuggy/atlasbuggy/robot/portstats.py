@@ -0,0 +1,50 @@
+"""
+PortStats is a block of shared memory each RobotSerialPort writes its health and throughput counters to.
+The port process is the only writer, so RobotInterface can read the counters at any time without locks.
+
+Stats (in the order they're logged):
+    heartbeat: the last time the port's loop ran (time.time())
+    reads: number of serial reads that returned bytes
+    bytes_read: total number of bytes read
+    packets: number of packets split or framed from the bytes read
+    decode_errors: packets that couldn't be decoded and corrupt frames
+    put_latency: seconds the last batch took to hand to the main process
+    max_put_latency: longest put_latency so far
+    max_burst: most bytes returned by one read
+"""
+
+from multiprocessing.sharedctypes import RawArray
+
+stat_names = (
+    "heartbeat", "reads", "bytes_read", "packets", "decode_errors", "put_latency", "max_put_latency", "max_burst"
+)
+stat_indices = {name: index for index, name in enumerate(stat_names)}
+
+
+class PortStats:
+    def __init__(self):
+        # doubles are written in one instruction so a reader never sees half a value
+        self.values = RawArray('d', len(stat_names))
+
+    def __getitem__(self, name):
+        return self.values[stat_indices[name]]
+
+    def __setitem__(self, name, value):
+        self.values[stat_indices[name]] = value
+
+    def add(self, name, amount=1):
+        self.values[stat_indices[name]] += amount
+
+    def set_max(self, name, value):
+        index = stat_indices[name]
+        if value > self.values[index]:
+            self.values[index] = value
+
+    def as_dict(self):
+        return dict(zip(stat_names, self.values[:]))
+
+    def to_packet(self):
+        """
+        :return: all stats as a tab separated string (in the order of stat_names)
+        """
+        return "\t".join("%0.6f" % value if value % 1 else "%i" % value for value in self.values[:])
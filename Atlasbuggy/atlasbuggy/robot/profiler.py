@@ -0,0 +1,182 @@
+"""
+LoopProfiler times RobotInterface's callbacks (receive, packet_received, loop, the joystick update,
+sending commands and dequeuing packets) and keeps a latency histogram for each callback and whoiam ID.
+
+Every loop is a tick. When a tick takes longer than the Clock's budget (1 / loop_updates_per_second),
+the overrun is blamed on the callback that took the most time during that tick.
+"""
+
+import math
+import time
+from collections import deque
+
+
+class LatencyHistogram:
+    """Counts durations in logarithmic buckets. Percentiles are accurate to about 12%"""
+
+    min_time = 1e-6  # everything faster than a microsecond is in the first bucket
+    buckets_per_decade = 20
+    num_buckets = 7 * buckets_per_decade + 1  # up to 10 seconds
+
+    def __init__(self):
+        self.counts = [0] * self.num_buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, duration):
+        if duration <= self.min_time:
+            bucket = 0
+        else:
+            bucket = min(int(math.ceil(math.log10(duration / self.min_time) * self.buckets_per_decade)),
+                         self.num_buckets - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def percentile(self, fraction):
+        """
+        :param fraction: 0.0...1.0
+        :return: upper bound of the bucket containing the percentile in seconds
+        """
+        if self.count == 0:
+            return 0.0
+
+        target = fraction * self.count
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(self.min_time * 10 ** (bucket / self.buckets_per_decade), self.max)
+        return self.max
+
+    def summary(self):
+        return dict(
+            count=self.count,
+            mean=self.total / self.count if self.count > 0 else 0.0,
+            p50=self.percentile(0.5),
+            p95=self.percentile(0.95),
+            p99=self.percentile(0.99),
+            max=self.max,
+        )
+
+
+class LoopProfiler:
+    def __init__(self, seconds_per_loop, max_overruns_kept=100):
+        """
+        :param seconds_per_loop: each tick's time budget. None means ticks never overrun
+        :param max_overruns_kept: number of recent overruns to remember
+        """
+        self.seconds_per_loop = seconds_per_loop
+        self.timer = time.perf_counter
+
+        self.histograms = {}  # (hook, whoiam) -> LatencyHistogram. whoiam is None for hooks not tied to a port
+        self.tick_histogram = LatencyHistogram()
+        self.overrun_counts = {}  # (hook, whoiam) -> number of overruns blamed on it
+        self.recent_overruns = deque(maxlen=max_overruns_kept)  # (time, tick duration, hook, whoiam, hook time)
+        self.num_ticks = 0
+        self.num_overruns = 0
+
+        self.tick_start = None
+        self.tick_times = {}  # time each hook took during the current tick
+        self.tick_total = 0.0  # sum of tick_times
+
+    def start_tick(self):
+        self.tick_start = self.timer()
+
+    def add(self, hook, duration, whoiam=None, children=0.0):
+        """
+        Record how long a hook took
+
+        :param hook: name of the callback
+        :param duration: seconds
+        :param whoiam: whoiam ID if the hook is called for a specific port
+        :param children: time spent in other timed hooks called during this one. It's not counted
+            twice when deciding which hook caused an overrun
+        :return: None
+        """
+        key = (hook, whoiam)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(duration)
+
+        exclusive = duration - children
+        self.tick_times[key] = self.tick_times.get(key, 0.0) + exclusive
+        self.tick_total += exclusive
+
+    def end_tick(self, over_budget=None):
+        """
+        Close the current tick. If it went over budget, blame the hook that took the most time
+
+        :param over_budget: If None, the tick is over budget if it took longer than seconds_per_loop.
+            Otherwise, the caller decides (when hooks also run between ticks)
+        :return: None
+        """
+        if self.tick_start is None:
+            return
+        duration = self.timer() - self.tick_start
+        self.tick_histogram.record(duration)
+        self.num_ticks += 1
+
+        if over_budget is None:
+            over_budget = self.seconds_per_loop is not None and duration > self.seconds_per_loop
+
+        if over_budget and len(self.tick_times) > 0:
+            culprit = max(self.tick_times, key=self.tick_times.get)
+            self.overrun_counts[culprit] = self.overrun_counts.get(culprit, 0) + 1
+            self.num_overruns += 1
+            self.recent_overruns.append((time.time(), duration, culprit[0], culprit[1], self.tick_times[culprit]))
+
+        self.tick_times = {}
+        self.tick_total = 0.0
+        self.tick_start = None
+
+    def last_culprit(self):
+        """
+        :return: description of the hook blamed for the most recent overrun. None if there weren't any
+        """
+        if len(self.recent_overruns) == 0:
+            return None
+        _, duration, hook, whoiam, hook_time = self.recent_overruns[-1]
+        name = hook if whoiam is None else "%s:%s" % (hook, whoiam)
+        return "%s took %0.1fms of a %0.1fms loop" % (name, hook_time * 1000, duration * 1000)
+
+    def summary(self):
+        """
+        :return: dictionary containing tick and overrun totals, the tick histogram, the histogram
+            and overrun count for every hook and the most recent overruns. Hooks are keyed by "hook" or "hook:whoiam"
+        """
+        hooks = {}
+        for (hook, whoiam), histogram in self.histograms.items():
+            name = hook if whoiam is None else "%s:%s" % (hook, whoiam)
+            hooks[name] = histogram.summary()
+            hooks[name]["overruns"] = self.overrun_counts.get((hook, whoiam), 0)
+
+        return dict(
+            ticks=self.num_ticks,
+            overruns=self.num_overruns,
+            tick=self.tick_histogram.summary(),
+            hooks=hooks,
+            recent_overruns=list(self.recent_overruns),
+        )
+
+    def report(self):
+        """
+        :return: a table of every hook's latencies in milliseconds, slowest total time first
+        """
+        summary = self.summary()
+        lines = ["%i ticks, %i over budget" % (summary["ticks"], summary["overruns"]),
+                 "%-30s %9s %9s %9s %9s %9s %9s" % ("hook", "count", "p50", "p95", "p99", "max", "overruns")]
+
+        rows = [("tick", summary["tick"], summary["overruns"])]
+        for name, stats in sorted(summary["hooks"].items(), key=lambda item: -item[1]["mean"] * item[1]["count"]):
+            rows.append((name, stats, stats["overruns"]))
+
+        for name, stats, overruns in rows:
+            lines.append("%-30s %9i %9.3f %9.3f %9.3f %9.3f %9i" % (
+                name, stats["count"], stats["p50"] * 1000, stats["p95"] * 1000, stats["p99"] * 1000,
+                stats["max"] * 1000, overruns))
+        return "\n".join(lines)
@@ -0,0 +1,257 @@
+"""
+RobotInterfaceReplay runs a RobotInterface subclass against a log file instead of serial ports.
+
+Unlike RobotInterfaceSimulator, the interface's own start, packet_received, loop and close methods run.
+Time is virtual (see ReplayClock in clock.py): every loop moves dt forward by 1 / loop_updates_per_second
+and the packets logged up to dt are received before loop is called, the same order RobotInterface uses.
+The replay can be paced at real time (speed=1), N times faster (speed=N) or as fast as possible (speed=None).
+
+Commands sent by the interface are counted but go nowhere, and no log file is written.
+
+The time spent in receive, packet_received and loop is measured so controller code can be benchmarked
+on recorded data. See RobotInterfaceReplay.summary.
+
+for example:
+    replay = RobotInterfaceReplay(MyRobot, "file name", "directory in logs", speed=None)
+    replay.run()
+    print(replay.report())
+"""
+
+import time
+
+from atlasbuggy.logfiles.parser import Parser
+from atlasbuggy.robot.clock import ReplayClock
+from atlasbuggy.robot.interface import RobotInterface
+
+
+class ReplayPort:
+    """Stands in for RobotSerialPort. Only keeps the port's first packet and counts commands"""
+
+    def __init__(self, whoiam, first_packet):
+        self.whoiam = whoiam
+        self.first_packet = first_packet
+        self.address = "replay"
+        self.port_info = None
+        self.configured = True
+        self.packet_ring = None
+        self.stats = None
+
+        self.num_commands = 0
+
+    def send_start(self):
+        pass
+
+    def start(self):
+        pass
+
+    def is_running(self):
+        return 1
+
+    def is_alive(self):
+        return False
+
+    def write_packet(self, packet):
+        self.num_commands += 1
+        return True
+
+    def stop(self):
+        pass
+
+    def kill(self):
+        pass
+
+
+class ReplayInterfaceMixin:
+    """
+    Put in front of a RobotInterface subclass so it receives packets from a RobotInterfaceReplay
+    instead of serial ports. Don't use this directly, RobotInterfaceReplay creates the class
+    """
+
+    _replay = None  # the RobotInterfaceReplay feeding this interface. Set before __init__ is called
+
+    @property
+    def dt(self):
+        return self._replay.clock.virtual_time
+
+    def _open_log(self):
+        pass
+
+    def start(self):
+        self.start_time = 0.0  # packets are timestamped with their logged time
+        return super(ReplayInterfaceMixin, self).start()
+
+    def _open_ports(self):
+        for whoiam in self.objects.keys():
+            self.ports[whoiam] = ReplayPort(whoiam, self._replay.first_packets.get(whoiam, ""))
+
+    def _are_ports_active(self):
+        return not self._replay.finished()
+
+    def _get_queued_packets(self):
+        replay = self._replay
+        for timestamp, whoiam, packet in replay.packets_until(self.clock.virtual_time):
+            if whoiam in self.objects:
+                yield whoiam, timestamp + self.start_time, packet
+
+    def _record_port_stats(self):
+        pass
+
+    def port_stats(self):
+        return {}
+
+    def _deliver_packet(self, dt, whoiam, packet):
+        start_time = time.process_time()
+        status = super(ReplayInterfaceMixin, self)._deliver_packet(dt, whoiam, packet)
+        self._replay.callback_times["receive"] += time.process_time() - start_time
+        return status
+
+    def packet_received(self, timestamp, whoiam, packet):
+        start_time = time.process_time()
+        status = super(ReplayInterfaceMixin, self).packet_received(timestamp, whoiam, packet)
+        self._replay.callback_times["packet_received"] += time.process_time() - start_time
+        return status
+
+    def loop(self):
+        start_time = time.process_time()
+        status = super(ReplayInterfaceMixin, self).loop()
+        self._replay.callback_times["loop"] += time.process_time() - start_time
+        return status
+
+
+class RobotInterfaceReplay:
+    def __init__(self, interface_class, file_name, directory=None, speed=1.0, start_index=0, end_index=-1,
+                 start_time=None, end_time=None, interface_args=(), interface_kwargs=None):
+        """
+        :param interface_class: RobotInterface subclass. It's created with interface_args and interface_kwargs
+            like it would be normally. Its robot objects receive the logged packets with their whoiam IDs
+        :param file_name: log file name or number
+        :param directory: directory to search in
+        :param speed: virtual seconds per real second. 1 is real time. None replays as fast as possible
+        :param start_index: line number to start at
+        :param end_index: line number to stop at. -1 means the end of the file
+        :param start_time: replay from this time in seconds instead of start_index
+        :param end_time: replay until this time in seconds instead of end_index
+        :param interface_args: arguments for interface_class
+        :param interface_kwargs: keyword arguments for interface_class
+        """
+        if not (isinstance(interface_class, type) and issubclass(interface_class, RobotInterface)):
+            raise ValueError("%s isn't a RobotInterface subclass" % repr(interface_class))
+
+        self.parser = Parser(file_name, directory, start_index, end_index, stream=True,
+                             start_time=start_time, end_time=end_time)
+        self.first_packets = {}  # whoiam ID -> first packet (logged with a timestamp of -1)
+        self.next_packet = None  # (timestamp, whoiam, packet) of the next object packet in the log
+        self.num_packets = 0
+
+        if self.parser.start_index > 0:
+            self.read_first_packets(file_name, self.parser.directory)
+        self.advance()
+
+        self.callback_times = dict(receive=0.0, packet_received=0.0, loop=0.0)  # process time of each callback
+        self.real_time = 0.0
+        self.cpu_time = 0.0
+
+        replay_class = type("Replay" + interface_class.__name__, (ReplayInterfaceMixin, interface_class), {})
+        self.interface = replay_class.__new__(replay_class)
+        self.interface._replay = self
+
+        self.clock = ReplayClock(None, speed)  # dt is needed while the interface is created
+        if self.next_packet is not None:
+            self.clock.virtual_time = self.next_packet[0]
+
+        if interface_kwargs is None:
+            interface_kwargs = {}
+        self.interface.__init__(*interface_args, **interface_kwargs)
+
+        virtual_time = self.clock.virtual_time
+        self.clock = ReplayClock(self.interface.loop_ups, speed)
+        self.clock.virtual_time = virtual_time
+        self.interface.clock = self.clock
+
+    def read_first_packets(self, file_name, directory):
+        """
+        Find the first packets at the start of the log when replaying from the middle of it
+        :return: None
+        """
+        parser = Parser(file_name, directory, stream=True)
+        for index, packet_type, timestamp, whoiam, packet in parser:
+            if timestamp != -1:
+                break
+            if packet_type == "object":
+                self.first_packets[whoiam] = packet
+        parser.close()
+
+    def advance(self):
+        """
+        Find the next object packet in the log. First packets are kept in self.first_packets
+        :return: None
+        """
+        self.next_packet = None
+        for index, packet_type, timestamp, whoiam, packet in self.parser:
+            if packet_type != "object":
+                continue
+            if timestamp == -1:
+                self.first_packets[whoiam] = packet
+                continue
+            self.next_packet = timestamp, whoiam, packet
+            break
+
+    def packets_until(self, virtual_time):
+        """
+        :param virtual_time: current time of the replay
+        :return: generator of (timestamp, whoiam, packet) for every logged packet up to virtual_time
+        """
+        while self.next_packet is not None and self.next_packet[0] <= virtual_time:
+            packet = self.next_packet
+            self.num_packets += 1
+            self.advance()
+            yield packet
+
+        if self.next_packet is not None:
+            self.clock.next_event_time = self.next_packet[0]
+
+    def finished(self):
+        return self.next_packet is None
+
+    def run(self):
+        """
+        Run the interface until the log runs out or the interface signals to exit
+        :return: summary of the replay (see summary)
+        """
+        cpu_start = time.process_time()
+        self.interface.run()
+        self.cpu_time = time.process_time() - cpu_start
+        self.real_time = self.clock.real_time()
+        self.parser.close()
+        return self.summary()
+
+    def summary(self):
+        simulated_time = self.clock.virtual_time - self.clock.virtual_start
+        controller_time = sum(self.callback_times.values())
+        commands = sum(port.num_commands for port in self.interface.ports.values())
+        return dict(
+            simulated_time=simulated_time,
+            real_time=self.real_time,
+            speed=simulated_time / self.real_time if self.real_time > 0 else 0.0,
+            loops=self.clock.num_loops,
+            packets=self.num_packets,
+            commands=commands,
+            cpu_time=self.cpu_time,  # includes parsing the log
+            controller_time=controller_time,  # process time spent in receive, packet_received and loop
+            controller_time_per_second=controller_time / simulated_time if simulated_time > 0 else 0.0,
+            callback_times=dict(self.callback_times),
+        )
+
+    def report(self):
+        summary = self.summary()
+        lines = [
+            "%0.1fs simulated in %0.2fs (%0.1fx real time), %i loops, %i packets, %i commands" % (
+                summary["simulated_time"], summary["real_time"], summary["speed"], summary["loops"],
+                summary["packets"], summary["commands"]),
+            "controller CPU: %0.3fms per simulated second" % (summary["controller_time_per_second"] * 1000),
+        ]
+        for callback, callback_time in summary["callback_times"].items():
+            per_second = callback_time / summary["simulated_time"] if summary["simulated_time"] > 0 else 0.0
+            lines.append("    %-16s %9.3fs total %9.3fms per simulated second" % (
+                callback, callback_time, per_second * 1000))
+        return "\n".join(lines)
@@ -0,0 +1,103 @@
+"""
+A single producer, single consumer ring buffer in shared memory. Each RobotSerialPort writes packets
+into its own ring and RobotInterface polls the head and tail counters. Nothing is pickled and no locks are taken.
+"""
+
+import struct
+from multiprocessing.shared_memory import SharedMemory
+
+counter_format = struct.Struct("<Q")
+slot_header = struct.Struct("<QdHH")  # sequence number, timestamp, whoiam index, payload length
+
+# head and tail are on separate cache lines so the producer and consumer don't fight over them
+head_offset = 0
+tail_offset = 64
+slots_offset = 128
+
+
+class PacketRingBuffer:
+    def __init__(self, num_slots=1024, slot_size=256):
+        """
+        :param num_slots: number of packets the ring can hold before the producer has to fall back
+        :param slot_size: maximum payload length of a packet in bytes
+        """
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self.slot_stride = slot_header.size + slot_size
+
+        self.memory = SharedMemory(create=True, size=slots_offset + num_slots * self.slot_stride)
+        self.buffer = self.memory.buf
+        counter_format.pack_into(self.buffer, head_offset, 0)
+        counter_format.pack_into(self.buffer, tail_offset, 0)
+
+        # each side keeps a local copy of the counter it owns
+        self.head = 0
+        self.tail = 0
+
+    def put(self, whoiam_index, timestamp, packet, sequence=0):
+        """
+        Producer side. Copy a packet into the next free slot
+
+        :param whoiam_index: index of the port's whoiam ID (assigned by RobotInterface)
+        :param timestamp: time the packet arrived
+        :param packet: ASCII packet (string)
+        :param sequence: the packet's number in the order the port read them
+        :return: False if the packet is too long for a slot or the ring is full
+        """
+        payload = packet.encode('ascii')
+        length = len(payload)
+        if length > self.slot_size:
+            return False
+
+        tail = counter_format.unpack_from(self.buffer, tail_offset)[0]
+        if self.head - tail >= self.num_slots:
+            return False
+
+        offset = slots_offset + (self.head % self.num_slots) * self.slot_stride
+        slot_header.pack_into(self.buffer, offset, sequence, timestamp, whoiam_index, length)
+        offset += slot_header.size
+        self.buffer[offset: offset + length] = payload
+
+        # publish the slot only after it's written
+        self.head += 1
+        counter_format.pack_into(self.buffer, head_offset, self.head)
+
+        return True
+
+    def get_all(self):
+        """
+        Consumer side. Copy out every packet written since the last call
+
+        :return: list of (whoiam index, timestamp, sequence number, packet) tuples in the order they were written
+        """
+        head = counter_format.unpack_from(self.buffer, head_offset)[0]
+        packets = []
+        while self.tail < head:
+            offset = slots_offset + (self.tail % self.num_slots) * self.slot_stride
+            sequence, timestamp, whoiam_index, length = slot_header.unpack_from(self.buffer, offset)
+            offset += slot_header.size
+            packets.append((whoiam_index, timestamp, sequence, str(self.buffer[offset: offset + length], 'ascii')))
+            self.tail += 1
+
+        # release the slots to the producer
+        counter_format.pack_into(self.buffer, tail_offset, self.tail)
+
+        return packets
+
+    def __len__(self):
+        if self.buffer is None:  # closed
+            return 0
+        return counter_format.unpack_from(self.buffer, head_offset)[0] - \
+               counter_format.unpack_from(self.buffer, tail_offset)[0]
+
+    def close(self, unlink=True):
+        """
+        Release the shared memory. Only the process that created the ring should unlink it
+        :return: None
+        """
+        if self.buffer is not None:
+            self.buffer.release()
+            self.buffer = None
+            self.memory.close()
+            if unlink:
+                self.memory.unlink()
@@ -1,4 +1,4 @@
-from multiprocessing import Queue
+from atlasbuggy.robot.commandchannel import CommandChannel
 
 
 class RobotObjectCollection:
@@ -8,7 +8,16 @@ class RobotObjectCollection:
 
         self.command_packets = {}
         for whoiam in self.whoiam_ids:
-            self.command_packets[whoiam] = Queue(maxsize=255)
+            self.command_packets[whoiam] = CommandChannel(maxsize=255)
+
+        # how the interface queues each port's packets (see dispatcher.py). Applies to every whoiam ID
+        self.priority = 0
+        self.max_queued = None
+        self.overflow_policy = "drop oldest"
+
+        # if True, receive is only called with the newest packet for each whoiam ID each loop
+        self.latest_only = False
+        self.superseded = 0
 
     def receive_first(self, whoiam, packet):
         pass
@@ -16,6 +25,6 @@ class RobotObjectCollection:
     def receive(self, timestamp, whoiam, packet):
         pass
 
-    def send(self, whoiam, packet):
+    def send(self, whoiam, packet, key=None):
         if whoiam in self.whoiam_ids:
-            self.command_packets[whoiam].put(packet)
\ No newline at end of file
+            self.command_packets[whoiam].put(packet, key)
\ No newline at end of file
@@ -4,10 +4,16 @@ Data is directed using a RobotInterface class. Every robot object has a unique w
 also defined on the microcontroller.
 """
 
-from multiprocessing import Queue
+from types import MethodType
+
+from atlasbuggy.robot.commandchannel import CommandChannel
 
 
 class RobotObject:
+    # layout of this object's packets (see packetschema.py). If set, receive fills the schema's fields
+    # as attributes without being overridden. Define it on the subclass so it's compiled once
+    schema = None
+
     def __init__(self, whoiam, enabled=True):
         """
         A container for data received from the corresponding microcontroller.
@@ -22,7 +28,20 @@ class RobotObject:
         self.whoiam = whoiam
         self.enabled = enabled
 
-        self.command_packets = Queue(maxsize=255)
+        self.command_packets = CommandChannel(maxsize=255)
+
+        # how the interface queues this object's packets (see dispatcher.py). Set after calling __init__
+        self.priority = 0  # higher priority objects receive their packets first
+        self.max_queued = None  # maximum packets waiting to be received. None means unbounded
+        self.overflow_policy = "drop oldest"  # "drop oldest", "drop newest" or "block"
+
+        # if True, receive is only called with the newest packet each loop. Every packet is still logged
+        self.latest_only = False
+        self.superseded = 0  # number of packets skipped in favor of the one passed to receive
+
+        if self.schema is not None and type(self).receive is RobotObject.receive:
+            # call the compiled parser directly instead of going through receive
+            self.receive = MethodType(self.schema.receive, self)
 
     def receive_first(self, packet):
         """
@@ -38,7 +57,7 @@ class RobotObject:
 
     def receive(self, timestamp, packet):
         """
-        Override this method when subclassing RobotObject
+        Override this method when subclassing RobotObject unless the object has a schema
 
         Parse incoming packets received by the corresponding port.
         This method is called on the RobotSerialPort's thread.
@@ -49,15 +68,19 @@ class RobotObject:
         :param packet: A packet (string) received from the robot object's port
         :return: False if program need to exit for some reason, None or True otherwise
         """
-        raise NotImplementedError("Please override this method when subclassing RobotObject")
+        if self.schema is None:
+            raise NotImplementedError("Please override this method or define a schema when subclassing RobotObject")
+        self.schema.fill(self, packet)
 
-    def send(self, packet):
+    def send(self, packet, key=None):
         """
         Do NOT override this method when subclassing RobotObject
 
         Queue a new packet for sending. The packet end (\n) will automatically be appended
 
         :param packet: A packet (string) to send to the microcontroller without the packet end character
+        :param key: Commands with the same key replace each other if they're sent in the same loop.
+            Use this for commands where only the latest value matters (speeds, positions)
         :return: None
         """
-        self.command_packets.put(packet)
+        self.command_packets.put(packet, key)
@@ -4,9 +4,11 @@ Each port runs on its own process. The whoiam ID of the port is found at runtime
 corresponding robot object is paired in RobotInterface.
 """
 
+import selectors
+import struct
 import time
 import traceback
-from multiprocessing import Event, Process
+from multiprocessing import Event, Process, current_process
 
 import serial
 import serial.tools.list_ports
@@ -14,6 +16,16 @@ from serial.serialutil import SerialException
 
 from atlasbuggy.robot.clock import Clock
 from atlasbuggy.robot.errors import *
+from atlasbuggy.robot.portstats import PortStats
+
+
+# binary frame layout. See RobotSerialPort.parse_frames for details
+frame_sync = 0xa5
+frame_header = struct.Struct("<BBH")  # sync, type, payload length
+frame_max_length = 0x1000  # longer lengths can only come from a corrupt header
+frame_decoders = {
+    0x01: lambda payload: str(payload, 'ascii'),  # ASCII packet
+}
 
 
 class RobotSerialPort(Process):
@@ -23,15 +35,22 @@ class RobotSerialPort(Process):
     This class is for internal use only
     """
 
-    def __init__(self, port_info, debug_prints, queue, lock, counter, updates_per_second):
+    def __init__(self, port_info, debug_prints, queue, lock, counter, updates_per_second, binary_framing=True,
+                 event_driven=False, cached_whoiam=None):
         """
 
         :param port_info: A ListPortInfo object returned by serial.tools.list_ports.comports()
         :param debug_prints: Enable verbose print statements
-        :param queue: a multiprocessing queue to which packets are passed
-        :param lock: a shared lock to prevent multiple sources accessing the queue
+        :param queue: a multiprocessing queue to which batches of packets are passed
+        :param lock: a shared lock to prevent multiple sources accessing the packet counter
         :param counter: a queue size counter. Keeps track of the number of packets in the queue
         :param updates_per_second: How often the port should update. This is passed to a Clock instance
+        :param binary_framing: Switch to binary frames if the microcontroller advertises support for them.
+            Microcontrollers that don't are read using the ASCII protocol
+        :param event_driven: Wait on the serial file descriptor instead of polling at updates_per_second.
+            Falls back to polling if the platform doesn't support it
+        :param cached_whoiam: The whoiam ID this device had last time (see portcache.py).
+            Only used to report a changed ID
         """
 
         # port info variables
@@ -46,14 +65,24 @@ class RobotSerialPort(Process):
 
         # time variables
         self.start_time = 0.0
-        self.thread_time = 0
+        self.stats = PortStats()  # shared with the main process. Only written by this port's process
+        self.heartbeat_timeout = 2.0  # seconds without a heartbeat before the port is considered hung
         self.loop_time = 0.0
         self.updates_per_second = updates_per_second
+        self.event_driven = event_driven
+        self.select_timeout = 0.1  # max time between heartbeats when no bytes arrive
+        self.exit_timeout = 1.0  # max time stop waits for the port process to exit
 
         # whoiam ID info
         self.whoiam = None  # ID tag of the microcontroller
         self.whoiam_header = "iam"  # whoiam packets start with "iam"
         self.whoiam_ask = "whoareyou"
+        self.cached_whoiam = cached_whoiam
+
+        # startup timing. whoareyou is sent repeatedly until the microcontroller wakes up
+        self.ready_poll_interval = 0.1
+        self.ready_timeout = 6.0  # microcontrollers that reset when the port opens take ~2 seconds to boot
+        self.startup_times = {}  # seconds each startup step took
 
         # first packet info
         self.first_packet = None
@@ -62,28 +91,50 @@ class RobotSerialPort(Process):
 
         # misc. serial protocol
         self.packet_end = "\n"  # what this microcontroller's packets end with
+        self.packet_end_bytes = self.packet_end.encode('ascii')
         self.baud_rate = 115200
 
+        # binary framing protocol
+        self.whoiam_option_sep = "\t"  # whoiam packets may list protocol options after the ID
+        self.binary_option = "binary"  # advertised by microcontrollers that can send frames
+        self.binary_ask = "binary"
+        self.binary_ack = "binary:ok"
+        self.binary_supported = False  # the microcontroller advertised binary framing
+        self.binary_requested = binary_framing
+        self.binary_mode = False  # frames are being read instead of newline separated packets
+        self.frame_errors = 0  # number of frames dropped because of a bad checksum or type
+
         # buffer for putting packets into
-        self.buffer = ""
+        self.buffer = bytearray()
+
+        # shared memory transport. Assigned by RobotInterface if it's enabled
+        self.packet_ring = None
+        self.ring_index = 0
+        self.sequence = 0  # number of packets read. Lets the main process keep ring and queue packets in order
 
         # variable to signal exit
         self.exit_event = Event()
         self.start_event = Event()
 
         # attempt to open the serial port
+        step_time = time.time()
         try:
             self.serial_ref = serial.Serial(port=self.address, baudrate=self.baud_rate)
         except SerialException as error:
             self.handle_error(error)
-
-        time.sleep(2)  # wait for microcontroller to wake up
+        step_time = self.record_startup_time("open", step_time)
 
         if self.configured:
-            # Find the ID of this port. The ports will be matched up to the correct RobotObject later
+            # Find the ID of this port. The ports will be matched up to the correct RobotObject later.
+            # whoareyou is polled until the microcontroller wakes up
             self.find_whoiam()
+            step_time = self.record_startup_time("whoiam", step_time)
             if self.whoiam is not None:
                 self.find_first_packet()
+                step_time = self.record_startup_time("first packet", step_time)
+                if self.binary_supported and self.binary_requested and self.first_packet is not None:
+                    self.negotiate_framing()
+                    self.record_startup_time("binary", step_time)
             else:
                 self.debug_print("whoiam ID was None, skipping find_first_packet")
 
@@ -110,13 +161,23 @@ class RobotSerialPort(Process):
             sent: "whoareyou\n"
             received: "iamlidar\n"
 
+        Microcontrollers that support binary frames append options to the ID:
+            received: "iamlidar\tbinary\n"
+
         When the packet is found, parse_whoiam_packet is called and whoiam is assigned
         :return: whoiam packet and first_packet
         """
 
-        self.whoiam = self.check_protocol(self.whoiam_ask, self.whoiam_header)
+        self.whoiam = self.check_protocol(self.whoiam_ask, self.whoiam_header,
+                                          timeout=self.ready_timeout, resend_interval=self.ready_poll_interval)
 
         if self.whoiam is not None:
+            options = self.whoiam.split(self.whoiam_option_sep)
+            self.whoiam = options.pop(0)
+            self.binary_supported = self.binary_option in options
+
+            if self.cached_whoiam is not None and self.cached_whoiam != self.whoiam:
+                self.debug_print("ID changed since last run. Was '%s'" % self.cached_whoiam)
             self.debug_print("%s has ID '%s'" % (self.address, self.whoiam))
         else:
             self.debug_print("Failed to obtain whoiam ID!", ignore_flag=True)
@@ -142,13 +203,53 @@ class RobotSerialPort(Process):
         else:
             self.debug_print("Failed to obtain first packet!", ignore_flag=True)
 
-    def check_protocol(self, ask_packet, recv_packet_header):
+    def negotiate_framing(self):
+        """
+        Ask the microcontroller to switch to binary frames. The acknowledgement is the
+        last ASCII packet sent. Everything after it is framed:
+
+            sent: "binary\n"
+            received: "binary:ok\n"
+
+        If the microcontroller doesn't acknowledge, the port stays in ASCII mode
+        :return: None
+        """
+        self.debug_print("Negotiating binary framing")
+
+        if not self.write_packet(self.binary_ask):
+            return
+
+        ack = self.binary_ack.encode('ascii') + self.packet_end_bytes
+        start_time = time.time()
+        while (time.time() - start_time) < 1:
+            try:
+                incoming = self.serial_ref.read(self.serial_ref.in_waiting)
+            except SerialException as error:
+                self.handle_error(error)
+                return
+
+            self.buffer += incoming
+            ack_index = self.buffer.find(ack)
+            if ack_index != -1:
+                # anything before the acknowledgement was sent in ASCII and is discarded
+                del self.buffer[:ack_index + len(ack)]
+                self.binary_mode = True
+                self.debug_print("Using binary framing")
+                return
+
+            time.sleep(0.01)
+
+        self.debug_print("Didn't receive binary framing acknowledgement. Using ASCII packets")
+
+    def check_protocol(self, ask_packet, recv_packet_header, timeout=4.0, resend_interval=1.0):
         """
         A call and response method. After an "ask packet" is sent, the process waits for
-        a packet with the expected header for 2 seconds
+        a packet with the expected header. The ask packet is sent again every resend_interval seconds
 
         :param ask_packet: packet to send
         :param recv_packet_header: what the received packet should start with
+        :param timeout: seconds to wait for the response
+        :param resend_interval: seconds between sending the ask packet again
         :return: the packet received without the header and packet end
         """
         self.debug_print("Checking '%s' protocol" % ask_packet)
@@ -157,35 +258,31 @@ class RobotSerialPort(Process):
             return None  # return None if write failed
 
         start_time = time.time()
+        write_time = start_time
         abides_protocol = False
         answer_packet = ""
-        attempts = 0
-        rounded_time = 0
 
         self.start_event.set()
 
         # wait for the correct response
         while not abides_protocol:
             packets = self.read_packets()
-            if packets is None:
-                return None
-            self.print_packets(packets)
 
             # return None if read failed
             if packets is None:
                 self.handle_error("Serial read failed... Board never signalled ready")
                 return None
+            self.print_packets(packets)
 
-            prev_rounded_time = rounded_time
-            rounded_time = int((time.time() - start_time) * 10)
-            if rounded_time % 10 == 0 and rounded_time > 5 and prev_rounded_time != rounded_time:
-                attempts += 1
+            current_time = time.time()
+            if current_time - write_time > resend_interval:
+                write_time = current_time
                 self.debug_print("Writing '%s' again" % ask_packet)
                 if not self.write_packet(ask_packet):
                     return None
 
             # return None if operation timed out
-            if (time.time() - start_time) > 4:
+            if (current_time - start_time) > timeout:
                 self.handle_error("Didn't receive response for packet '%s'. Operation timed out." % ask_packet)
                 return None
 
@@ -199,9 +296,24 @@ class RobotSerialPort(Process):
                     self.debug_print("answer packet: " + repr(answer_packet))
                     abides_protocol = True
 
+            if not abides_protocol:
+                time.sleep(0.001)  # don't spin while waiting for bytes
+
         self.debug_print("returning answer packet:" + repr(answer_packet))
         return answer_packet  # when the while loop exits, abides_protocol must be True
 
+    def record_startup_time(self, step, step_start_time):
+        """
+        Record how long a startup step took
+
+        :param step: name of the step
+        :param step_start_time: time the step started
+        :return: the current time (the start time of the next step)
+        """
+        current_time = time.time()
+        self.startup_times[step] = current_time - step_start_time
+        return current_time
+
     def handle_error(self, error):
         """
         When errors occur in a RobotSerialPort, the process doesn't crash. The error is recorded,
@@ -225,7 +337,7 @@ class RobotSerialPort(Process):
         Called when RobotSerialPort.start is called
 
         :param queue: A reference to the queue to pass data to
-        :param lock: The packet queue lock
+        :param lock: The packet counter lock
         :param counter: Number of packets
         :return: None
         """
@@ -233,17 +345,25 @@ class RobotSerialPort(Process):
         self.start_time = time.time()
         clock = Clock(self.updates_per_second)
         clock.start(self.start_time)
+        selector = self.open_selector()
+
+        # the main process stops reading the queue while closing. Don't wait for it to flush on exit
+        queue.cancel_join_thread()
 
         try:
             while not self.exit_event.is_set():
-                # update the internal timer. Acts as a check to see if the thread is running properly
-                self.thread_time = int(time.time() - self.start_time)
+                # update the heartbeat. Acts as a check to see if the process is running properly
+                self.stats["heartbeat"] = time.time()
 
                 # close the process if the serial port isn't open
                 if not self.serial_ref.is_open:
                     self.stop()
                     raise RobotSerialPortClosedPrematurelyError("Serial port isn't open for some reason...")
 
+                if selector is not None:
+                    # sleep until bytes arrive. The timeout keeps the heartbeat and exit checks going
+                    selector.select(self.select_timeout)
+
                 if self.serial_ref.in_waiting > 0:
                     # read every possible character available and split them into packets
                     packets = self.read_packets()
@@ -251,25 +371,70 @@ class RobotSerialPort(Process):
                         self.stop()
                         raise RobotSerialPortReadPacketError("Failed to read packets")
 
-                    # put data found into the queue
-                    with lock:
-                        for packet in packets:
-                            queue.put((self.whoiam, time.time(), packet))
-                            # start_time isn't used. The main process has its own initial time reference
-
-                        counter.value += len(packets)
-
-                clock.update()  # maintain a constant loop speed
+                    # put data found into the queue. All packets from one read are sent as one batch
+                    # start_time isn't used. The main process has its own initial time reference
+                    if len(packets) > 0:
+                        timestamp = time.time()
+                        sequence = self.sequence
+                        self.sequence += len(packets)
+
+                        batches = [(sequence, packets)]  # (sequence number of the first packet, packets)
+                        if self.packet_ring is not None:
+                            # packets that don't fit in the ring go through the queue instead,
+                            # in runs of consecutive packets
+                            batches = []
+                            for index, packet in enumerate(packets):
+                                if self.packet_ring.put(self.ring_index, timestamp, packet, sequence + index):
+                                    continue
+                                if len(batches) > 0 and batches[-1][0] + len(batches[-1][1]) == sequence + index:
+                                    batches[-1][1].append(packet)
+                                else:
+                                    batches.append((sequence + index, [packet]))
+
+                        for first_sequence, batch in batches:
+                            queue.put((self.whoiam, timestamp, batch, first_sequence))
+
+                            with lock:
+                                counter.value += len(batch)
+
+                        put_latency = time.time() - timestamp
+                        self.stats["put_latency"] = put_latency
+                        self.stats.set_max("max_put_latency", put_latency)
+
+                if selector is None:
+                    clock.update()  # maintain a constant loop speed
 
         except KeyboardInterrupt:
             self.debug_print("KeyboardInterrupt in port loop")
 
+        if selector is not None:
+            selector.close()
+
         self.debug_print("While loop exited. Exit event triggered.")
 
+    def open_selector(self):
+        """
+        If event_driven is True, register the serial port's file descriptor with a selector
+
+        :return: a selector or None if the port should be polled using a Clock
+        """
+        if not self.event_driven:
+            return None
+
+        try:
+            selector = selectors.DefaultSelector()
+            selector.register(self.serial_ref.fileno(), selectors.EVENT_READ)
+        except (AttributeError, OSError, ValueError) as error:
+            # pyserial on Windows doesn't expose a file descriptor
+            self.debug_print("Can't wait on serial port (%s). Polling instead" % error)
+            return None
+
+        return selector
+
     def read_packets(self):
         """
         Read all available data on serial and split them into packets as
-        indicated by packet_end.
+        indicated by packet_end (or by frame headers if binary_mode is True).
 
         :return: None indicates the serial read failed and that the communicator thread should be stopped.
             returns the received packets otherwise
@@ -285,24 +450,97 @@ class RobotSerialPort(Process):
             self.handle_error(error)
             return None
 
+        return self.parse_packets(incoming)
+
+    def parse_packets(self, incoming):
+        """
+        Append incoming bytes to the buffer and split off every complete packet
+
+        :param incoming: bytes read from the serial port
+        :return: None if the packets couldn't be decoded, the received packets otherwise
+        """
         if len(incoming) > 0:
+            self.stats.add("reads")
+            self.stats.add("bytes_read", len(incoming))
+            self.stats.set_max("max_burst", len(incoming))
+
             # append to the buffer
-            try:
-                self.buffer += incoming.decode('ascii')
-            except UnicodeDecodeError as error:
-                self.handle_error(error)
-                return None
+            self.buffer += incoming
+
+            if self.binary_mode:
+                packets = self.parse_frames()
+                self.stats.add("packets", len(packets))
+                return packets
 
-            if len(self.buffer) > len(self.packet_end):
+            if len(self.buffer) > len(self.packet_end_bytes):
                 # split based on user defined packet end
-                packets = self.buffer.split(self.packet_end)
+                packets = self.buffer.split(self.packet_end_bytes)
 
                 # reset the buffer
                 self.buffer = packets.pop(-1)
 
-                return packets
+                self.stats.add("packets", len(packets))
+                try:
+                    return [packet.decode('ascii') for packet in packets]
+                except UnicodeDecodeError as error:
+                    self.stats.add("decode_errors")
+                    self.handle_error(error)
+                    return None
         return []
 
+    def parse_frames(self):
+        """
+        Split the buffer into binary frames. Frames have this layout (little endian):
+
+            sync (0xa5) | type (1 byte) | payload length (2 bytes) | payload | checksum (1 byte)
+
+        The checksum is the sum of the type, length and payload bytes modulo 256.
+        Incomplete frames are left in the buffer. Corrupt frames are skipped and counted in frame_errors
+
+        :return: the payloads of all complete frames
+        """
+        packets = []
+        view = memoryview(self.buffer)
+        buffer_len = len(self.buffer)
+        index = 0
+
+        while True:
+            index = self.buffer.find(frame_sync, index)
+            if index == -1:
+                index = buffer_len
+                break
+            if buffer_len - index < frame_header.size:
+                break
+
+            _, frame_type, length = frame_header.unpack_from(self.buffer, index)
+            frame_end = index + frame_header.size + length
+            if length <= frame_max_length and buffer_len - frame_end < 1:
+                break
+
+            packet = None
+            if length <= frame_max_length and frame_type in frame_decoders and \
+                    (sum(view[index + 1: frame_end]) & 0xff) == self.buffer[frame_end]:
+                try:
+                    packet = frame_decoders[frame_type](view[index + frame_header.size: frame_end])
+                except UnicodeDecodeError:
+                    pass
+
+            if packet is None:
+                # resynchronize on the next sync byte
+                self.frame_errors += 1
+                self.stats.add("decode_errors")
+                self.debug_print("Dropped corrupt frame (%s total)" % self.frame_errors)
+                index += 1
+                continue
+
+            packets.append(packet)
+            index = frame_end + 1
+
+        view.release()
+        del self.buffer[:index]
+
+        return packets
+
     def write_packet(self, packet):
         """
         Safely write a packet over serial. Automatically appends packet_end to the input.
@@ -311,8 +549,8 @@ class RobotSerialPort(Process):
         :return: True or False if the write was successful
         """
         try:
-            data = bytearray(packet + self.packet_end, 'ascii')
-        except TypeError as error:
+            data = packet.encode('ascii') + self.packet_end_bytes
+        except (AttributeError, UnicodeEncodeError) as error:
             self.handle_error(error)
             return False
 
@@ -356,12 +594,11 @@ class RobotSerialPort(Process):
         if not self.configured:
             return 0
 
-        if self.start_time == 0.0:  # process hasn't started
+        heartbeat = self.stats["heartbeat"]
+        if heartbeat == 0.0:  # process hasn't started
             return 1
 
-        current_time = int(time.time() - self.start_time)
-        status = abs(current_time - self.thread_time) < 2
-        if not status:
+        if time.time() - heartbeat > self.heartbeat_timeout:
             return -1
         else:
             return 1
@@ -375,7 +612,11 @@ class RobotSerialPort(Process):
 
         self.debug_print("Exit event is " + str("set" if self.exit_event.is_set() else "not set"))
         if not self.exit_event.is_set():
+            self.exit_event.set()
             if self.start_event.is_set():
+                if current_process() is not self:
+                    # the port process would read the response before check_protocol could. Let it exit first
+                    self.wait_for_exit()
                 self.check_protocol("stop", "stopping")
                 if not self.configured:
                     self.debug_print("Failed to send stop flag!!!")
@@ -386,6 +627,14 @@ class RobotSerialPort(Process):
         self.exit_event.set()
         self.close_port()
 
+    def wait_for_exit(self):
+        """
+        Wait for the port process to see the exit event. Hung processes aren't waited for
+        :return: None
+        """
+        if self.is_alive() and self.is_running() != -1:
+            self.join(self.exit_timeout)
+
     def close_port(self):
         """
         Close the serial port if it's open
@@ -8,13 +8,20 @@ from atlasbuggy.robot.robotcollection import RobotObjectCollection
 from atlasbuggy.robot.errors import RobotObjectInitializationError
 
 class RobotInterfaceSimulator:
-    def __init__(self, file_name, directory, *robot_objects, start_index=0, end_index=-1):
+    # if True, progress and warnings aren't printed. Set for batch runs (see batchsimulator.py)
+    headless = False
+
+    def __init__(self, file_name, directory, *robot_objects, start_index=0, end_index=-1, stream=False,
+                 start_time=None, end_time=None):
         """
         :param file_name: log file name or number
         :param directory: directory to search in
         :param start_index:
         :param end_index:
         :param robot_objects:
+        :param stream: decompress the log file as it's simulated instead of loading all of it (see parser.py)
+        :param start_time: simulate from this time in seconds instead of start_index
+        :param end_time: simulate until this time in seconds instead of end_index
         """
         self.objects = {}
         for robot_object in robot_objects:
@@ -26,7 +33,7 @@ class RobotInterfaceSimulator:
             else:
                 raise RobotObjectInitializationError(
                     "Object passed isn't a RobotObject or RobotObjectCollection:", repr(robot_object))
-        self.parser = Parser(file_name, directory, start_index, end_index)
+        self.parser = Parser(file_name, directory, start_index, end_index, stream, start_time, end_time)
         self.current_index = 0
 
         self.ids_used = set()
@@ -39,7 +46,9 @@ class RobotInterfaceSimulator:
         self.dt = None
 
     def print_percent(self):
-        percent = 100 * self.parser.index / len(self.parser.contents)
+        if self.headless:
+            return
+        percent = 100 * self.parser.index / len(self.parser)
         self.percent = int(percent * 10)
         if self.percent != self.prev_percent:
             self.prev_percent = self.percent
@@ -68,6 +77,11 @@ class RobotInterfaceSimulator:
             return arg == self.prev_whoiam
 
     def run(self):
+        """
+        Send every packet in the log to the robot objects and this simulator's packet methods
+
+        :return: whatever close returns
+        """
         for index, packet_type, timestamp, whoiam, packet in self.parser:
             self.dt = timestamp
             self.prev_whoiam = whoiam
@@ -99,7 +113,7 @@ class RobotInterfaceSimulator:
                 if self.command_packet(timestamp, packet) is False:
                     break
 
-        if self.ids_received != self.ids_used:
+        if self.ids_received != self.ids_used and not self.headless:
             if len(self.ids_received - self.ids_used) > 0:
                 print("Warning IDs unused:")
                 for id in self.ids_received - self.ids_used:
@@ -109,7 +123,12 @@ class RobotInterfaceSimulator:
                 for id in self.ids_used - self.ids_received:
                     print("\t", id)
 
-        self.close()
+        return self.close()
 
     def close(self):
+        """
+        Called after the last packet. Override to plot or summarize the simulation
+
+        :return: the simulation's results (returned by run)
+        """
         pass
@@ -0,0 +1,93 @@
+"""
+Compares packet latency (time written by the microcontroller to packet_received) between
+RobotInterface (one process per port, polling or event driven) and AsyncRobotInterface (one event loop
+for all ports). Pseudo-terminals stand in for the microcontrollers (see fake_boards.py).
+
+Also measures how long the interface takes to stop once loop returns False, and checks every port
+stopped cleanly (no port errors).
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.async_latency
+"""
+
+import time
+
+from atlasbuggy.robot.asyncinterface import AsyncRobotInterface
+from atlasbuggy.robot.interface import RobotInterface
+from atlasbuggy.robot.robotobject import RobotObject
+
+from benchmarks.fake_boards import FakeBoards
+
+num_boards = 4
+packets_per_second = 500
+run_time = 5.0
+
+
+class FakeSensor(RobotObject):
+    def receive_first(self, packet):
+        pass
+
+    def receive(self, timestamp, packet):
+        pass
+
+
+def latency_runner(interface_class, interface_kwargs):
+    class LatencyRunner(interface_class):
+        def __init__(self):
+            self.latencies = []
+            self.stop_time = None
+            super(LatencyRunner, self).__init__(
+                *[FakeSensor("fake%i" % index) for index in range(num_boards)],
+                log_data=False, **interface_kwargs
+            )
+
+        def packet_received(self, timestamp, whoiam, packet):
+            self.latencies.append(time.time() - float(packet))
+
+        def loop(self):
+            if self.dt > run_time:
+                self.stop_time = time.time()
+                return False
+
+    return LatencyRunner
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(interface_class, interface_kwargs):
+    boards = FakeBoards(num_boards, packets_per_second)
+    boards.replace_comports()
+    boards.start()
+
+    runner = latency_runner(interface_class, interface_kwargs)()
+    cpu_start = time.process_time()
+    runner.run()
+    cpu_time = time.process_time() - cpu_start
+    stop_time = time.time() - runner.stop_time
+    boards.stop()
+
+    for robot_port in runner.ports.values():
+        assert robot_port.error_message is None, robot_port.error_message[-1]
+
+    latencies = sorted(runner.latencies)
+    return (len(latencies), percentile(latencies, 0.5), percentile(latencies, 0.99), latencies[-1], cpu_time,
+            stop_time)
+
+
+def main():
+    print("%i boards at %i packets/s for %0.1fs" % (num_boards, packets_per_second, run_time))
+    print("%-28s %8s %10s %10s %10s %14s %10s" % ("interface", "packets", "p50 (ms)", "p99 (ms)", "max (ms)",
+                                                  "main cpu (s)", "stop (s)"))
+    for name, interface_class, interface_kwargs in (
+            ("RobotInterface", RobotInterface, {}),
+            ("RobotInterface event driven", RobotInterface, dict(event_driven_ports=True)),
+            ("AsyncRobotInterface", AsyncRobotInterface, {})):
+        count, p50, p99, max_latency, cpu_time, stop_time = measure(interface_class, interface_kwargs)
+        print("%-28s %8i %10.3f %10.3f %10.3f %14.2f %10.2f" % (
+            name, count, p50 * 1000, p99 * 1000, max_latency * 1000, cpu_time, stop_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Measures how long it takes to simulate a set of logs one at a time against BatchSimulator's process pool.
+
+    serial: one RobotInterfaceSimulator after another in this process
+    batch (n processes): BatchSimulator with n worker processes
+
+Every log has the same IMU records, so each simulation returns the same mean yaw.
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.batch_simulation
+"""
+
+import os
+import tempfile
+import time
+
+from atlasbuggy.logfiles.logger import Logger
+from atlasbuggy.logfiles.parser import Parser
+from atlasbuggy.robot.batchsimulator import BatchSimulator, find_logs
+from atlasbuggy.robot.packetschema import PacketSchema
+from atlasbuggy.robot.robotobject import RobotObject
+from atlasbuggy.robot.simulator import RobotInterfaceSimulator
+
+num_logs = 8
+num_records = 50000
+imu_packet = "%0.4f\t%0.4f\t%0.4f\t0.0012\t-0.0031\t0.0007\t24.5\t-3.2\t41.0\t179.8\t-1.2\t3.4"
+
+
+class IMU(RobotObject):
+    schema = PacketSchema(
+        "eul_x", "eul_y", "eul_z",
+        "mag_x", "mag_y", "mag_z",
+        "gyro_x", "gyro_y", "gyro_z",
+        "accel_x", "accel_y", "accel_z",
+    )
+
+    def __init__(self):
+        super(IMU, self).__init__("imu")
+
+
+class YawSimulator(RobotInterfaceSimulator):
+    def __init__(self, file_name, directory):
+        self.imu = IMU()
+        self.total = 0.0
+        self.count = 0
+        super(YawSimulator, self).__init__(file_name, directory, self.imu, stream=True)
+
+    def object_packet(self, timestamp):
+        if self.did_receive(self.imu):
+            self.total += self.imu.eul_x
+            self.count += 1
+
+    def close(self):
+        return self.total / self.count
+
+
+def write_logs(directory):
+    for log_num in range(num_logs):
+        logger = Logger("benchmark %i" % log_num, directory)
+        logger.open()
+        for index in range(num_records):
+            logger.record(index * 0.01, "imu", imu_packet % (index % 360, -index % 90, index * 0.001), "object")
+        logger.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        write_logs(directory)
+        file_names = [os.path.basename(file_path) for file_path in find_logs(directory)]
+
+        print("%i logs of %i IMU records, %i CPUs" % (num_logs, num_records, os.cpu_count() or 1))
+        print("%-24s %10s %14s" % ("method", "time (s)", "records/s"))
+
+        RobotInterfaceSimulator.headless = Parser.headless = True
+        start_time = time.perf_counter()
+        expected = [YawSimulator(file_name, directory).run() for file_name in file_names]
+        duration = time.perf_counter() - start_time
+        RobotInterfaceSimulator.headless = Parser.headless = False
+        print("%-24s %10.2f %14.0f" % ("serial", duration, num_logs * num_records / duration))
+
+        for processes in sorted({2, os.cpu_count() or 1}):
+            report = BatchSimulator(YawSimulator, directory, processes=processes).run(print_progress=False)
+            assert len(report.failed()) == 0, report.report()
+            assert [result.result for result in report] == expected
+            print("%-24s %10.2f %14.0f" % ("batch (%i processes)" % report.num_processes, report.duration,
+                                           num_logs * num_records / report.duration))
+
+
+if __name__ == '__main__':
+    main()
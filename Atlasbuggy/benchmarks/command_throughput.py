@@ -0,0 +1,101 @@
+"""
+Measures commands per second through RobotObject.send and RobotInterface._send_commands.
+
+    queue: the old command buffer, a multiprocessing.Queue per robot object
+    channel: the current CommandChannel with every command queued
+    channel (keyed): the current CommandChannel with speed and position commands coalesced
+
+Each loop, every object sends several speed and position commands like a joystick being moved.
+Commands are written to a stand-in for the serial port that discards them.
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.command_throughput
+"""
+
+import time
+from multiprocessing import Queue
+
+from atlasbuggy.logfiles.logger import Logger
+from atlasbuggy.robot.interface import RobotInterface
+from atlasbuggy.robot.robotobject import RobotObject
+
+num_objects = 4
+num_loops = 20000
+updates_per_loop = 5  # joystick axis changes per loop for each of speed and position
+
+
+class QueueChannel:
+    """
+    The old command buffer, drained the way _send_commands used to. The old queue had a maxsize of 255.
+    At these rates the feeder thread falls behind, empty() returns True, commands pile up and send
+    blocks forever once the queue is full, so the queue here is unbounded
+    """
+
+    def __init__(self):
+        self.queue = Queue()
+
+    def put(self, packet, key=None):
+        self.queue.put(packet)
+
+    def get_all(self):
+        packets = []
+        while not self.queue.empty():
+            packets.append(self.queue.get())
+        return packets
+
+
+class Actuator(RobotObject):
+    def __init__(self, whoiam, use_queue):
+        super(Actuator, self).__init__(whoiam)
+        if use_queue:
+            self.command_packets = QueueChannel()
+
+
+class DiscardingInterface(RobotInterface):
+    """A RobotInterface without ports. Only the command path is used"""
+
+    def __init__(self, *robot_objects):
+        self.objects = {robot_object.whoiam: robot_object for robot_object in robot_objects}
+        self.logger = Logger("benchmark", None)  # never opened so nothing is written
+        self.start_time = time.time()
+        self.num_written = 0
+
+    def _write_command(self, whoiam, command):
+        self.num_written += 1
+        return True
+
+
+def run(use_queue, keyed):
+    actuators = [Actuator("actuator%i" % index, use_queue) for index in range(num_objects)]
+    interface = DiscardingInterface(*actuators)
+
+    start_time = time.time()
+    for loop in range(num_loops):
+        for actuator in actuators:
+            for update in range(updates_per_loop):
+                actuator.send("v%i" % update, key="v" if keyed else None)
+                actuator.send("p%i" % update, key="p" if keyed else None)
+        interface._send_commands()
+
+    num_sent = num_objects * num_loops * updates_per_loop * 2
+    if use_queue:
+        # the queue's feeder threads may still be holding commands
+        while interface.num_written < num_sent:
+            interface._send_commands()
+    duration = time.time() - start_time
+
+    return num_sent / duration, interface.num_written
+
+
+def main():
+    print("%i objects, %i loops, %i speed and position commands per object per loop" % (
+        num_objects, num_loops, updates_per_loop))
+    print("%-16s %16s %16s" % ("buffer", "commands/s", "commands written"))
+    for name, use_queue, keyed in (("queue", True, False), ("channel", False, False),
+                                   ("channel (keyed)", False, True)):
+        rate, num_written = run(use_queue, keyed)
+        print("%-16s %16.0f %16i" % (name, rate, num_written))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Pseudo-terminal stand-ins for microcontrollers. Each board speaks the atlasbuggy serial protocol
+(whoareyou, init?, binary, start, stop) and streams packets containing the time they were written,
+so the receiver can measure latency.
+
+All boards run in one separate process so they don't compete with the interface being measured.
+"""
+
+import os
+import pty
+import selectors
+import struct
+import time
+import tty
+from multiprocessing import Event, Process
+
+import serial.tools.list_ports
+
+
+class FakePortInfo:
+    """Looks enough like serial.tools.list_ports_common.ListPortInfo for RobotSerialPort"""
+
+    def __init__(self, device, serial_number):
+        self.device = device
+        self.vid = 0x1234
+        self.pid = 0x5678
+        self.serial_number = serial_number
+
+
+class FakeBoards(Process):
+    def __init__(self, num_boards, packets_per_second=500, binary=True, boot_times=None):
+        """
+        :param boot_times: seconds each board ignores commands for after it first hears from the port,
+            like a microcontroller that resets when the port opens. None means they answer right away
+        """
+        self.boards = []
+        for index in range(num_boards):
+            master, slave = pty.openpty()
+            tty.setraw(master)
+            tty.setraw(slave)
+            self.boards.append((master, os.ttyname(slave), "fake%i" % index))
+
+        self.seconds_per_packet = 1 / packets_per_second
+        self.binary = binary
+        self.boot_times = boot_times if boot_times is not None else [0.0] * num_boards
+        self.exit_event = Event()
+
+        super(FakeBoards, self).__init__(target=self.update)
+
+    def port_infos(self):
+        return [FakePortInfo(device, str(index)) for index, (_, device, _) in enumerate(self.boards)]
+
+    def replace_comports(self):
+        """Make RobotInterface find the fake boards instead of real serial ports"""
+        serial.tools.list_ports.comports = self.port_infos
+
+    @staticmethod
+    def write(master, packet, binary_mode):
+        payload = packet.encode('ascii')
+        if binary_mode:
+            header = struct.pack('<BBH', 0xa5, 0x01, len(payload))
+            payload = header + payload + bytes(((sum(header[1:]) + sum(payload)) & 0xff,))
+        else:
+            payload += b"\n"
+        try:
+            os.write(master, payload)
+        except BlockingIOError:
+            pass  # nobody is reading this board
+
+    def update(self):
+        selector = selectors.DefaultSelector()
+        states = {}
+        for (master, device, whoiam), boot_time in zip(self.boards, self.boot_times):
+            os.set_blocking(master, False)
+            selector.register(master, selectors.EVENT_READ)
+            states[master] = dict(whoiam=whoiam, buffer=b"", writing=False, binary_mode=False,
+                                  boot_time=boot_time, ready_time=None)
+
+        next_time = time.time()
+        while not self.exit_event.is_set():
+            for key, _ in selector.select(max(0.0, next_time - time.time())):
+                state = states[key.fd]
+                try:
+                    state["buffer"] += os.read(key.fd, 0x1000)
+                except OSError:
+                    continue
+
+                *commands, state["buffer"] = state["buffer"].split(b"\n")
+                if state["ready_time"] is None:
+                    state["ready_time"] = time.time() + state["boot_time"]
+                if time.time() < state["ready_time"]:
+                    continue  # still booting
+                for command in commands:
+                    command = command.decode('ascii')
+                    if command == "whoareyou":
+                        state["binary_mode"] = False
+                        self.write(key.fd, "iam%s%s" % (state["whoiam"], "\tbinary" if self.binary else ""), False)
+                    elif command == "init?":
+                        self.write(key.fd, "init:", False)
+                    elif command == "binary" and self.binary:
+                        self.write(key.fd, "binary:ok", False)
+                        state["binary_mode"] = True
+                    elif command == "start":
+                        state["writing"] = True
+                    elif command == "stop":
+                        self.write(key.fd, "stopping", state["binary_mode"])
+                        state["writing"] = False
+                        state["binary_mode"] = False
+
+            if time.time() >= next_time:
+                next_time += self.seconds_per_packet
+                for master, state in states.items():
+                    if state["writing"]:
+                        self.write(master, "%0.6f" % time.time(), state["binary_mode"])
+
+    def stop(self):
+        self.exit_event.set()
+        self.join()
@@ -0,0 +1,80 @@
+"""
+Measures how long appending a point to each plot and calling plot takes, the way runners call them
+from packet_received.
+
+    full draw: LivePlotter with blit=False, fps=None. Every call redraws the whole figure (the old behavior)
+    blit: LivePlotter with blit=True, fps=None. Only the lines are redrawn unless an axis range changes
+    blit, 30 fps: LivePlotter with blit=True, fps=30. Calls between frames return right away
+    process: ProcessPlotter. Appends write to shared memory and another process draws at 30 fps.
+        Its frames aren't counted here
+
+Two plots: an x-y plot with fixed ranges and a time plot whose x range scrolls with the data.
+Rendering uses matplotlib's Agg backend so no window is opened.
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.live_plot
+"""
+
+import math
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+from matplotlib import pyplot as plt
+
+from atlasbuggy.plotters.liveplotter import LivePlotter
+from atlasbuggy.plotters.processplotter import ProcessPlotter
+from atlasbuggy.plotters.robotplot import RobotPlot
+
+num_calls = 1000
+calls_per_second = 100  # how often packets arrive
+
+
+def time_plotter(plotter_class, blit, fps):
+    xy_plot = RobotPlot("xy", x_range=(-1.5, 1.5), y_range=(-1.5, 1.5), max_length=200, label="data")
+    time_plot = RobotPlot("time", y_range=(-1.5, 1.5), max_length=200, label="data")
+    plotter = plotter_class(2, xy_plot, time_plot, blit=blit, fps=fps)
+
+    call_time = 0.0
+    start_time = time.perf_counter()
+    for index in range(num_calls):
+        timestamp = index / calls_per_second
+
+        call_start = time.perf_counter()
+        xy_plot.append(math.cos(timestamp), math.sin(timestamp * 2))
+        time_plot.append(timestamp, math.sin(timestamp))
+        assert plotter.plot()
+        call_time += time.perf_counter() - call_start
+
+        # packets arrive at calls_per_second so the fps throttle sees real time pass
+        delay = start_time + (index + 1) / calls_per_second - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    stats = plotter.render_stats() if plotter_class is LivePlotter else None
+    plotter.close()
+    LivePlotter.initialized = False
+    plt.close("all")
+    return call_time / num_calls, stats
+
+
+def main():
+    print("%i calls at %i calls/s" % (num_calls, calls_per_second))
+    print("%-16s %14s %8s %11s %16s" % ("method", "ms per call", "frames", "full draws", "ms per frame"))
+
+    for name, plotter_class, blit, fps in (("full draw", LivePlotter, False, None),
+                                           ("blit", LivePlotter, True, None),
+                                           ("blit, 30 fps", LivePlotter, True, 30),
+                                           ("process", ProcessPlotter, True, 30)):
+        mean_call_time, stats = time_plotter(plotter_class, blit, fps)
+        if stats is None:
+            print("%-16s %14.3f %8s %11s %16s" % (name, mean_call_time * 1000, "-", "-", "-"))
+        else:
+            print("%-16s %14.3f %8i %11i %16.3f" % (
+                name, mean_call_time * 1000, stats["frames"], stats["full_draws"], stats["mean_render_time"] * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Measures how long it takes to turn one million IMU records (and ten thousand GPS records) in a log into arrays.
+
+    iterate: loop over the Parser, call IMU.receive for every record and append each field to a list
+    columns: Parser.columns decodes every IMU field into NumPy arrays and caches them (see columncache.py)
+    columns (cached): the same columns loaded from the cache
+    columns (3 fields): Parser.columns only converting eul_x, eul_y and eul_z
+
+Each run includes decompressing the log.
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.log_columns
+"""
+
+import tempfile
+import time
+
+import numpy as np
+
+from atlasbuggy.logfiles.logger import Logger
+from atlasbuggy.logfiles.parser import Parser
+from atlasbuggy.robot.packetschema import PacketSchema
+from atlasbuggy.robot.robotobject import RobotObject
+
+num_records = 1000000
+gps_interval = 100  # one GPS record for every 100 IMU records
+imu_packet = "%0.4f\t%0.4f\t%0.4f\t0.0012\t-0.0031\t0.0007\t24.5\t-3.2\t41.0\t179.8\t-1.2\t3.4"
+gps_packet = "23\t7\t8\t0\t31\t1\t17\t2\t4026.5393\tN\t7956.6318\tW\t40.4423\t-79.9439\t0.01\t214.98\t294.90\t7\t"
+
+
+class IMU(RobotObject):
+    schema = PacketSchema(
+        "eul_x", "eul_y", "eul_z",
+        "mag_x", "mag_y", "mag_z",
+        "gyro_x", "gyro_y", "gyro_z",
+        "accel_x", "accel_y", "accel_z",
+    )
+
+    def __init__(self):
+        super(IMU, self).__init__("imu")
+
+
+def write_log(directory):
+    logger = Logger("benchmark", directory)
+    logger.open()
+    logger.record(-1, "imu", "delay:10", "object")
+    for index in range(num_records):
+        timestamp = index * 0.01
+        logger.record(timestamp, "imu", imu_packet % (index % 360, -index % 90, index * 0.001), "object")
+        if index % gps_interval == 0:
+            logger.record(timestamp, "gps", gps_packet, "object")
+    logger.close()
+
+
+def iterate(directory):
+    imu = IMU()
+    timestamps = []
+    fields = {name: [] for name in IMU.schema.names}
+
+    for index, packet_type, timestamp, whoiam, packet in Parser("benchmark", directory, stream=True):
+        if whoiam == "imu" and packet_type == "object" and timestamp >= 0:
+            imu.receive(timestamp, packet)
+            timestamps.append(timestamp)
+            for name, values in fields.items():
+                values.append(getattr(imu, name))
+
+    columns = {name: np.array(values) for name, values in fields.items()}
+    columns["timestamp"] = np.array(timestamps)
+    return columns
+
+
+def decode(directory, fields=None):
+    return Parser("benchmark", directory, stream=True).columns(IMU(), "gps", fields=fields)["imu"]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        write_log(directory)
+
+        print("%i IMU records" % num_records)
+        print("%-20s %10s %14s" % ("method", "time (s)", "records/s"))
+
+        expected = None
+        for name, function in (("iterate", lambda: iterate(directory)),
+                               ("columns", lambda: decode(directory)),
+                               ("columns (cached)", lambda: decode(directory)),
+                               ("columns (3 fields)", lambda: decode(directory, ("eul_x", "eul_y", "eul_z")))):
+            start_time = time.perf_counter()
+            columns = function()
+            duration = time.perf_counter() - start_time
+
+            if expected is None:
+                expected = columns
+            for column, values in columns.items():
+                assert np.array_equal(values, expected[column]), column
+            print("%-20s %10.2f %14.0f" % (name, duration, len(columns["timestamp"]) / duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Logs one million packets (in bursts, with pauses in between like the main loop) with the old Logger (plain text during the run, compressed in one go on close),
+the current one (compressed in batches while running) and the current one in background mode (a writer
+thread compresses and syncs). Reports wall time, time spent in record calls (the time the main loop is
+blocked), the number of record calls that took longer than a millisecond, time spent in close and peak memory. Each logger runs in its own process so peak RSS isn't shared between them.
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.logger_throughput
+"""
+
+import gzip
+import os
+import resource
+import tempfile
+import time
+from multiprocessing import Process, Queue
+
+from atlasbuggy.logfiles.logger import Logger
+
+num_packets = 1000000
+burst_size = 2000  # packets are recorded in bursts, like the main loop delivering a queue of packets
+burst_interval = 0.01
+packet = "12.3456\t-0.1234\t9.8012\t0.0012\t-0.0031\t0.0007\t24.5\t-3.2\t41.0\t179.8\t-1.2\t3.4"
+
+
+class LegacyLogger(Logger):
+    """The Logger before it wrote gzip members while running"""
+
+    def open(self):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        self.data_file = open(self.file_path, "w+")
+        self.is_open = True
+
+    def dump_all(self):
+        while len(self.data) > 0:
+            self.data_file.write(self.data.pop(0))
+
+    def compress(self):
+        with open(self.file_path, "rb") as file:
+            raw_data = file.read()
+
+        compressed_data = gzip.compress(raw_data)
+        with open(self.file_path, "wb") as file:
+            file.write(compressed_data)
+
+    def close(self):
+        if self.is_open:
+            self.dump_all()
+            self.data_file.close()
+            self.compress()
+            self.is_open = False
+
+
+class BackgroundLogger(Logger):
+    def __init__(self, file_name, directory):
+        super(BackgroundLogger, self).__init__(file_name, directory, background=True)
+
+
+def log_packets(logger_class, directory, results):
+    logger = logger_class("benchmark", directory)
+    logger.flush_interval = float("inf")  # only the buffer size triggers writes in all loggers
+    logger.open()
+
+    num_stalls = 0
+    total_record_time = 0.0
+    start_time = time.time()
+    for burst_start in range(0, num_packets, burst_size):
+        for index in range(burst_start, burst_start + burst_size):
+            record_time = time.perf_counter()
+            logger.record(index * 0.001, "imu", packet, packet_type=True)
+            record_time = time.perf_counter() - record_time
+            total_record_time += record_time
+            if record_time > 0.001:
+                num_stalls += 1
+        time.sleep(burst_interval)
+    close_time = time.time()
+    logger.close()
+    end_time = time.time()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kilobytes on linux
+    results.put((end_time - start_time, total_record_time, num_stalls, end_time - close_time, peak_rss,
+                 os.path.getsize(logger.file_path)))
+
+
+def measure(logger_class):
+    with tempfile.TemporaryDirectory() as directory:
+        results = Queue()
+        process = Process(target=log_packets, args=(logger_class, directory, results))
+        process.start()
+        result = results.get()
+        process.join()
+    return result
+
+
+def main():
+    print("%i packets" % num_packets)
+    print("%-16s %10s %11s %15s %10s %14s %10s" % (
+        "logger", "total (s)", "record (s)", "stalls > 1 ms", "close (s)", "peak RSS (MB)", "size (MB)"))
+    for logger_class in (LegacyLogger, Logger, BackgroundLogger):
+        total_time, record_time, num_stalls, close_time, peak_rss, size = measure(logger_class)
+        print("%-16s %10.2f %11.2f %15i %10.2f %14.1f %10.1f" % (
+            logger_class.__name__, total_time, record_time, num_stalls, close_time, peak_rss,
+            size / 1024 ** 2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Measures packets per second parsed by the hand-written receive methods of roboquasar0.1's IMU and GPS
+against the same objects declared with a PacketSchema.
+
+    hand-written: split the packet and convert every field with its own line of code
+    schema receive: the compiled receive (or PacketSchema.fill) sets the same attributes
+    schema fill_array: PacketSchema.fill_array writes the fields to a preallocated list
+
+Packets are copied from roboquasar0.1's logs. The GPS packets end with a separator like the real ones.
+GPS has to fix the signs of latitude and longitude after the schema fills them, which makes the schema
+slower than the hand-written receive. roboquasar0.1's GPS keeps its hand-written receive and only uses its
+schema for decoding logs into columns.
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.packet_schema
+"""
+
+import time
+
+from atlasbuggy.robot.packetschema import PacketSchema
+from atlasbuggy.robot.robotobject import RobotObject
+
+num_packets = 500000
+imu_packet = "12.3456\t-0.1234\t9.8012\t0.0012\t-0.0031\t0.0007\t24.5\t-3.2\t41.0\t179.8\t-1.2\t3.4"
+gps_packet = "23\t7\t8\t0\t31\t1\t17\t2\t4026.5393\tN\t7956.6318\tW\t40.4423\t-79.9439\t0.01\t214.98\t294.90\t7\t"
+
+
+class HandWrittenIMU(RobotObject):
+    """IMU.receive before it had a schema"""
+
+    def __init__(self):
+        super(HandWrittenIMU, self).__init__("imu")
+
+    def receive(self, timestamp, packet):
+        data = packet.split("\t")
+        self.eul_x = float(data[0])
+        self.eul_y = float(data[1])
+        self.eul_z = float(data[2])
+
+        self.mag_x = float(data[3])
+        self.mag_y = float(data[4])
+        self.mag_z = float(data[5])
+
+        self.gyro_x = float(data[6])
+        self.gyro_y = float(data[7])
+        self.gyro_z = float(data[8])
+
+        self.accel_x = float(data[9])
+        self.accel_y = float(data[10])
+        self.accel_z = float(data[11])
+
+
+class SchemaIMU(RobotObject):
+    schema = PacketSchema(
+        "eul_x", "eul_y", "eul_z",
+        "mag_x", "mag_y", "mag_z",
+        "gyro_x", "gyro_y", "gyro_z",
+        "accel_x", "accel_y", "accel_z",
+    )
+
+    def __init__(self):
+        super(SchemaIMU, self).__init__("imu")
+
+
+class HandWrittenGPS(RobotObject):
+    """GPS.receive of roboquasar0.1"""
+
+    def __init__(self):
+        super(HandWrittenGPS, self).__init__("gps")
+
+    def receive(self, timestamp, packet):
+        data = packet.split("\t")
+
+        self.hour = float(data[0])
+        self.minute = float(data[1])
+        self.second = float(data[2])
+        self.milliseconds = float(data[3])
+
+        self.day = float(data[4])
+        self.month = float(data[5])
+        self.year = float(data[6])
+
+        self.fix_quality = float(data[7])
+
+        self.lat_direction = 1 if data[9] == "N" else -1
+        self.latitude = self.lat_direction * float(data[8])
+
+        self.lon_direction = 1 if data[11] == "E" else -1
+        self.longitude = self.lon_direction * float(data[10])
+
+        self.latitude_degree = float(data[12])
+        self.longitude_degree = float(data[13])
+
+        self.knots = float(data[14])
+        self.angle = float(data[15])
+        self.altitude = float(data[16])
+        self.satellites = float(data[17])
+
+
+def north_south(direction):
+    return 1 if direction == "N" else -1
+
+
+def east_west(direction):
+    return 1 if direction == "E" else -1
+
+
+class SchemaGPS(RobotObject):
+    schema = PacketSchema(
+        "hour", "minute", "second", "milliseconds",
+        "day", "month", "year",
+        "fix_quality",
+        "latitude", ("lat_direction", north_south),
+        "longitude", ("lon_direction", east_west),
+        "latitude_degree", "longitude_degree",
+        "knots", "angle", "altitude", "satellites",
+    )
+
+    def __init__(self):
+        super(SchemaGPS, self).__init__("gps")
+
+    def receive(self, timestamp, packet):
+        self.schema.fill(self, packet)
+        self.latitude *= self.lat_direction
+        self.longitude *= self.lon_direction
+
+
+def time_receive(robot_object, packet):
+    receive = robot_object.receive
+    start_time = time.perf_counter()
+    for _ in range(num_packets):
+        receive(0.0, packet)
+    return num_packets / (time.perf_counter() - start_time)
+
+
+def time_fill_array(schema, packet):
+    array = [0.0] * len(schema)
+    fill_array = schema.fill_array
+    start_time = time.perf_counter()
+    for _ in range(num_packets):
+        fill_array(array, packet)
+    return num_packets / (time.perf_counter() - start_time)
+
+
+def main():
+    print("%i packets per run" % num_packets)
+    print("%-8s %-20s %16s" % ("object", "parser", "packets/s"))
+
+    for name, hand_written, with_schema, packet in (("IMU", HandWrittenIMU(), SchemaIMU(), imu_packet),
+                                                     ("GPS", HandWrittenGPS(), SchemaGPS(), gps_packet)):
+        hand_written.receive(0.0, packet)
+        with_schema.receive(0.0, packet)
+        for field in with_schema.schema.names:
+            assert getattr(hand_written, field) == getattr(with_schema, field), field
+
+        print("%-8s %-20s %16.0f" % (name, "hand-written", time_receive(hand_written, packet)))
+        print("%-8s %-20s %16.0f" % (name, "schema receive", time_receive(with_schema, packet)))
+        print("%-8s %-20s %16.0f" % (name, "schema fill_array", time_fill_array(with_schema.schema, packet)))
+
+
+if __name__ == '__main__':
+    main()
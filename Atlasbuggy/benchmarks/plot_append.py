@@ -0,0 +1,88 @@
+"""
+Measures how long RobotPlot.append takes per point with the old list storage (pop(0) and a min/max search
+of the whole window once it's full) and the current RingBuffer storage.
+
+A 2D plot with unconstrained ranges is filled with a random walk, so both axis ranges change as points
+fall out of the window. The current storage appends one million points at each max_length. The old one
+is much slower at long max_lengths, so it appends fewer points (after filling its window) and the time
+per point is compared.
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.plot_append
+"""
+
+import random
+import time
+
+from atlasbuggy.plotters.robotplot import RobotPlot
+
+num_points = 1000000
+legacy_num_points = {100: 1000000, 10000: 20000}  # the old storage is O(max_length) per point
+max_lengths = (100, 10000)
+
+
+class LegacyRobotPlot(RobotPlot):
+    """RobotPlot before it stored its data in RingBuffers"""
+
+    def __init__(self, *args, **kwargs):
+        super(LegacyRobotPlot, self).__init__(*args, **kwargs)
+        self.legacy_data = [[] for _ in self.rings]
+
+    def _append_to_axis(self, datum, axis_num):
+        self.legacy_data[axis_num].append(datum)
+        self._update_range(datum, axis_num)
+
+        if self.max_length is not None and len(self.legacy_data[axis_num]) > self.max_length:
+            self.legacy_data[axis_num].pop(0)
+            if not self.ranges_contrained[axis_num]:
+                self.ranges[axis_num][0] = min(self.legacy_data[axis_num])
+                self.ranges[axis_num][1] = max(self.legacy_data[axis_num])
+
+
+def random_walk(length):
+    random.seed(0)
+    values = []
+    value = 0.0
+    for _ in range(length):
+        value += random.gauss(0.0, 1.0)
+        values.append(value)
+    return values
+
+
+def time_appends(plot_class, max_length, xs, ys, count):
+    plot = plot_class("benchmark", max_length=max_length)
+    for index in range(max_length):  # fill the window first so every timed append drops a point
+        plot.append(xs[index], ys[index])
+
+    start_time = time.perf_counter()
+    for index in range(max_length, max_length + count):
+        plot.append(xs[index], ys[index])
+    append_time = time.perf_counter() - start_time
+
+    return append_time, plot.x_range, plot.y_range
+
+
+def main():
+    longest = max(max_lengths) + num_points
+    xs = random_walk(longest)
+    ys = [-value for value in xs]
+
+    print("%-10s %-8s %10s %12s %15s" % ("max_length", "storage", "points", "total (s)", "us per point"))
+    for max_length in max_lengths:
+        legacy_time, legacy_x_range, legacy_y_range = time_appends(
+            LegacyRobotPlot, max_length, xs, ys, legacy_num_points[max_length])
+        current_time, current_x_range, current_y_range = time_appends(
+            RobotPlot, max_length, xs, ys, legacy_num_points[max_length])
+        assert legacy_x_range == current_x_range and legacy_y_range == current_y_range
+
+        current_time, _, _ = time_appends(RobotPlot, max_length, xs, ys, num_points)
+
+        print("%-10i %-8s %10i %12.2f %15.3f" % (
+            max_length, "list", legacy_num_points[max_length], legacy_time,
+            legacy_time / legacy_num_points[max_length] * 1e6))
+        print("%-10i %-8s %10i %12.2f %15.3f" % (
+            max_length, "ring", num_points, current_time, current_time / num_points * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Measures how long PlotExporter takes to save the plots of a directory of logs, then how long running it
+again takes when nothing changed, when one log changed and when a log was added in a new subdirectory.
+
+    first export: every log is simulated and its plots are saved as PNG and SVG
+    no changes: every log is up to date and skipped
+    one log changed: only the changed log is simulated again
+    log added: only the new log is simulated. The images of the others stay where they are
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.plot_export
+"""
+
+import os
+import tempfile
+import time
+
+from atlasbuggy.logfiles.logger import Logger
+from atlasbuggy.plotters.robotplot import RobotPlot, RobotPlotCollection
+from atlasbuggy.plotters.staticplotter import StaticPlotter
+from atlasbuggy.robot.batchsimulator import find_logs
+from atlasbuggy.robot.packetschema import PacketSchema
+from atlasbuggy.robot.plotexporter import PlotExporter
+from atlasbuggy.robot.robotobject import RobotObject
+from atlasbuggy.robot.simulator import RobotInterfaceSimulator
+
+num_logs = 8
+num_records = 50000
+imu_packet = "%0.4f\t%0.4f\t%0.4f\t0.0012\t-0.0031\t0.0007\t24.5\t-3.2\t41.0\t179.8\t-1.2\t3.4"
+
+
+class IMU(RobotObject):
+    schema = PacketSchema(
+        "eul_x", "eul_y", "eul_z",
+        "mag_x", "mag_y", "mag_z",
+        "gyro_x", "gyro_y", "gyro_z",
+        "accel_x", "accel_y", "accel_z",
+    )
+
+    def __init__(self):
+        super(IMU, self).__init__("imu")
+
+
+class IMUSimulator(RobotInterfaceSimulator):
+    def __init__(self, file_name, directory):
+        self.imu = IMU()
+        self.yaw_plot = RobotPlot("yaw", label="yaw")
+        self.pitch_plot = RobotPlot("pitch")
+        self.roll_plot = RobotPlot("roll")
+
+        self.yaw_plotter = StaticPlotter(1, self.yaw_plot)
+        self.angle_plotter = StaticPlotter(1, RobotPlotCollection("angles", self.pitch_plot, self.roll_plot))
+
+        super(IMUSimulator, self).__init__(file_name, directory, self.imu, stream=True)
+
+    def object_packet(self, timestamp):
+        if self.did_receive(self.imu):
+            self.yaw_plot.append(timestamp, self.imu.eul_x)
+            self.pitch_plot.append(timestamp, self.imu.eul_y)
+            self.roll_plot.append(timestamp, self.imu.eul_z)
+
+    def close(self):
+        self.yaw_plotter.plot()
+        self.angle_plotter.plot()
+        self.yaw_plotter.show()
+
+
+def write_log(name, directory):
+    logger = Logger(name, directory)
+    logger.open()
+    for index in range(num_records):
+        logger.record(index * 0.01, "imu", imu_packet % (index % 360, -index % 90, index * 0.001), "object")
+    logger.close()
+
+
+def time_export(log_directory, output_directory):
+    exporter = PlotExporter(IMUSimulator, log_directory, output_directory=output_directory, formats=("png", "svg"))
+    start_time = time.perf_counter()
+    report = exporter.run(print_progress=False)
+    duration = time.perf_counter() - start_time
+    assert len(report.failed()) == 0, report.report()
+    return duration, report.summary()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        log_directory = os.path.join(directory, "logs")
+        output_directory = os.path.join(directory, "plots")
+        for log_num in range(num_logs):
+            write_log("benchmark %i" % log_num, os.path.join(log_directory, "Jan 31 2017"))
+
+        print("%i logs of %i IMU records, 2 plotters each saved as PNG and SVG, %i CPUs" % (
+            num_logs, num_records, os.cpu_count() or 1))
+        print("%-18s %10s %10s %10s" % ("run", "time (s)", "exported", "skipped"))
+
+        for name in ("first export", "no changes", "one log changed", "log added"):
+            if name == "one log changed":
+                os.utime(find_logs(log_directory)[0])
+            elif name == "log added":
+                write_log("benchmark %i" % num_logs, os.path.join(log_directory, "Feb 01 2017"))
+            duration, summary = time_export(log_directory, output_directory)
+            print("%-18s %10.2f %10i %10i" % (name, duration, summary["logs"] - summary["skipped"], summary["skipped"]))
+
+        image_paths = []
+        for root, directories, file_names in os.walk(output_directory):
+            image_paths.extend(file_names)
+        assert len(image_paths) == (num_logs + 1) * 2 * 2  # no images left behind in an old layout
+
+
+if __name__ == '__main__':
+    main()
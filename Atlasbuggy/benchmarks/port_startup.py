@@ -0,0 +1,78 @@
+"""
+Measures how long RobotInterface takes to open its ports with and without the port cache (see portcache.py).
+
+Four pseudo-terminal boards are plugged in (see fake_boards.py), but two of the robot's objects are disabled.
+Their boards boot slower. Each board ignores commands until it has booted.
+
+    first run: nothing is cached, so every board is opened and asked for its ID
+    cached: boards whose cached ID belongs to a disabled object aren't opened
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.port_startup
+"""
+
+import os
+import tempfile
+import time
+
+from atlasbuggy.robot.interface import RobotInterface
+from atlasbuggy.robot.robotobject import RobotObject
+
+from benchmarks.fake_boards import FakeBoards
+
+boot_times = (0.5, 0.5, 2.0, 2.0)
+num_enabled = 2
+
+
+class FakeSensor(RobotObject):
+    def receive_first(self, packet):
+        pass
+
+    def receive(self, timestamp, packet):
+        pass
+
+
+class StartupRunner(RobotInterface):
+    def __init__(self):
+        super(StartupRunner, self).__init__(
+            *[FakeSensor("fake%i" % index, enabled=index < num_enabled) for index in range(len(boot_times))],
+            log_data=False
+        )
+
+    def loop(self):
+        return False
+
+
+def time_startup():
+    boards = FakeBoards(len(boot_times), boot_times=boot_times)
+    boards.replace_comports()
+    boards.start()
+
+    start_time = time.perf_counter()
+    runner = StartupRunner()
+    startup_time = time.perf_counter() - start_time
+    runner.run()
+    boards.stop()
+
+    for robot_port in runner.ports.values():
+        assert robot_port.error_message is None, robot_port.error_message[-1]
+    return startup_time
+
+
+def main():
+    print("%i boards (boot times %s s), %i of them enabled" % (
+        len(boot_times), ", ".join("%0.1f" % boot_time for boot_time in boot_times), num_enabled))
+    print("%-12s %12s" % ("run", "startup (s)"))
+
+    original_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)  # the port cache is kept in the directory the robot is run from
+        try:
+            for name in ("first run", "cached"):
+                print("%-12s %12.2f" % (name, time_startup()))
+        finally:
+            os.chdir(original_directory)
+
+
+if __name__ == '__main__':
+    main()
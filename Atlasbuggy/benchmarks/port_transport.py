@@ -0,0 +1,92 @@
+"""
+Measures how many packets per second reach the main process from simulated port processes.
+
+    per packet: the old transport. One queue.put per packet while holding the shared lock,
+        one get per packet in the main process while holding the same lock
+    batched: the current transport. One queue.put per read cycle, the lock only guards the packet counter
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.port_transport
+"""
+
+import time
+from multiprocessing import Lock, Process, Queue, Value
+from queue import Empty
+
+packets_per_port = 20000
+packets_per_read = 10  # roughly what one read cycle returns at 115200 baud and 1000 updates per second
+packet = "a0.015\t-12\t34\t981"
+
+
+def per_packet_port(whoiam, queue, lock, counter):
+    for _ in range(packets_per_port // packets_per_read):
+        packets = [packet] * packets_per_read
+        with lock:
+            for packet_ in packets:
+                queue.put((whoiam, time.time(), packet_))
+            counter.value += len(packets)
+
+
+def batched_port(whoiam, queue, lock, counter):
+    for _ in range(packets_per_port // packets_per_read):
+        packets = [packet] * packets_per_read
+        queue.put((whoiam, time.time(), packets))
+        with lock:
+            counter.value += len(packets)
+
+
+def drain_per_packet(queue, lock, counter):
+    received = 0
+    with lock:
+        while not queue.empty():
+            queue.get()
+            counter.value -= 1
+            received += 1
+    return received
+
+
+def drain_batched(queue, lock, counter):
+    received = 0
+    while True:
+        try:
+            whoiam, timestamp, packets = queue.get_nowait()
+        except Empty:
+            break
+        with lock:
+            counter.value -= len(packets)
+        received += len(packets)
+    return received
+
+
+def run(num_ports, port_fn, drain_fn):
+    queue = Queue()
+    lock = Lock()
+    counter = Value('i', 0)
+    ports = [Process(target=port_fn, args=("port%s" % index, queue, lock, counter)) for index in range(num_ports)]
+
+    expected = num_ports * packets_per_port
+    received = 0
+
+    start_time = time.time()
+    for port in ports:
+        port.start()
+    while received < expected:
+        received += drain_fn(queue, lock, counter)
+    duration = time.time() - start_time
+
+    for port in ports:
+        port.join()
+
+    return received / duration
+
+
+def main():
+    print("%-6s %16s %16s %8s" % ("ports", "per packet (p/s)", "batched (p/s)", "speedup"))
+    for num_ports in (1, 4, 8):
+        old_rate = run(num_ports, per_packet_port, drain_per_packet)
+        new_rate = run(num_ports, batched_port, drain_batched)
+        print("%-6i %16.0f %16.0f %7.1fx" % (num_ports, old_rate, new_rate, new_rate / old_rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Measures the CPU cost of a RobotInterface's controller code per simulated second by replaying a log
+with RobotInterfaceReplay.
+
+The log has ten minutes of IMU records at 100 Hz. The interface runs a PID heading controller in loop at
+its default 120 loops per second and sends a steering command every loop.
+
+    max speed: replay as fast as possible
+    10x: replay the first 30 seconds paced at ten times real time
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.replay_loop
+"""
+
+import tempfile
+
+from atlasbuggy.logfiles.logger import Logger
+from atlasbuggy.robot.interface import RobotInterface
+from atlasbuggy.robot.packetschema import PacketSchema
+from atlasbuggy.robot.replay import RobotInterfaceReplay
+from atlasbuggy.robot.robotobject import RobotObject
+
+imu_rate = 100  # records per second
+duration = 600  # seconds of records in the log
+imu_packet = "%0.4f\t0.0\t0.0\t0.0012\t-0.0031\t0.0007\t24.5\t-3.2\t41.0\t179.8\t-1.2\t3.4"
+
+
+class IMU(RobotObject):
+    schema = PacketSchema(
+        "eul_x", "eul_y", "eul_z",
+        "mag_x", "mag_y", "mag_z",
+        "gyro_x", "gyro_y", "gyro_z",
+        "accel_x", "accel_y", "accel_z",
+    )
+
+    def __init__(self):
+        self.eul_x = 0.0
+        super(IMU, self).__init__("imu")
+
+    def receive_first(self, packet):
+        pass
+
+
+class Steering(RobotObject):
+    def __init__(self):
+        super(Steering, self).__init__("steering")
+
+    def receive_first(self, packet):
+        pass
+
+
+class HeadingController(RobotInterface):
+    def __init__(self):
+        self.imu = IMU()
+        self.steering = Steering()
+        super(HeadingController, self).__init__(self.imu, self.steering, log_data=False, port_cache=False)
+
+        self.goal = 90.0
+        self.kp, self.ki, self.kd = 2.0, 0.1, 0.5
+        self.integral = 0.0
+        self.prev_error = 0.0
+        self.prev_time = None
+        self.num_imu_packets = 0
+
+    def packet_received(self, timestamp, whoiam, packet):
+        if self.did_receive(self.imu):
+            self.num_imu_packets += 1
+
+    def loop(self):
+        if self.prev_time is None:
+            self.prev_time = self.dt
+            return
+        dt = self.dt - self.prev_time
+        self.prev_time = self.dt
+
+        error = (self.goal - self.imu.eul_x + 180) % 360 - 180
+        self.integral += error * dt
+        derivative = (error - self.prev_error) / dt
+        self.prev_error = error
+
+        output = max(-100.0, min(100.0, self.kp * error + self.ki * self.integral + self.kd * derivative))
+        self.steering.send("%0.2f" % output, key="angle")
+
+
+def write_log(directory):
+    logger = Logger("benchmark", directory)
+    logger.open()
+    logger.record(-1, "imu", "", "object")
+    for index in range(duration * imu_rate):
+        logger.record(index / imu_rate, "imu", imu_packet % ((index * 0.05) % 360), "object")
+    logger.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        write_log(directory)
+
+        print("max speed")
+        replay = RobotInterfaceReplay(HeadingController, "benchmark", directory, speed=None)
+        summary = replay.run()
+        assert replay.interface.num_imu_packets == duration * imu_rate
+        assert abs(summary["loops"] - duration * replay.interface.loop_ups) <= 1
+        print(replay.report())
+
+        print("\n10x")
+        replay = RobotInterfaceReplay(HeadingController, "benchmark", directory, speed=10, end_time=30)
+        summary = replay.run()
+        assert abs(summary["real_time"] - summary["simulated_time"] / 10) < 0.2
+        print(replay.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Measures how long StaticPlotter takes to draw multi-million-point logs with and without decimation.
+
+Two subplots: a time series of two million points with a few one-point spikes, and a collection of two
+x-y paths with a million points each. Each case times plot plus the first draw, then zooming the time series
+in to 1% of its range and drawing again (the time it takes the window to respond). Rendering uses
+matplotlib's Agg backend so no window is opened.
+
+Run from the Atlasbuggy directory:
+    python -m benchmarks.static_plot
+"""
+
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+from atlasbuggy.plotters.robotplot import RobotPlot, RobotPlotCollection
+from atlasbuggy.plotters.staticplotter import StaticPlotter
+
+num_time_points = 2000000
+num_path_points = 1000000
+spike_indices = (123457, 1000003, 1765432)
+
+
+def make_plots():
+    generator = np.random.default_rng(0)
+    timestamps = np.arange(num_time_points) / 100.0
+    values = np.sin(timestamps / 10.0) + generator.normal(0.0, 0.1, num_time_points)
+    values[list(spike_indices)] = 25.0
+
+    time_plot = RobotPlot("time series")
+    time_plot.update(timestamps, values)
+
+    paths = []
+    for name in ("path 1", "path 2"):
+        path = RobotPlot(name)
+        path.update(np.cumsum(generator.normal(size=num_path_points)),
+                    np.cumsum(generator.normal(size=num_path_points)))
+        paths.append(path)
+
+    return time_plot, RobotPlotCollection("paths", *paths)
+
+
+def time_plotter(decimate):
+    time_plot, path_plots = make_plots()
+    plotter = StaticPlotter(2, time_plot, path_plots, decimate=decimate)
+
+    start_time = time.perf_counter()
+    plotter.plot()
+    plotter.fig.canvas.draw()
+    plot_time = time.perf_counter() - start_time
+
+    line = plotter.lines[time_plot.name]
+    drawn_points = len(line.get_xdata())
+    assert max(line.get_ydata()) == 25.0  # spikes are still drawn
+
+    zoom_start = spike_indices[1] / 100.0 - 100.0
+    start_time = time.perf_counter()
+    plotter.axes[time_plot.name].set_xlim(zoom_start, zoom_start + num_time_points / 100.0 * 0.01)
+    plotter.fig.canvas.draw()
+    zoom_time = time.perf_counter() - start_time
+    assert max(line.get_ydata()) == 25.0
+
+    plt.close("all")
+    return plot_time, zoom_time, drawn_points, len(line.get_xdata())
+
+
+def main():
+    print("%i point time series, 2 x %i point paths" % (num_time_points, num_path_points))
+    print("%-12s %16s %10s %16s %16s" % ("method", "plot + draw (s)", "zoom (s)", "points drawn", "points zoomed"))
+    for name, decimate in (("full", False), ("decimated", True)):
+        plot_time, zoom_time, drawn_points, zoomed_points = time_plotter(decimate)
+        print("%-12s %16.3f %10.3f %16i %16i" % (name, plot_time, zoom_time, drawn_points, zoomed_points))
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,12 @@ class RobotInterface:
         
         self.who_i_am = "dummy"  # put who_i_am ID here
         self.packet_end = "\n"
+
+        # binary frames: sync, type, payload length, payload, checksum
+        # (see RobotSerialPort.parse_frames)
+        self.binary_mode = False
+        self.frame_sync = 0xa5
+        self.frame_type = 0x01  # ASCII packet
         
         self.accel = pyb.Accel()
         self.leds = [pyb.LED(x + 1) for x in range(4)]
@@ -45,8 +51,18 @@ class RobotInterface:
         return "%0.8x" % (struct.unpack('<I', bytes(array.array('f', [number]))))
         
     def write(self, packet):
-        packet += self.packet_end
-        self.serial_ref.write(packet.encode('ascii'))
+        if self.binary_mode:
+            self.write_frame(packet.encode('ascii'))
+        else:
+            packet += self.packet_end
+            self.serial_ref.write(packet.encode('ascii'))
+
+    def write_frame(self, payload):
+        header = struct.pack('<BBH', self.frame_sync, self.frame_type, len(payload))
+        checksum = (sum(header[1:]) + sum(payload)) & 0xff
+        self.serial_ref.write(header)
+        self.serial_ref.write(payload)
+        self.serial_ref.write(bytes((checksum,)))
 
     def ready(self):
 #        self.write("ready!")
@@ -67,9 +83,14 @@ class RobotInterface:
                 if packet == "whoareyou":
 #                    self.write("iam%s\t%s\t%s\t%i\t%i\t%i\t%i" % (self.who_i_am,
 #                        self.py_version, self.upy_version, 0, 1, 0, 0))
-                    self.write("iam%s" % (self.who_i_am))
+                    self.binary_mode = False
+                    self.write("iam%s\tbinary" % (self.who_i_am))
                     self.ready()
 
+                elif packet == "binary":
+                    self.write("binary:ok")  # last ASCII packet
+                    self.binary_mode = True
+
                 elif packet == "init?":
                     self.write("init:%s\t%s\t%i\t%i\t%i\t%i" % (
                         self.py_version, self.upy_version, 0, 1, 0, 0))
@@ -80,6 +101,7 @@ class RobotInterface:
                 elif packet == "stop":
                     self.enable_write = False
                     self.enable_read = False
+                    self.binary_mode = False
                     
                     self.all_off()
                     self.leds[0].on()
@@ -7,9 +7,11 @@ import os
 import sys
 import time
 from datetime import datetime
-import pickle
+
+import numpy as np
 
 from atlasbuggy import project
+from atlasbuggy.microcontroller.columncache import ColumnCache
 
 # log file data separators (end markers)
 time_name_sep = ":\t"  # timestamp
@@ -24,6 +26,10 @@ pickle_file_type = "pkl"
 
 log_directory = ":logs"
 pickle_directory = ":pickled"
+column_cache_directory = "columns/"  # parsed logs are cached here, inside pickle_directory
+
+# increase when create_data's output changes so cached logs are parsed again
+parser_version = 1
 
 log_folder_format = '%b %d %Y'
 log_file_format = '%H;%M;%S, %a %b %d %Y'
@@ -133,9 +139,14 @@ class Parser:
     sensor recorded three times and then a GPS recorded once, the parser would
     return the IMU's data three times and then the GPS last
 
+    Parsed logs are cached as columns (one array per sensor value, see
+    columncache.py) in the pickled directory. Cached sensors are only loaded
+    when they're used, so get() and sensor_columns() only read the sensors
+    they ask for. Iterating loads every sensor.
     """
 
-    def __init__(self, file_name, directory=None, start_index=0, end_index=-1):
+    def __init__(self, file_name, directory=None, start_index=0, end_index=-1,
+                 use_cache=True):
         # pick a subdirectory of logs
         self.directory = project.parse_dir(directory, log_directory,
                                            lambda x: datetime.strptime(x,
@@ -152,10 +163,6 @@ class Parser:
         print("Using file named '%s' in directory '%s'" % (
             self.file_name, self.directory))
 
-        # read the whole file as a string
-        with open(self.directory + self.file_name, 'r') as data_file:
-            self.contents = data_file.read()
-
         # try to parse the name as a timestamp. If it succeeds, see if the
         # file is obsolete. Otherwise, do nothing
         try:
@@ -171,34 +178,46 @@ class Parser:
         except ValueError:
             pass
 
-        self.data = []  # the parsed data of the file
+        self.contents = None  # the file as a string. Only read if it isn't cached
+        self._data = None  # the parsed data of the file
         self.iter_index = 0  # the character index of the file
 
-        pickle_file_name = self.file_name[
-                           :-len(log_file_type)] + pickle_file_type
-        log_pickle_dir = project.interpret_dir(
-            pickle_directory) + self.local_dir
+        self.start_index = start_index
+        self.end_index = end_index
 
-        if os.path.isfile(log_pickle_dir + pickle_file_name):
-            print("Using pickled data")
-            time0 = time.time()
-            with open(log_pickle_dir + pickle_file_name, 'rb') as pickle_file:
-                self.data = pickle.load(pickle_file)
-            print("Took %s seconds" % (time.time() - time0))
+        self.cached_log = None
+        if use_cache:
+            cache = ColumnCache(project.interpret_dir(pickle_directory) +
+                                column_cache_directory, parser_version)
+            self.cached_log = cache.open(self.directory + self.file_name)
+
+        if self.cached_log is not None and "" in self.cached_log:
+            print("Using cached data")
         else:
-            # parse the file and write it to a pickle file
+            # parse the file and write it to the cache
             print("Using raw file")
             time0 = time.time()
+            with open(self.directory + self.file_name, 'r') as data_file:
+                self.contents = data_file.read()
+            self._data = []
             self.create_data()
             print("Took %s seconds" % (time.time() - time0))
 
-            if not os.path.isdir(log_pickle_dir):
-                os.mkdir(log_pickle_dir)
-            with open(log_pickle_dir + pickle_file_name, 'wb') as pickle_file:
-                pickle.dump(self.data, pickle_file, pickle.HIGHEST_PROTOCOL)
-            print("Wrote pickle to: " + log_pickle_dir + pickle_file_name)
+            if self.cached_log is not None:
+                self.store_columns(self._data)
+                print("Wrote cache to: " + self.cached_log.directory)
 
-        self.data = self.data[start_index: end_index]
+            self._data = self._data[start_index: end_index]
+
+    @property
+    def data(self):
+        """
+        List of (timestamp, name, values) for every line between start_index
+        and end_index. Built from the cache the first time it's used
+        """
+        if self._data is None:
+            self._data = self.load_rows()[self.start_index: self.end_index]
+        return self._data
 
     def __iter__(self):
         """
@@ -223,10 +242,23 @@ class Parser:
         return self.data[item]
 
     def __len__(self):
-        return len(self.data)
+        if self._data is None:
+            return len(range(self.cached_log.info("")["rows"])[
+                       self.start_index: self.end_index])
+        return len(self._data)
 
     def get(self, instance_num, sensor_name):
         """Get the nth occurrence of a particular type of data"""
+        if self._data is None:
+            # only load the sensor's columns
+            columns = self.sensor_columns(sensor_name)
+            if columns is not None and instance_num < len(columns["index"]):
+                index = int(columns["index"][instance_num])
+                return (float(columns["timestamp"][instance_num]), index,
+                        self.row_values(sensor_name, columns, instance_num))
+            raise ValueError(
+                "Sensor '%s' not found in log file..." % sensor_name)
+
         counter = 0
         # iterate until the nth instance is found
         for index, (timestamp, name, values) in enumerate(self.data):
@@ -271,10 +303,146 @@ class Parser:
                         values = convert_str(data)
 
                 # put it in self.data
-                self.data.append((timestamp, name, values))
+                self._data.append((timestamp, name, values))
 
             index = end_index + 1
 
+    def sensor_columns(self, sensor_name):
+        """
+        Get every value a sensor recorded between start_index and end_index
+        as arrays. Only this sensor is loaded from the cache
+
+        :param sensor_name: name the data was logged with
+        :return: dictionary of "timestamp", "index" (position in self.data)
+            and one array per value name ("value" if the sensor logged
+            single values instead of dictionaries). None if the sensor
+            didn't record anything
+        """
+        if self.cached_log is None or sensor_name not in self.cached_log:
+            return None
+        columns = self.cached_log[sensor_name]
+
+        start, stop, step = slice(self.start_index, self.end_index).indices(
+            self.cached_log.info("")["rows"])
+        first = np.searchsorted(columns["index"], start)
+        last = np.searchsorted(columns["index"], stop)
+
+        selected = {name: column[first: last] for name, column in columns.items()}
+        selected["index"] = selected["index"] - start
+        return selected
+
+    def row_values(self, sensor_name, columns, row):
+        """
+        Rebuild the values of one line from a sensor's columns
+
+        :return: a dictionary of values or a single value
+        """
+        info = self.cached_log.info(sensor_name)
+        if info["scalar"]:
+            return columns["value"][row].item()
+        values = {}
+        for key in info["keys"]:
+            if key in info["optional"] and not columns["has " + key][row]:
+                continue
+            values[key] = columns[key][row].item()
+        return values
+
+    def load_rows(self):
+        """
+        Rebuild the parsed data of the whole file from the cache
+
+        :return: list of (timestamp, name, values)
+        """
+        rows = [None] * self.cached_log.info("")["rows"]
+        for sensor_name in self.cached_log.info("")["sensors"]:
+            columns = self.cached_log[sensor_name]
+            info = self.cached_log.info(sensor_name)
+            indices = columns["index"].tolist()
+            timestamps = columns["timestamp"].tolist()
+
+            if info["scalar"]:
+                for index, timestamp, value in zip(
+                        indices, timestamps, columns["value"].tolist()):
+                    rows[index] = (timestamp, sensor_name, value)
+            elif len(info["optional"]) > 0:
+                for row, (index, timestamp) in enumerate(zip(indices, timestamps)):
+                    rows[index] = (timestamp, sensor_name,
+                                   self.row_values(sensor_name, columns, row))
+            else:
+                keys = info["keys"]
+                value_lists = [columns[key].tolist() for key in keys]
+                for index, timestamp, values in zip(indices, timestamps,
+                                                    zip(*value_lists)):
+                    rows[index] = (timestamp, sensor_name, dict(zip(keys, values)))
+        return rows
+
+    def store_columns(self, data):
+        """
+        Split the parsed data into columns by sensor and value name and
+        save them to the cache
+
+        :param data: list of (timestamp, name, values) for the whole file
+        :return: None
+        """
+        sensors = {}  # name -> (indices, timestamps, list of values)
+        for index, (timestamp, name, values) in enumerate(data):
+            if name not in sensors:
+                sensors[name] = ([], [], [])
+            sensors[name][0].append(index)
+            sensors[name][1].append(timestamp)
+            sensors[name][2].append(values)
+
+        for name, (indices, timestamps, value_rows) in sensors.items():
+            columns = dict(index=np.array(indices, dtype=np.int64),
+                           timestamp=np.array(timestamps, dtype=np.float64))
+            scalar = not isinstance(value_rows[0], dict)
+            keys = []
+            optional = []
+
+            if scalar:
+                columns["value"] = to_column(value_rows)
+            else:
+                for values in value_rows:
+                    for key in values:
+                        if key not in keys:
+                            keys.append(key)
+                for key in keys:
+                    column = [values.get(key) if isinstance(values, dict)
+                              else None for values in value_rows]
+                    if None in column:
+                        optional.append(key)
+                        columns["has " + key] = np.array(
+                            [value is not None for value in column])
+                    columns[key] = to_column(column)
+
+            self.cached_log.store(name, columns, dict(
+                scalar=scalar, keys=keys, optional=optional))
+
+        # written last. The cache is only used if this exists
+        self.cached_log.store("", {}, dict(rows=len(data),
+                                           sensors=list(sensors.keys())))
+
+
+def to_column(values):
+    """
+    Turn values parsed by convert_str into an array. Missing values (None)
+    take the value of the first value that isn't missing
+
+    :return: bool, int64 or float64 array if every value has that type
+        (ints and floats become float64), a string array otherwise
+    """
+    filler = next((value for value in values if value is not None), 0)
+    values = [filler if value is None else value for value in values]
+
+    types = set(type(value) for value in values)
+    if types <= {bool}:
+        return np.array(values, dtype=bool)
+    if types <= {int}:
+        return np.array(values, dtype=np.int64)
+    if types <= {int, float}:
+        return np.array(values, dtype=np.float64)
+    return np.array([str(value) for value in values])
+
 
 def _get_txt_map(file_name, directory):
     """
@@ -45,8 +45,8 @@ class Steering(RobotObject):
     def set_speed(self, joystick_value):
         self.speed = int(joystick_value * self.max_speed)
         print("v" + str(self.speed))
-        self.send("v" + str(self.speed))
+        self.send("v" + str(self.speed), key="v")
 
     def set_position(self, joystick_value):  # joystick_value: -1.0...1.0
         step = int(joystick_value * self.angle_to_step)
-        self.send("p" + str(step))
+        self.send("p" + str(step), key="p")
@@ -1,7 +1,36 @@
+from atlasbuggy.robot.packetschema import PacketSchema
 from atlasbuggy.robot.robotobject import RobotObject
 
 
+def north_south(direction):
+    return 1 if direction == "N" else -1
+
+
+def east_west(direction):
+    return 1 if direction == "E" else -1
+
+
 class GPS(RobotObject):
+    # used to decode logs into columns (see Parser.columns). Latitude and longitude are unsigned there
+    schema = PacketSchema(
+        # time
+        "hour", "minute", "second", "milliseconds",
+
+        # date
+        "day", "month", "year",
+
+        # fix info
+        "fix_quality",
+
+        # location info
+        "latitude", ("lat_direction", north_south),
+        "longitude", ("lon_direction", east_west),
+        "latitude_degree", "longitude_degree",
+
+        # cool shit
+        "knots", "angle", "altitude", "satellites",
+    )
+
     def __init__(self, enabled=True):
         self.hour = 0
         self.minute = 0
@@ -36,6 +65,8 @@ class GPS(RobotObject):
         print("update rate: ", 1000 / self.gps_update_delay)
 
     def receive(self, timestamp, packet):
+        # hand-written instead of schema.fill because the signs of latitude and longitude depend on the
+        # direction fields. Filling then fixing the signs is slower (see benchmarks/packet_schema.py)
         data = packet.split("\t")
 
         # time
@@ -1,7 +1,15 @@
+from atlasbuggy.robot.packetschema import PacketSchema
 from atlasbuggy.robot.robotobject import RobotObject
 
 
 class IMU(RobotObject):
+    schema = PacketSchema(
+        "eul_x", "eul_y", "eul_z",
+        "mag_x", "mag_y", "mag_z",
+        "gyro_x", "gyro_y", "gyro_z",
+        "accel_x", "accel_y", "accel_z",
+    )
+
     def __init__(self, enabled=True):
         self.sample_rate = None
         self.eul_x = 0.0
@@ -20,28 +28,10 @@ class IMU(RobotObject):
         self.gyro_y = 0.0
         self.gyro_z = 0.0
 
-        self.data = [0 for x in range[12]]
+        self.data = [0 for x in range(12)]
 
         super(IMU, self).__init__("imu", enabled)
 
     def receive_first(self, packet):
         header = "delay:"
         self.sample_rate = int(packet[len(header)])
-
-    def receive(self, timestamp, packet):
-        data = packet.split("\t")
-        self.eul_x = float(data[0])
-        self.eul_y = float(data[1])
-        self.eul_z = float(data[2])
-
-        self.mag_x = float(data[3])
-        self.mag_y = float(data[4])
-        self.mag_z = float(data[5])
-
-        self.gyro_x = float(data[6])
-        self.gyro_y = float(data[7])
-        self.gyro_z = float(data[8])
-
-        self.accel_x = float(data[9])
-        self.accel_y = float(data[10])
-        self.accel_z = float(data[11])